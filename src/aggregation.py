@@ -0,0 +1,219 @@
+from typing import Callable
+import polars as pl
+from sqlalchemy import ColumnElement, Select, extract, func, select
+from werkzeug.datastructures import MultiDict
+from filters import FilterError, parse_list
+from models import Weather, WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis, RegionalAnalysis
+from serialization import Field, format_date
+
+
+AGGREGATES: dict[str, Callable] = {
+    'mean': func.avg,
+    'min': func.min,
+    'max': func.max,
+    'sum': func.sum,
+}
+
+FRAME_AGGREGATES: dict[str, Callable[[pl.Expr], pl.Expr]] = {
+    'mean': pl.Expr.mean,
+    'min': pl.Expr.min,
+    'max': pl.Expr.max,
+    'sum': pl.Expr.sum,
+}
+
+# Polars expressions for the group keys that are derived from the date of a record.
+FRAME_KEYS: dict[str, pl.Expr] = {
+    'year': pl.col('date').dt.year(),
+    'month': pl.col('date').dt.month(),
+}
+
+# Group key fields per group_by value; month groups by calendar month within each year.
+WEATHER_GROUPS: dict[str, list[Field]] = {
+    'station': [('weather_station_id', Weather.weather_station_id, None)],
+    'year': [('year', extract('year', Weather.date), None)],
+    'month': [('year', extract('year', Weather.date), None), ('month', extract('month', Weather.date), None)],
+    'day': [('date', Weather.date, format_date)],
+}
+
+WEATHER_MEASURES: list[Field] = [
+    ('max_temp', Weather.max_temp, None),
+    ('min_temp', Weather.min_temp, None),
+    ('precipitation', Weather.precipitation, None),
+]
+
+WEATHER_ANALYSIS_GROUPS: dict[str, list[Field]] = {
+    'station': [('weather_station_id', WeatherAnalysis.weather_station_id, None)],
+    'year': [('year', WeatherAnalysis.year, None)],
+}
+
+WEATHER_ANALYSIS_MEASURES: list[Field] = [
+    ('avg_max_temp', WeatherAnalysis.avg_max_temp_celsius, None),
+    ('avg_min_temp', WeatherAnalysis.avg_min_temp_celsius, None),
+    ('accumulated_precipitation', WeatherAnalysis.accumulated_precipitation_cm, None),
+]
+
+WEATHER_MONTHLY_ANALYSIS_GROUPS: dict[str, list[Field]] = {
+    'station': [('weather_station_id', WeatherMonthlyAnalysis.weather_station_id, None)],
+    'year': [('year', WeatherMonthlyAnalysis.year, None)],
+    'month': [('year', WeatherMonthlyAnalysis.year, None), ('month', WeatherMonthlyAnalysis.month, None)],
+}
+
+WEATHER_MONTHLY_ANALYSIS_MEASURES: list[Field] = [
+    ('avg_max_temp', WeatherMonthlyAnalysis.avg_max_temp_celsius, None),
+    ('avg_min_temp', WeatherMonthlyAnalysis.avg_min_temp_celsius, None),
+    ('accumulated_precipitation', WeatherMonthlyAnalysis.accumulated_precipitation_cm, None),
+]
+
+WEATHER_SEASON_ANALYSIS_GROUPS: dict[str, list[Field]] = {
+    'station': [('weather_station_id', WeatherSeasonAnalysis.weather_station_id, None)],
+    'year': [('year', WeatherSeasonAnalysis.year, None)],
+}
+
+WEATHER_SEASON_ANALYSIS_MEASURES: list[Field] = [
+    ('avg_max_temp', WeatherSeasonAnalysis.avg_max_temp_celsius, None),
+    ('avg_min_temp', WeatherSeasonAnalysis.avg_min_temp_celsius, None),
+    ('accumulated_precipitation', WeatherSeasonAnalysis.accumulated_precipitation_cm, None),
+]
+
+REGIONAL_ANALYSIS_GROUPS: dict[str, list[Field]] = {
+    'year': [('year', RegionalAnalysis.year, None)],
+}
+
+REGIONAL_ANALYSIS_MEASURES: list[Field] = [
+    ('avg_max_temp', RegionalAnalysis.avg_max_temp_celsius, None),
+    ('avg_min_temp', RegionalAnalysis.avg_min_temp_celsius, None),
+    ('accumulated_precipitation', RegionalAnalysis.accumulated_precipitation_cm, None),
+]
+
+
+def parse_choices(args: MultiDict, name: str, choices, default: list[str] | None = None) -> list[str]:
+    """
+    Parses an optional comma-separated list argument whose values must come from a fixed set.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+        name (str): The name of the argument.
+        choices: The allowed values.
+        default (list[str] | None): The values used when the argument is missing.
+
+    Returns:
+        list[str]: The requested values, in request order.
+
+    Raises:
+        FilterError: If a value is not allowed.
+    """
+    values = parse_list(args, name)
+    for value in values:
+        if value not in choices:
+            raise FilterError(f"{name} must be a comma-separated list of {', '.join(choices)}")
+
+    return values or list(default or [])
+
+
+def group_keys(groups: dict[str, list[Field]], group_by: list[str]) -> list[Field]:
+    """
+    Returns the group key fields of the requested groupings.
+
+    Keys are ordered canonically (station, year, month, day) whatever the order of group_by, and
+    shared keys such as the year of month and year are only included once.
+
+    Args:
+        groups (dict[str, list[Field]]): The group key fields for each group_by value.
+        group_by (list[str]): The requested groupings.
+
+    Returns:
+        list[Field]: The key fields.
+    """
+    keys: dict[str, Field] = {}
+    for grouping in groups:
+        if grouping in group_by:
+            for field in groups[grouping]:
+                keys.setdefault(field[0], field)
+
+    return list(keys.values())
+
+
+def aggregate_query(
+    groups: dict[str, list[Field]],
+    measures: list[Field],
+    group_by: list[str],
+    aggregates: list[str],
+    conditions: list[ColumnElement[bool]],
+) -> tuple[Select, list[Field]]:
+    """
+    Builds a GROUP BY query that aggregates measures in SQL.
+
+    Besides the `<measure>_<aggregate>` columns, every group reports the number of records it covers.
+
+    Args:
+        groups (dict[str, list[Field]]): The group key fields for each group_by value.
+        measures (list[Field]): The columns to aggregate.
+        group_by (list[str]): The requested groupings.
+        aggregates (list[str]): The requested aggregate functions, keys of AGGREGATES.
+        conditions (list[ColumnElement[bool]]): The WHERE conditions.
+
+    Returns:
+        tuple[Select, list[Field]]: The query and the response fields of its columns.
+    """
+    key_fields = [(name, column.label(name), convert) for name, column, convert in group_keys(groups, group_by)]
+    value_fields = [('count', func.count().label('count'), None)] + [
+        (f'{name}_{aggregate}', AGGREGATES[aggregate](column).label(f'{name}_{aggregate}'), None)
+        for name, column, _ in measures
+        for aggregate in aggregates
+    ]
+    key_columns = [column for _, column, _ in key_fields]
+
+    query = (
+        select(*key_columns, *[column for _, column, _ in value_fields])
+        .where(*conditions)
+        .group_by(*key_columns)
+        .order_by(*key_columns)
+    )
+    return query, key_fields + value_fields
+
+
+def aggregate_frame(
+    frame: pl.LazyFrame,
+    groups: dict[str, list[Field]],
+    measures: list[Field],
+    group_by: list[str],
+    aggregates: list[str],
+) -> tuple[pl.DataFrame, list[Field]]:
+    """
+    Aggregates a filtered Polars frame into the same groups and columns as aggregate_query.
+
+    Only the key and measure columns are read, so scans of columnar files are projected down to them.
+    Sums are widened to 64 bits and, like SQL, are null for groups without values.
+
+    Args:
+        frame (pl.LazyFrame): The filtered records, with the source columns of the measures and a
+            date or year column for the keys.
+        groups (dict[str, list[Field]]): The group key fields for each group_by value.
+        measures (list[Field]): The columns to aggregate.
+        group_by (list[str]): The requested groupings.
+        aggregates (list[str]): The requested aggregate functions, keys of AGGREGATES.
+
+    Returns:
+        tuple[pl.DataFrame, list[Field]]: The groups, sorted by their keys, and the response fields of its columns.
+    """
+    key_fields = group_keys(groups, group_by)
+    columns = frame.columns
+    keys = [(pl.col(name) if name in columns else FRAME_KEYS[name]).alias(name) for name, _, _ in key_fields]
+
+    values = [pl.len().alias('count')]
+    for name, column, _ in measures:
+        source = pl.col(column.name)
+        for aggregate in aggregates:
+            if aggregate == 'sum':
+                value = pl.when(source.count() > 0).then(source.cast(pl.Int64).sum())
+            else:
+                value = FRAME_AGGREGATES[aggregate](source)
+            values.append(value.alias(f'{name}_{aggregate}'))
+
+    key_names = [name for name, _, _ in key_fields]
+    df = frame.group_by(keys).agg(values).sort(key_names).collect()
+
+    value_fields = [('count', None, None)] + [
+        (f'{name}_{aggregate}', None, None) for name, _, _ in measures for aggregate in aggregates
+    ]
+    return df, key_fields + value_fields
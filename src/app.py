@@ -1,31 +1,405 @@
-from flask import Flask, jsonify, request
-from models import db, Weather, WeatherAnalysis
-from ingest_data import ingest_data_main
+from flask import Flask, Response, current_app, jsonify, request, stream_with_context
+from models import db, READ_ONLY_BIND, Station, StationMetadata, Weather, weather_table, YieldData, DatasetVersion
+from ingest_data import STN_DATA, WX_DATA, YLD_DATA
+from jobs import IngestJobRunner
+from cache import create_response_cache, dataset_version
+from filters import FilterError, WEATHER_FILTERS, sql_conditions, weather_analysis_filters, weather_conditions, weather_filters
+from aggregation import AGGREGATES, WEATHER_GROUPS, WEATHER_MEASURES, aggregate_frame, aggregate_query, parse_choices
+from columnar import WEATHER_BACKENDS, scan_analysis, scan_weather
+from correlation import CORRELATION_PERIODS, analysis_frame, correlate, weather_variables, yield_frame
+from rollups import ROLLUP_FILTERS, Rollup, parse_rollup, rollup_filters
+from station_index import StationIndex, StationIndexLoader, ensure_station_index
+from export import EXPORT_FORMATS, export_frame, stream_csv, stream_ndjson, write_frame
+from pagination import COUNT_MODES, CountCache, PaginationError, count_rows, keyset_frame, keyset_page, offset_frame, offset_page
+from serialization import STATION_FIELDS, WEATHER_FIELDS, dumps, field_columns, rows_to_dicts
+from metrics import CONTENT_TYPE, REGISTRY, instrument_requests, log_slow_queries
+from profiler import start_profiler
+from quality import QualityRules, parse_quality_view, quality_conditions
+from batch import BATCH_MAX_KEYS, lookup_weather, parse_batch_keys
+from stations import StationLocatorLoader, near_station_args, parse_near, station_conditions
+from migrate import weather_layout
 from flasgger import Swagger
-from datetime import datetime
+from pytz import timezone
+from sqlalchemy import Column, Engine, Select, event, make_url, select
+import os
+import pathlib
+import polars as pl
 
 
+def enable_sqlite_wal(engine: Engine):
+    """
+    Switches file-backed SQLite databases to write-ahead logging.
+
+    In WAL mode readers never block on a writer, so the API keeps serving while an ingest job commits.
+
+    Args:
+        engine (Engine): The engine whose connections should use WAL.
+    """
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+
+def enable_read_only(engine: Engine):
+    """
+    Makes every connection of an engine refuse writes.
+
+    SQLite connections switch on `query_only`; PostgreSQL sessions default to read-only transactions.
+
+    Args:
+        engine (Engine): The engine serving read requests.
+    """
+    @event.listens_for(engine, 'connect')
+    def set_read_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if engine.dialect.name == 'sqlite':
+            cursor.execute('PRAGMA query_only=ON')
+        else:
+            cursor.execute('SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY')
+        cursor.close()
+        if engine.dialect.name != 'sqlite':
+            dbapi_connection.commit()
+
+
+def in_memory(uri: str) -> bool:
+    """
+    Tells whether a database URI points to an in-memory SQLite database, which only exists on its own connection.
+
+    Args:
+        uri (str): The database URI.
+
+    Returns:
+        bool: Whether the database is in memory.
+    """
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config: dict) -> dict:
+    """
+    Builds the SQLAlchemy engine options of the configured connection pool.
+
+    In-memory SQLite databases keep SQLAlchemy's single-connection pool, since every new
+    connection would open an empty database.
+
+    Args:
+        config (dict): The application configuration.
+
+    Returns:
+        dict: The pool options, shared by the default and the read-only engine.
+    """
+    if in_memory(config['SQLALCHEMY_DATABASE_URI']):
+        return {}
+
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+    }
 
-def create_app():
+
+def cursor_page(query: Select, key_columns: list[Column], count_key: tuple, count_query: Select | None = None) -> dict:
+    """
+    Builds the pagination fields of a response in cursor mode.
+
+    The request's `cursor`, `per_page` and `count` arguments select the page and how the total is
+    reported: `none` skips counting, `cached` reuses a recent count and `exact` always counts.
+
+    Args:
+        query (Select): The filtered select statement to paginate.
+        key_columns (list[Column]): The unique key columns that order the pages.
+        count_key (tuple): The normalized filters identifying the query in the count cache.
+        count_query (Select | None): A cheaper statement matching the same rows, counted instead of the query.
+
+    Returns:
+        dict: The rows under 'items' and the 'per_page', 'next_cursor' and 'total' fields.
+
+    Raises:
+        PaginationError: If the cursor, per_page or count arguments are invalid.
+    """
+    per_page = request.args.get('per_page', 10, type=int)
+    count_mode = request.args.get('count', 'none', type=str)
+    if count_mode not in COUNT_MODES:
+        raise PaginationError(f"count must be one of {', '.join(COUNT_MODES)}")
+
+    items, next_cursor = keyset_page(query, key_columns, request.args.get('cursor', type=str), per_page)
+
+    counted = query if count_query is None else count_query
+    total = None
+    if count_mode == 'cached':
+        total = current_app.extensions['count_cache'].get(count_key, counted)
+    elif count_mode == 'exact':
+        total = count_rows(counted)
+
+    return {
+        'items': items,
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'total': total
+    }
+
+
+def grouped_page(groups: dict, measures: list, conditions: list, count_key: tuple, frame: pl.LazyFrame | None = None) -> dict | None:
+    """
+    Builds the response of a request with `group_by`, aggregating the filtered rows in SQL or Polars.
+
+    The `agg` argument selects the aggregates (default: all of them); groups are paginated with
+    `page` and `per_page`. Counting the groups in SQL costs a second aggregation, so the total is
+    kept in the count cache and shared by every page of the same rollup.
+
+    Args:
+        groups (dict): The group key fields for each group_by value.
+        measures (list): The columns to aggregate.
+        conditions (list): The WHERE conditions of the request's filters.
+        count_key (tuple): The dataset version and normalized filters identifying the rows in the count cache.
+        frame (pl.LazyFrame | None): The filtered rows of the columnar store; when given, groups are
+            aggregated from it instead of SQL.
+
+    Returns:
+        dict | None: The groups under 'groups' and the pagination fields, or None if the request
+        has no `group_by`.
+
+    Raises:
+        FilterError: If group_by or agg are invalid.
+        PaginationError: If the request also asks for cursor pagination.
+    """
+    group_by = parse_choices(request.args, 'group_by', groups)
+    if not group_by:
+        return None
+    if 'cursor' in request.args:
+        raise PaginationError("cursor pagination is not supported with group_by")
+
+    aggregates = parse_choices(request.args, 'agg', AGGREGATES, default=list(AGGREGATES))
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+
+    if frame is not None:
+        df, fields = aggregate_frame(frame, groups, measures, group_by, aggregates)
+        result = offset_frame(df, page, per_page)
+    else:
+        query, fields = aggregate_query(groups, measures, group_by, aggregates, conditions)
+        total = current_app.extensions['count_cache'].get(('groups', *count_key, tuple(sorted(group_by))), query)
+        result = offset_page(query, page, per_page, total)
+
+    return {
+        'groups': rows_to_dicts(result.pop('items'), fields),
+        **result
+    }
+
+
+def index_page(index: StationIndex, filters: list, page: int, per_page: int) -> dict | None:
+    """
+    Answers a request for one station's records from the station index, without querying the database.
+
+    Rows come back in (station, date) order like the SQLite index scan, and the total is the width
+    of the binary-searched range instead of a COUNT query.
+
+    Args:
+        index (StationIndex): The station index.
+        filters (list): The weather filters of the request.
+        page (int): The page number; values below 1 select the first page.
+        per_page (int): The number of rows per page; values below 1 use 20.
+
+    Returns:
+        dict | None: The rows under 'items' and the pagination fields, or None if the filters do not
+        select exactly one station and are left to SQL.
+    """
+    weather_station_id = start = end = None
+    for name, operator, value in filters:
+        if name == 'weather_station_id' and operator == '==':
+            weather_station_id = value
+        elif name == 'date' and operator in ('==', '>='):
+            start = value if start is None else max(start, value)
+            if operator == '==':
+                end = value if end is None else min(end, value)
+        elif name == 'date' and operator == '<=':
+            end = value if end is None else min(end, value)
+        else:
+            return None
+    if weather_station_id is None:
+        return None
+
+    page = page if page >= 1 else 1
+    per_page = per_page if per_page >= 1 else 20
+    positions = index.search(weather_station_id, start, end)
+    total = len(positions)
+
+    return {
+        'items': index.rows(positions[(page - 1) * per_page:page * per_page], weather_station_id),
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': -(-total // per_page) if total else 0
+    }
+
+
+def json_response(body: bytes) -> Response:
+    """
+    Wraps a serialized JSON body in a response.
+
+    Args:
+        body (bytes): The serialized JSON body.
+
+    Returns:
+        Response: The response.
+    """
+    return current_app.response_class(body, mimetype='application/json')
+
+
+def conditional_json(body: bytes, etag: str, version: DatasetVersion | None) -> Response:
+    """
+    Wraps a serialized JSON body in a response that supports conditional requests.
+
+    Clients that send a matching If-None-Match or an If-Modified-Since at or after the dataset's
+    last change get an empty 304 instead of the payload.
+
+    Args:
+        body (bytes): The serialized JSON body.
+        etag (str): The entity tag of the body.
+        version (DatasetVersion | None): The version of the dataset the body was built from.
+
+    Returns:
+        Response: The response, 304 if the client's copy is current.
+    """
+    response = json_response(body)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    if version is not None:
+        response.last_modified = version.updated.replace(tzinfo=timezone('UTC'))
+
+    return response.make_conditional(request)
+
+
+def create_app(test_config: dict | None = None):
     """
     Create and configure the Flask application.
 
+    Args:
+        test_config (dict | None): Optional configuration overriding the defaults, e.g. for tests.
+
     Returns:
         Flask: The configured Flask application instance.
     """
     app = Flask(__name__)
 
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['INGEST_API_ENABLED'] = os.environ.get('INGEST_API_ENABLED', '0') == '1'
+    app.config['INGEST_JOBS_KEPT'] = int(os.environ.get('INGEST_JOBS_KEPT', 100))
+    app.config['WX_DATA'] = WX_DATA
+    app.config['YLD_DATA'] = YLD_DATA
+    app.config['STATIONS_FILE'] = pathlib.Path(os.environ.get('STATIONS_FILE', STN_DATA))
+    app.config['STATS_CACHE_BACKEND'] = os.environ.get('STATS_CACHE_BACKEND', 'memory')
+    app.config['STATS_CACHE_URL'] = os.environ.get('STATS_CACHE_URL')
+    app.config['STATS_CACHE_SIZE'] = int(os.environ.get('STATS_CACHE_SIZE', 1024))
+    app.config['STATS_CACHE_TTL'] = float(os.environ.get('STATS_CACHE_TTL', 3600))
+    app.config['WEATHER_BACKEND'] = os.environ.get('WEATHER_BACKEND', 'sqlite')
+    app.config['PARQUET_STORE'] = os.environ.get('PARQUET_STORE', os.path.join(app.instance_path, 'parquet'))
+    app.config['STATION_INDEX_ENABLED'] = os.environ.get('STATION_INDEX_ENABLED', '0') == '1'
+    app.config['STATION_INDEX_PATH'] = os.environ.get('STATION_INDEX_PATH', os.path.join(app.instance_path, 'station_index.bin'))
+    app.config['STATION_INDEX_CHECK_SECONDS'] = float(os.environ.get('STATION_INDEX_CHECK_SECONDS', 5))
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    app.config['DB_READ_ONLY'] = os.environ.get('DB_READ_ONLY', '0') == '1'
+    app.config['DATABASE_READ_URL'] = os.environ.get('DATABASE_READ_URL')
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+    app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 500))
+    app.config['PROFILER_ENABLED'] = os.environ.get('PROFILER_ENABLED', '0') == '1'
+    app.config['PROFILER_INTERVAL'] = float(os.environ.get('PROFILER_INTERVAL', 0.01))
+    app.config['PROFILER_OUTPUT'] = os.environ.get('PROFILER_OUTPUT', os.path.join(app.instance_path, 'profile.txt'))
+    app.config['QUALITY_RULES'] = os.environ.get('QUALITY_RULES')
+    app.config['BATCH_MAX_KEYS'] = int(os.environ.get('BATCH_MAX_KEYS', BATCH_MAX_KEYS))
+    app.config['SCHEMA_CHECK'] = True
+
+    if test_config is not None:
+        app.config.update(test_config)
+
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    if app.config['DB_READ_ONLY'] and not in_memory(app.config['SQLALCHEMY_DATABASE_URI']):
+        # GET and HEAD requests read through a second pool whose connections cannot write, either on
+        # the same database or on the replica in DATABASE_READ_URL.
+        read_url = app.config['DATABASE_READ_URL'] or app.config['SQLALCHEMY_DATABASE_URI']
+        app.config['SQLALCHEMY_BINDS'] = {
+            **app.config.get('SQLALCHEMY_BINDS', {}),
+            READ_ONLY_BIND: {'url': read_url, **app.config['SQLALCHEMY_ENGINE_OPTIONS']},
+        }
+
+    if app.config['WEATHER_BACKEND'] not in WEATHER_BACKENDS:
+        raise ValueError(f"Unknown weather backend '{app.config['WEATHER_BACKEND']}'")
+    parquet_store = pathlib.Path(app.config['PARQUET_STORE']) if app.config['WEATHER_BACKEND'] == 'parquet' else None
+    app.extensions['quality_rules'] = QualityRules.from_config(app.config['QUALITY_RULES'])
 
     db.init_app(app)
 
     with app.app_context():
-        db.create_all()
+        enable_sqlite_wal(db.engine)
+        if READ_ONLY_BIND in db.engines:
+            enable_read_only(db.engines[READ_ONLY_BIND])
+        if app.config['SLOW_QUERY_MS'] > 0:
+            for engine in db.engines.values():
+                log_slow_queries(engine, app.config['SLOW_QUERY_MS'])
+        db.create_all(bind_key=None)
+        if app.config['SCHEMA_CHECK'] and weather_layout() == 'legacy':
+            raise RuntimeError("The weather table has the legacy layout, run `python migrate.py` to convert it")
+
+        station_index = None
+        if app.config['STATION_INDEX_ENABLED']:
+            station_index = StationIndexLoader(pathlib.Path(app.config['STATION_INDEX_PATH']),
+                                               app.config['STATION_INDEX_CHECK_SECONDS'])
+            # Workers starting together build the index once; the others wait for it under the lock. Opening
+            # it here also checks its version before the first request.
+            ensure_station_index(station_index.path)
+            station_index.current()
+            app.extensions['station_index'] = station_index
 
 
     Swagger(app, template_file='swagger.yaml')
 
+    stats_cache = create_response_cache(app.config['STATS_CACHE_BACKEND'], app.config['STATS_CACHE_URL'],
+                                        app.config['STATS_CACHE_SIZE'], app.config['STATS_CACHE_TTL'])
+    app.extensions['stats_cache'] = stats_cache
+    app.extensions['count_cache'] = CountCache()
+    station_locator = StationLocatorLoader()
+    app.extensions['station_locator'] = station_locator
+
+    if app.config['PROFILER_ENABLED']:
+        app.extensions['profiler'] = start_profiler(app.config['PROFILER_INTERVAL'], pathlib.Path(app.config['PROFILER_OUTPUT']))
+
+    if app.config['METRICS_ENABLED']:
+        instrument_requests(app)
+
+        @app.route('/metrics', methods=['GET'])
+        def metrics():
+            """
+            Expose the metrics of this process in the Prometheus text format.
+
+            Returns:
+                Response: Request and phase latency histograms, slow query counts and the timings of the last ingest.
+            """
+            return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+    @app.errorhandler(PaginationError)
+    @app.errorhandler(FilterError)
+    def bad_request_error(e):
+        return jsonify({'error': str(e)}), 400
+
+    @app.before_request
+    def resolve_near():
+        # The nearest stations become a station_id filter before the endpoint runs, so the filters,
+        # count keys and cache keys of the weather endpoints see the stations themselves.
+        if request.endpoint in ('weather', 'weather_export', 'weather_stats', 'weather_quality', 'yield_correlation') \
+                and request.args.get('near'):
+            request.args = near_station_args(request.args, station_locator.current())
 
     @app.route('/')
     def hello():
@@ -37,33 +411,105 @@ def create_app():
         Retrieve weather data.
 
         This endpoint retrieves weather data based on optional query parameters.
+        Passing `cursor` switches from page/per_page pagination to cursor pagination on (station, date).
+        Passing `group_by` returns `mean`/`min`/`max`/`sum` aggregates per group instead of records.
 
         Returns:
             dict: A JSON object containing weather data.
         """
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
-        station_id = request.args.get('station_id',type=str)
-        date_str = request.args.get('date', type=str)
+        filters = weather_filters(request.args)
+
+        index = None if station_index is None else station_index.current()
+        if index is not None and 'cursor' not in request.args and 'group_by' not in request.args:
+            result = index_page(index, filters, page, per_page)
+            if result is not None:
+                return json_response(dumps({
+                    'weather': rows_to_dicts(result.pop('items'), WEATHER_FIELDS),
+                    **result
+                }))
+
+        conditions = sql_conditions(Weather, filters)
+        version = dataset_version(Weather.__tablename__)
+        count_key = ('weather', version.version if version else 0, *(tuple(request.args.getlist(name)) for name in WEATHER_FILTERS))
+
+        frame = None if parquet_store is None else scan_weather(parquet_store, filters)
+        grouped = grouped_page(WEATHER_GROUPS, WEATHER_MEASURES, conditions, count_key, frame)
+        if grouped is not None:
+            return json_response(dumps(grouped))
+
+        query = select(*field_columns(WEATHER_FIELDS)).where(*conditions)
+        # The conditions only read the readings, so counting skips the join to the station names.
+        count_query = select(weather_table.c.weather_id).where(*conditions)
+
+        if 'cursor' in request.args:
+            result = cursor_page(query, [Weather.weather_station_id, Weather.date], count_key, count_query)
+            return json_response(dumps({
+                'weather': rows_to_dicts(result.pop('items'), WEATHER_FIELDS),
+                **result
+            }))
+
+        result = offset_page(query, page, per_page, count_rows(count_query))
+
+        return json_response(dumps({
+            'weather': rows_to_dicts(result.pop('items'), WEATHER_FIELDS),
+            **result
+        }))
+
+
+    @app.route('/api/weather/batch', methods=['POST'])
+    def weather_batch():
+        """
+        Retrieve the weather records of many (station, date) keys in one request.
 
-        query = Weather.query
+        The JSON body lists the `keys` as `{"station_id", "date"}` objects or `[station_id, date]`
+        pairs, up to BATCH_MAX_KEYS of them. They are resolved with one set-based query and without a count.
 
-        if station_id:
-            query = query.filter_by(weather_station_id=station_id)
-        if date_str:
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            query = query.filter_by(date=date)
+        Returns:
+            dict: A JSON object whose `weather` list holds the record of each key in request order, or
+                null for a key without a record, with the number of keys `found` and `missing`.
+        """
+        keys_df = parse_batch_keys(request.get_json(silent=True), app.config['BATCH_MAX_KEYS'])
+        records = lookup_weather(keys_df)
+        found = sum(record is not None for record in records)
+
+        return json_response(dumps({
+            'weather': records,
+            'found': found,
+            'missing': len(records) - found
+        }))
 
-        weather_query = query.paginate(page=page, per_page=per_page, error_out=False)
-        serialized_result = [result.serialize() for result in weather_query.items]
 
-        return jsonify({
-            'weather': serialized_result,
-            'page': weather_query.page,
-            'per_page': weather_query.per_page,
-            'total': weather_query.total,
-            'pages': weather_query.pages
-        }), 200, {'Content-Type': 'application/json'}
+    @app.route('/api/weather/export', methods=['GET'])
+    def weather_export():
+        """
+        Export weather data.
+
+        This endpoint exports all weather data matching the `station_id`, `date`, `start_date` and
+        `end_date` filters, ordered by station and date. NDJSON and CSV are streamed in chunks with
+        constant memory; Arrow IPC and Parquet are built as a Polars frame.
+
+        Returns:
+            Response: The exported data in the requested `format`.
+        """
+        file_format = request.args.get('format', 'ndjson', type=str)
+        if file_format not in EXPORT_FORMATS:
+            raise FilterError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+        query = select(*field_columns(WEATHER_FIELDS)).where(*weather_conditions(request.args)).order_by(
+            Weather.weather_station_id, Weather.date
+        )
+        mimetype, extension = EXPORT_FORMATS[file_format]
+        headers = {'Content-Disposition': f'attachment; filename=weather.{extension}'}
+
+        if file_format == 'ndjson':
+            return Response(stream_with_context(stream_ndjson(query, WEATHER_FIELDS)), mimetype=mimetype, headers=headers)
+        if file_format == 'csv':
+            return Response(stream_with_context(stream_csv(query, WEATHER_FIELDS)), mimetype=mimetype, headers=headers)
+
+        body = write_frame(export_frame(query, WEATHER_FIELDS), file_format)
+        return Response(body, mimetype=mimetype, headers=headers)
 
 
     @app.route('/api/weather/stats', methods=['GET'])
@@ -72,32 +518,247 @@ def create_app():
         Retrieve weather statistics.
 
         This endpoint retrieves weather statistics based on optional query parameters.
+        `period` selects yearly (default), monthly or growing-season statistics per station, or
+        regional statistics per year across all stations.
+        Passing `cursor` switches from page/per_page pagination to cursor pagination on the natural key of the period.
+        Passing `group_by` returns `mean`/`min`/`max`/`sum` aggregates per group instead of records.
+        Responses are cached until ingestion changes the statistics and carry an ETag and Last-Modified.
 
         Returns:
             dict: A JSON object containing weather statistics.
         """
+        rollup = parse_rollup(request.args)
+        version = dataset_version(rollup.name)
+        cache_key = stats_cache.key('weather_stats', version.version if version else 0, request.args.to_dict(flat=False))
+
+        body = stats_cache.get(cache_key)
+        if body is None:
+            body = weather_stats_body(rollup, version.version if version else 0)
+            stats_cache.set(cache_key, body)
+
+        return conditional_json(body, cache_key, version)
+
+    def weather_stats_body(rollup: Rollup, version: int) -> bytes:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
-        station_id = request.args.get('station_id', type=str)
-        year = request.args.get('year', type=int)
+        filters = rollup_filters(request.args, rollup)
+        conditions = sql_conditions(rollup.model, filters)
+        count_key = (rollup.name, version, *(tuple(request.args.getlist(name)) for name in ROLLUP_FILTERS))
+
+        frame = None if parquet_store is None else scan_analysis(parquet_store, rollup.model, filters)
+        grouped = grouped_page(rollup.groups, rollup.measures, conditions, count_key, frame)
+        if grouped is not None:
+            return dumps(grouped)
+
+        if frame is not None:
+            return weather_stats_frame_body(rollup, frame, filters)
+
+        query = select(*field_columns(rollup.fields)).where(*conditions)
+
+        if 'cursor' in request.args:
+            result = cursor_page(query, rollup.key_columns, count_key)
+            return dumps({
+                rollup.name: rows_to_dicts(result.pop('items'), rollup.fields),
+                **result
+            })
+
+        result = offset_page(query, page, per_page)
+
+        return dumps({
+            rollup.name: rows_to_dicts(result.pop('items'), rollup.fields),
+            **result
+        })
+
+
+    def weather_stats_frame_body(rollup: Rollup, frame: pl.LazyFrame, filters: list) -> bytes:
+        frame = frame.select(column.name for column in field_columns(rollup.fields))
+
+        if 'cursor' in request.args:
+            per_page = request.args.get('per_page', 10, type=int)
+            count_mode = request.args.get('count', 'none', type=str)
+            if count_mode not in COUNT_MODES:
+                raise PaginationError(f"count must be one of {', '.join(COUNT_MODES)}")
+
+            items, next_cursor = keyset_frame(frame, rollup.key_columns, request.args.get('cursor', type=str), per_page)
+            total = None if count_mode == 'none' else frame.select(pl.len()).collect().item()
+            return dumps({
+                rollup.name: rows_to_dicts(items, rollup.fields),
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'total': total
+            })
+
+        # Pages are returned in the order SQLite reads them for the same filters: along the
+        # natural key index for station filters, the secondary (year, ...) index for year filters
+        # and in insertion order otherwise.
+        filtered = {name for name, _, _ in filters}
+        if 'weather_station_id' in filtered:
+            order = [column.name for column in rollup.key_columns]
+        elif 'year' in filtered:
+            order = [column.name for column in rollup.index_columns]
+        else:
+            order = [rollup.fields[0][1].name]
+
+        result = offset_frame(frame.sort(order).collect(), request.args.get('page', 1, type=int),
+                              request.args.get('per_page', 10, type=int))
+        return dumps({
+            rollup.name: rows_to_dicts(result.pop('items'), rollup.fields),
+            **result
+        })
+
+
+    @app.route('/api/weather/quality', methods=['GET'])
+    def weather_quality():
+        """
+        Retrieve the results of the data-quality validation.
+
+        `view=completeness` (default) returns, per station and year, the share of days with a record and
+        the number of quarantined records. `view=quarantine` returns the records that failed validation as
+        they were read, with the rules they failed.
+
+        Returns:
+            dict: A JSON object containing the quality records.
+        """
+        view = parse_quality_view(request.args)
+        query = select(*field_columns(view.fields)).where(*quality_conditions(request.args, view)).order_by(*view.key_columns)
+        result = offset_page(query, request.args.get('page', 1, type=int), request.args.get('per_page', 10, type=int))
+
+        return json_response(dumps({
+            view.name: rows_to_dicts(result.pop('items'), view.fields),
+            **result
+        }))
+
 
-        query = WeatherAnalysis.query
+    @app.route('/api/stations', methods=['GET'])
+    def stations():
+        """
+        Retrieve the weather stations and their locations.
+
+        This endpoint lists the stations with readings, filtered by `station_id` and `state`. Passing
+        `near=<latitude>,<longitude>` returns the `k` nearest stations with a location instead, nearest
+        first, with their great-circle `distance_km`.
 
-        if station_id:
-            query = query.filter_by(weather_station_id=station_id)
-        if year:
-            query = query.filter_by(year=year)
+        Returns:
+            dict: A JSON object containing the stations.
+        """
+        query = select(*field_columns(STATION_FIELDS)).select_from(Station).outerjoin(
+            StationMetadata, StationMetadata.weather_station_id == Station.weather_station_id
+        )
+        near = parse_near(request.args)
+        if near is None:
+            query = query.where(*station_conditions(request.args)).order_by(Station.weather_station_id)
+            result = offset_page(query, request.args.get('page', 1, type=int), request.args.get('per_page', 10, type=int))
+            return json_response(dumps({
+                'stations': rows_to_dicts(result.pop('items'), STATION_FIELDS),
+                **result
+            }))
+
+        if request.args.get('station_id') or request.args.get('state'):
+            raise FilterError("near cannot be combined with station_id or state")
+        nearest = station_locator.current().nearest(*near)
+        rows = {row.weather_station_id: row for row in db.session.execute(
+            query.where(Station.weather_station_id.in_([weather_station_id for weather_station_id, _ in nearest]))
+        )}
+        nearest = [(weather_station_id, distance) for weather_station_id, distance in nearest if weather_station_id in rows]
+        items = rows_to_dicts([rows[weather_station_id] for weather_station_id, _ in nearest], STATION_FIELDS)
+        for item, (_, distance) in zip(items, nearest):
+            item['distance_km'] = round(distance, 3)
+
+        return json_response(dumps({'stations': items, 'total': len(items)}))
+
+
+    @app.route('/api/yield/correlation', methods=['GET'])
+    def yield_correlation():
+        """
+        Relate corn grain yields to the weather.
 
-        weather_analysis_query = query.paginate(page=page, per_page=per_page, error_out=False)
-        serialized_result = [result.serialize() for result in weather_analysis_query.items]
+        This endpoint joins the yearly yields with the yearly and growing-season weather statistics
+        and returns the Pearson and Spearman correlations and the regression line of the yield on each
+        weather variable. Passing `group_by=station` relates each station separately; otherwise each
+        year's statistics are averaged over the stations first. Responses are cached until ingestion
+        changes the yields or the statistics.
 
-        return jsonify({
-            'weather_analysis': serialized_result,
-            'page': weather_analysis_query.page,
-            'per_page': weather_analysis_query.per_page,
-            'total': weather_analysis_query.total,
-            'pages': weather_analysis_query.pages
-        }), 200, {'Content-Type': 'application/json'}
+        Returns:
+            dict: A JSON object containing the correlations.
+        """
+        versions = [dataset_version(name) for name in
+                    [YieldData.__tablename__] + [model.__tablename__ for model in CORRELATION_PERIODS.values()]]
+        versions = [version for version in versions if version is not None]
+        # Every ingest that changes an input bumps one of the versions, so their sum only ever grows.
+        cache_key = stats_cache.key('yield_correlation', sum(version.version for version in versions), request.args.to_dict(flat=False))
+        latest = max(versions, key=lambda version: version.updated, default=None)
+
+        body = stats_cache.get(cache_key)
+        if body is None:
+            body = yield_correlation_body()
+            stats_cache.set(cache_key, body)
+
+        return conditional_json(body, cache_key, latest)
+
+    def yield_correlation_body() -> bytes:
+        by_station = parse_choices(request.args, 'group_by', ('station',)) == ['station']
+        periods = parse_choices(request.args, 'period', CORRELATION_PERIODS, default=list(CORRELATION_PERIODS))
+        filters = weather_analysis_filters(request.args)
+
+        variables = weather_variables({
+            period: analysis_frame(CORRELATION_PERIODS[period], filters, parquet_store) for period in periods
+        })
+        df, fields = correlate(variables, yield_frame(), by_station)
+        result = offset_frame(df, request.args.get('page', 1, type=int), request.args.get('per_page', 10, type=int))
+
+        return dumps({
+            'correlations': rows_to_dicts(result.pop('items'), fields),
+            **result
+        })
+
+
+    if app.config['INGEST_API_ENABLED']:
+        ingest_jobs = IngestJobRunner(app, app.config['INGEST_JOBS_KEPT'])
+
+        @app.route('/api/ingest', methods=['POST'])
+        def start_ingest():
+            """
+            Start an ingestion job.
+
+            This endpoint runs the ingestion pipeline on a background worker. The optional JSON body
+            accepts `full`, `dry_run`, `batch_size` and `chunk_files`.
+
+            Returns:
+                dict: A JSON object describing the started job.
+            """
+            body = request.get_json(silent=True) or {}
+            options = {
+                'full': bool(body.get('full', False)),
+                'dry_run': bool(body.get('dry_run', False)),
+            }
+            if 'batch_size' in body:
+                if not isinstance(body['batch_size'], int) or body['batch_size'] < 1:
+                    return jsonify({'error': 'batch_size must be a positive integer'}), 400
+                options['batch_size'] = body['batch_size']
+            if 'chunk_files' in body:
+                if not isinstance(body['chunk_files'], int) or body['chunk_files'] < 1:
+                    return jsonify({'error': 'chunk_files must be a positive integer'}), 400
+                options['chunk_files'] = body['chunk_files']
+
+            job = ingest_jobs.submit(options)
+            if job is None:
+                return jsonify({'error': 'An ingest job is already running'}), 409
+
+            return jsonify(job.serialize()), 202, {'Location': f'/api/ingest/{job.job_id}'}
+
+        @app.route('/api/ingest/<job_id>', methods=['GET'])
+        def ingest_status(job_id):
+            """
+            Retrieve the status of an ingestion job.
+
+            Returns:
+                dict: A JSON object describing the job and its progress.
+            """
+            job = ingest_jobs.get(job_id)
+            if job is None:
+                return jsonify({'error': f'Unknown ingest job {job_id}'}), 404
+
+            return jsonify(job.serialize()), 200, {'Content-Type': 'application/json'}
 
 
     return app
@@ -105,8 +766,5 @@ def create_app():
 
 if __name__ == "__main__":
     app = create_app()
-    with app.app_context():
-        ingest_data_main()
-
-    app.run(debug=False)
+    app.run(debug=False, threaded=True)
 
@@ -0,0 +1,25 @@
+from app import create_app
+
+
+def create_asgi_app(test_config: dict | None = None):
+    """
+    Create the application wrapped for an ASGI server, e.g. `uvicorn --factory asgi:create_asgi_app`.
+
+    The endpoints stay synchronous: the adapter runs each request on a worker thread, so requests
+    are served concurrently up to the size of the connection pool. Requires the `asgiref` package.
+
+    Args:
+        test_config (dict | None): Optional configuration overriding the defaults, e.g. for tests.
+
+    Returns:
+        WsgiToAsgi: The ASGI application.
+
+    Raises:
+        ImportError: If asgiref is not installed.
+    """
+    try:
+        from asgiref.wsgi import WsgiToAsgi
+    except ImportError as e:
+        raise ImportError("The ASGI entry point requires the asgiref package: pip install asgiref") from e
+
+    return WsgiToAsgi(create_app(test_config))
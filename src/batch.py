@@ -0,0 +1,113 @@
+from datetime import date
+from typing import Any
+import polars as pl
+from sqlalchemy import Column, Integer, MetaData, String, Table, and_, select
+from filters import FilterError, parse_date_value
+from ingest_data import STAGING_BATCH_SIZE, stage_frame
+from metrics import phase
+from models import db, CompactDate, Station, weather_table
+from serialization import WEATHER_FIELDS, rows_to_dicts
+
+
+BATCH_MAX_KEYS: int = 50000
+
+
+def parse_batch_keys(body: Any, max_keys: int = BATCH_MAX_KEYS) -> pl.DataFrame:
+    """
+    Parses the keys of a batch lookup request.
+
+    The body is a JSON object whose `keys` list holds `{"station_id": ..., "date": "YYYY-MM-DD"}`
+    objects or `[station_id, date]` pairs. Keys may repeat; each one gets its own result.
+
+    Args:
+        body (Any): The decoded JSON body of the request.
+        max_keys (int): The largest number of keys accepted.
+
+    Returns:
+        pl.DataFrame: The request position, station ID and date of each key, in request order.
+
+    Raises:
+        FilterError: If the body is not an object with a list of keys, has too many keys or a key is invalid.
+    """
+    keys = body.get('keys') if isinstance(body, dict) else None
+    if not isinstance(keys, list):
+        raise FilterError("the body must be a JSON object with a list of keys")
+    if len(keys) > max_keys:
+        raise FilterError(f"at most {max_keys} keys are accepted per request")
+
+    station_ids: list[str] = []
+    dates: list[date] = []
+    for position, key in enumerate(keys):
+        if isinstance(key, dict):
+            weather_station_id, day = key.get('station_id'), key.get('date')
+        elif isinstance(key, list) and len(key) == 2:
+            weather_station_id, day = key
+        else:
+            raise FilterError(f"key {position} must be an object with station_id and date or a [station_id, date] pair")
+        if not isinstance(weather_station_id, str) or not weather_station_id:
+            raise FilterError(f"key {position} needs a station_id")
+        dates.append(parse_date_value(day, f"the date of key {position}"))
+        station_ids.append(weather_station_id)
+
+    return pl.DataFrame({
+        'position': pl.Series(range(len(keys)), dtype=pl.Int64),
+        'weather_station_id': pl.Series(station_ids, dtype=pl.String),
+        'date': pl.Series(dates, dtype=pl.Date),
+    })
+
+
+def lookup_weather(keys_df: pl.DataFrame, batch_size: int = STAGING_BATCH_SIZE) -> list[dict | None]:
+    """
+    Looks up the weather record of every (station, date) key with one query.
+
+    The keys are bulk-loaded into a temporary table and outer-joined to the stations and then to the
+    readings on the (station_id, date) unique index, so each key costs one index seek, whatever the
+    number of keys, and a key without a record still yields its row.
+
+    Args:
+        keys_df (pl.DataFrame): The position, station ID and date of each key, as returned by parse_batch_keys.
+        batch_size (int): The number of keys loaded into the temporary table per statement.
+
+    Returns:
+        list[dict | None]: The record of each key as /api/weather returns it, or None where there is
+            no record, in the order of the positions.
+    """
+    if keys_df.is_empty():
+        return []
+
+    keys = Table('batch_keys', MetaData(),
+                 Column('position', Integer, primary_key=True),
+                 Column('weather_station_id', String(80), nullable=False),
+                 Column('date', CompactDate, nullable=False),
+                 prefixes=['TEMPORARY'])
+    station = Station.__table__
+
+    connection = db.session.connection()
+    keys.drop(connection, checkfirst=True)
+    keys.create(connection)
+    stage_frame(connection, keys, keys_df.select(column.name for column in keys.columns), batch_size)
+
+    # The selected columns follow WEATHER_FIELDS; the keys supply the station and date of misses too.
+    query = select(
+        weather_table.c.weather_id,
+        keys.c.weather_station_id,
+        keys.c.date,
+        weather_table.c.max_temp,
+        weather_table.c.min_temp,
+        weather_table.c.precipitation,
+        weather_table.c.created,
+    ).select_from(
+        keys.outerjoin(station, station.c.weather_station_id == keys.c.weather_station_id).outerjoin(
+            weather_table, and_(weather_table.c.station_id == station.c.station_id, weather_table.c.date == keys.c.date)
+        )
+    ).order_by(keys.c.position)
+
+    with phase('sql'):
+        rows = connection.execute(query).all()
+    keys.drop(connection)
+    # The keys are the only writes of the transaction; committing keeps the drop from being rolled back
+    # with the session, which would leave the table on the pooled connection.
+    db.session.commit()
+
+    found = iter(rows_to_dicts([row for row in rows if row.weather_id is not None], WEATHER_FIELDS))
+    return [None if row.weather_id is None else next(found) for row in rows]
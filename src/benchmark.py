@@ -0,0 +1,964 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import platform
+import resource
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from flask import Flask
+from sqlalchemy import event
+
+
+ENDPOINT_CASES: dict[str, str] = {
+    'weather': '/api/weather',
+    'weather_station': '/api/weather?station_id=USC00110072',
+    'weather_date': '/api/weather?date=2005-04-19',
+    'weather_station_date': '/api/weather?station_id=USC00114823&date=2001-04-11',
+    'weather_deep_page': '/api/weather?page=5000&per_page=100',
+    'weather_stations_range': '/api/weather?station_id=USC00110072,USC00114823&start_date=2001-01-01&end_date=2001-12-31&per_page=100',
+    'weather_station_month_rollup': '/api/weather?group_by=station,month&per_page=100',
+    'stats': '/api/weather/stats',
+    'stats_station': '/api/weather/stats?station_id=USC00111436',
+    'stats_year': '/api/weather/stats?year=1997',
+    'stats_station_year': '/api/weather/stats?station_id=USC00111436&year=1990',
+    'stats_year_rollup': '/api/weather/stats?group_by=year&agg=mean',
+    'stats_station_months': '/api/weather/stats?period=month&station_id=USC00110072&year=2000&per_page=12',
+    'stats_season_year': '/api/weather/stats?period=season&year=2000&per_page=100',
+    'stats_region': '/api/weather/stats?period=region&per_page=100',
+    'yield_correlation_stations': '/api/yield/correlation?group_by=station&per_page=100',
+}
+
+
+def sqlite_uri(database: pathlib.Path) -> str:
+    """
+    Builds a SQLAlchemy URI for a SQLite database file.
+
+    Args:
+        database (pathlib.Path): The path to the database file.
+
+    Returns:
+        str: The database URI.
+    """
+    return f'sqlite:///{database.resolve()}'
+
+
+def time_requests(app: Flask, cases: dict[str, str], repeat: int) -> dict[str, dict[str, float]]:
+    """
+    Times GET requests against the application with the Flask test client.
+
+    Args:
+        app (Flask): The application to benchmark.
+        cases (dict[str, str]): The URLs to request, keyed by case name.
+        repeat (int): The number of timed requests per case, after one warm-up request.
+
+    Returns:
+        dict[str, dict[str, float]]: The median, p95 and max latency in milliseconds per case.
+    """
+    client = app.test_client()
+    results: dict[str, dict[str, float]] = {}
+
+    for name, url in cases.items():
+        client.get(url)
+        timings: list[float] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+
+        timings.sort()
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[max(0, int(len(timings) * .95) - 1)], 3),
+            'max_ms': round(timings[-1], 3),
+        }
+
+    return results
+
+
+def explain_requests(app: Flask, cases: dict[str, str]) -> dict[str, list[dict]]:
+    """
+    Records the SQL issued by GET requests and its SQLite query plan from EXPLAIN QUERY PLAN.
+
+    Args:
+        app (Flask): The application to inspect.
+        cases (dict[str, str]): The URLs to request, keyed by case name.
+
+    Returns:
+        dict[str, list[dict]]: Per case, each statement with the detail lines of its plan.
+    """
+    from metrics import explain_statement
+    from models import db
+
+    client = app.test_client()
+    results: dict[str, list[dict]] = {}
+
+    with app.app_context():
+        engine = db.engine
+    statements: list[tuple[str, tuple]] = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        for name, url in cases.items():
+            statements.clear()
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+            recorded = list(statements)
+
+            with engine.connect() as connection:
+                results[name] = [
+                    {
+                        'sql': ' '.join(statement.split()),
+                        'plan': explain_statement(connection.connection, engine.dialect.name, statement, parameters),
+                    }
+                    for statement, parameters in recorded
+                ]
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    return results
+
+
+def benchmark_endpoints(database: pathlib.Path, repeat: int) -> dict:
+    """
+    Measures per-endpoint latency against an existing database.
+
+    Args:
+        database (pathlib.Path): The database file to query.
+        repeat (int): The number of timed requests per endpoint.
+
+    Returns:
+        dict: The latency results per endpoint.
+    """
+    from app import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database)})
+    return {'database': str(database), 'endpoints': time_requests(app, ENDPOINT_CASES, repeat)}
+
+
+def benchmark_indexes(database: pathlib.Path, repeat: int) -> dict:
+    """
+    Measures per-endpoint latency before and after migrating a copy of a database to the indexed schema.
+
+    The given database is not modified.
+
+    Args:
+        database (pathlib.Path): The database file to copy, typically one created before the indexes existed.
+        repeat (int): The number of timed requests per endpoint.
+
+    Returns:
+        dict: The latency results before and after, and the indexes created by the migration.
+    """
+    from app import create_app
+    from migrate import migrate_indexes
+
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = pathlib.Path(tmp) / database.name
+        shutil.copyfile(database, copy)
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(copy)})
+        before = time_requests(app, ENDPOINT_CASES, repeat)
+        with app.app_context():
+            created = migrate_indexes()
+        after = time_requests(app, ENDPOINT_CASES, repeat)
+
+    return {
+        'database': str(database),
+        'indexes_created': created,
+        'before': before,
+        'after': after,
+    }
+
+
+def legacy_wx_consolidation(folderpath: pathlib.Path):
+    """
+    The original loader: one eager read_csv and cleanse per station file, concatenated at the end.
+
+    Kept only as the baseline for the loader benchmark.
+
+    Args:
+        folderpath (pathlib.Path): The path to the folder containing weather data files.
+
+    Returns:
+        pl.DataFrame: The consolidated weather dataframe.
+    """
+    import polars as pl
+    from ingest_data import wx_consolidation_cleanse
+
+    df = []
+    for file in folderpath.iterdir():
+        if file.is_file():
+            temp_df = pl.read_csv(file, separator='\t', new_columns=["date", "max_temp", "min_temp", "precipitation"])
+            df.append(wx_consolidation_cleanse(temp_df, file.stem))
+
+    return pl.concat(df)
+
+
+def _run_loader(loader: str, folderpath: pathlib.Path) -> dict:
+    """
+    Loads the weather data and the yearly analysis with one loader, in a fresh process.
+
+    Args:
+        loader (str): 'legacy' or 'lazy'.
+        folderpath (pathlib.Path): The path to the folder containing weather data files.
+
+    Returns:
+        dict: The wall-clock seconds, peak RSS in MiB, the part of the peak RSS added by loading and the number of rows loaded.
+    """
+    from ingest_data import scan_wx_data, weather_analysis
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if loader == 'legacy':
+        wx_df = legacy_wx_consolidation(folderpath)
+    else:
+        wx_df = scan_wx_data(folderpath).collect(streaming=True)
+    weather_analysis(wx_df)
+    seconds = time.perf_counter() - start
+
+    return {
+        'seconds': round(seconds, 3),
+        'peak_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'loader_rss_mib': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024, 1),
+        'rows': wx_df.height,
+    }
+
+
+def benchmark_loader(folderpath: pathlib.Path) -> dict:
+    """
+    Compares the wall-clock time and peak memory of the legacy and the lazy weather loaders.
+
+    Each loader runs in its own process so its peak RSS is measured in isolation.
+
+    Args:
+        folderpath (pathlib.Path): The path to the folder containing weather data files.
+
+    Returns:
+        dict: The results per loader.
+    """
+    context = multiprocessing.get_context('spawn')
+    results: dict[str, dict] = {}
+    for loader in ('legacy', 'lazy'):
+        with context.Pool(1) as pool:
+            results[loader] = pool.apply(_run_loader, (loader, folderpath))
+
+    return {'wx_data': str(folderpath), 'loaders': results}
+
+
+def benchmark_serialization(database: pathlib.Path, rows: int, repeat: int) -> dict:
+    """
+    Measures how many weather rows per second each read path fetches and serializes to JSON.
+
+    The ORM path builds Weather objects and calls serialize() before jsonify, as the endpoints used to;
+    the Core path selects tuples and serializes them with serialization.dumps.
+
+    Args:
+        database (pathlib.Path): The database file to read from.
+        rows (int): The number of rows fetched per run.
+        repeat (int): The number of timed runs per path.
+
+    Returns:
+        dict: The median seconds and rows per second per path.
+    """
+    from flask import jsonify
+    from sqlalchemy import select
+    from app import create_app
+    from models import db, Weather
+    from serialization import WEATHER_FIELDS, dumps, field_columns, rows_to_dicts
+
+    def orm_path():
+        return jsonify({'weather': [row.serialize() for row in Weather.query.limit(rows).all()]}).get_data()
+
+    def core_path():
+        result = db.session.execute(select(*field_columns(WEATHER_FIELDS)).limit(rows)).all()
+        return dumps({'weather': rows_to_dicts(result, WEATHER_FIELDS)})
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database)})
+    results: dict[str, dict] = {}
+    with app.app_context():
+        if orm_path() != core_path():
+            raise RuntimeError("The ORM and Core read paths produce different output")
+
+        for name, path in (('orm', orm_path), ('core', core_path)):
+            timings: list[float] = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                path()
+                timings.append(time.perf_counter() - start)
+            median = statistics.median(timings)
+            results[name] = {'median_seconds': round(median, 4), 'rows_per_second': round(rows / median)}
+
+    return {'database': str(database), 'rows': rows, 'paths': results}
+
+
+COLUMNAR_CASES: dict[str, str] = {
+    'station_history_yearly': '/api/weather?station_id=USC00110072&group_by=year',
+    'station_history_monthly': '/api/weather?station_id=USC00110072&group_by=month&per_page=500',
+    'stations_history_yearly': '/api/weather?station_id=USC00110072,USC00110187,USC00110338,USC00111280,USC00111436&group_by=station,year&per_page=500',
+    'decade_daily': '/api/weather?start_date=2000-01-01&end_date=2009-12-31&group_by=day&agg=mean&per_page=500',
+    'all_stations_yearly': '/api/weather?group_by=station,year&per_page=500',
+    'stats_yearly': '/api/weather/stats?group_by=year&per_page=50',
+}
+
+
+def benchmark_columnar(database: pathlib.Path, store: pathlib.Path | None, repeat: int) -> dict:
+    """
+    Compares the SQLite and Parquet backends on full-history station queries and rollups.
+
+    Besides the endpoint latencies, it times reading the full history of one station, every column,
+    straight from each store. Both backends must return identical responses.
+
+    Args:
+        database (pathlib.Path): The database file to query.
+        store (pathlib.Path | None): The columnar store to query; it is built from the database in a
+            temporary folder if None.
+        repeat (int): The number of timed requests per case.
+
+    Returns:
+        dict: The store sizes and the latency results per backend.
+    """
+    from sqlalchemy import select
+    from app import create_app
+    from columnar import export_store, scan_weather
+    from models import db, Weather
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database), 'STATS_CACHE_BACKEND': 'none'})
+        if store is None:
+            store = pathlib.Path(tmp)
+            with sqlite_app.app_context():
+                export_store(store)
+        parquet_app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database), 'STATS_CACHE_BACKEND': 'none',
+                                  'WEATHER_BACKEND': 'parquet', 'PARQUET_STORE': str(store)})
+
+        sqlite_client, parquet_client = sqlite_app.test_client(), parquet_app.test_client()
+        for url in COLUMNAR_CASES.values():
+            if sqlite_client.get(url).get_data() != parquet_client.get(url).get_data():
+                raise RuntimeError(f"The SQLite and Parquet backends return different responses for {url}")
+
+        def sqlite_history():
+            query = select(Weather.date, Weather.max_temp, Weather.min_temp, Weather.precipitation).where(
+                Weather.weather_station_id == 'USC00110072')
+            return db.session.execute(query).all()
+
+        def parquet_history():
+            return scan_weather(store, [('weather_station_id', '==', 'USC00110072')]).collect()
+
+        history: dict[str, dict] = {}
+        with sqlite_app.app_context():
+            for name, read in (('sqlite', sqlite_history), ('parquet', parquet_history)):
+                read()
+                timings: list[float] = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    read()
+                    timings.append((time.perf_counter() - start) * 1000)
+                history[name] = {'median_ms': round(statistics.median(timings), 3)}
+
+        return {
+            'database': str(database),
+            'database_bytes': database.stat().st_size,
+            'store_bytes': sum(file.stat().st_size for file in store.rglob('*.parquet')),
+            'station_history_read': history,
+            'sqlite': time_requests(sqlite_app, COLUMNAR_CASES, repeat),
+            'parquet': time_requests(parquet_app, COLUMNAR_CASES, repeat),
+        }
+
+
+STATION_INDEX_CASES: dict[str, str] = {
+    'station_date': '/api/weather?station_id=USC00114823&date=2001-04-11',
+    'station': '/api/weather?station_id=USC00110072',
+    'station_deep_page': '/api/weather?station_id=USC00110072&page=300&per_page=30',
+    'station_range': '/api/weather?station_id=USC00110072&start_date=2001-01-01&end_date=2001-12-31&per_page=100',
+}
+
+
+def benchmark_station_index(database: pathlib.Path, repeat: int) -> dict:
+    """
+    Compares per-station lookups answered by SQLite with lookups answered by the station index.
+
+    The index is built from the database in a temporary folder.
+
+    Args:
+        database (pathlib.Path): The database file to query.
+        repeat (int): The number of timed requests per case.
+
+    Returns:
+        dict: The index build time and size and the latency results with and without the index.
+    """
+    from app import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = pathlib.Path(tmp) / 'station_index.bin'
+        sqlite_app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database)})
+
+        start = time.perf_counter()
+        index_app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database), 'STATION_INDEX_ENABLED': True,
+                                'STATION_INDEX_PATH': str(index_path)})
+        build_seconds = time.perf_counter() - start
+
+        sqlite_client, index_client = sqlite_app.test_client(), index_app.test_client()
+        for url in STATION_INDEX_CASES.values():
+            if sqlite_client.get(url).get_data() != index_client.get(url).get_data():
+                raise RuntimeError(f"SQLite and the station index return different responses for {url}")
+
+        return {
+            'database': str(database),
+            'build_seconds': round(build_seconds, 3),
+            'index_bytes': index_path.stat().st_size,
+            'sqlite': time_requests(sqlite_app, STATION_INDEX_CASES, repeat),
+            'station_index': time_requests(index_app, STATION_INDEX_CASES, repeat),
+        }
+
+
+# Reads every reading once, the cost a full-history statistic pays for the storage layout.
+SCAN_QUERY: str = 'SELECT count(*), sum(max_temp), sum(min_temp), sum(precipitation) FROM weather'
+
+
+def database_bytes(database: pathlib.Path) -> int:
+    """
+    Measures the size of a SQLite database file after checkpointing its write-ahead log into it.
+
+    Args:
+        database (pathlib.Path): The database file.
+
+    Returns:
+        int: The size of the file in bytes.
+    """
+    connection = sqlite3.connect(database)
+    connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    connection.close()
+
+    return database.stat().st_size
+
+
+def time_scan(database: pathlib.Path, repeat: int) -> dict[str, float]:
+    """
+    Times full scans of the weather table with SCAN_QUERY.
+
+    Args:
+        database (pathlib.Path): The database file.
+        repeat (int): The number of timed scans, after one warm-up scan.
+
+    Returns:
+        dict[str, float]: The median and fastest scan in milliseconds.
+    """
+    connection = sqlite3.connect(database)
+    connection.execute(SCAN_QUERY).fetchall()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        connection.execute(SCAN_QUERY).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    connection.close()
+
+    return {'median_ms': round(statistics.median(timings), 3), 'min_ms': round(min(timings), 3)}
+
+
+def benchmark_storage(database: pathlib.Path, repeat: int) -> dict:
+    """
+    Compares the file size, scan time and endpoint latency of a database in each weather table layout.
+
+    A vacuumed copy of the database is measured as it is, then migrated copies in the compact rowid layout
+    and in the WITHOUT ROWID layout clustered on (station_id, date). The given database is not modified.
+
+    Args:
+        database (pathlib.Path): The database file to copy, typically one in the legacy layout.
+        repeat (int): The number of timed scans and requests per case.
+
+    Returns:
+        dict: The size, scan time, migration time and endpoint latency per layout.
+    """
+    from app import create_app
+    from migrate import migrate_main, weather_layout
+
+    results: dict = {'database': str(database), 'layouts': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        original = pathlib.Path(tmp) / 'original.db'
+        shutil.copyfile(database, original)
+        connection = sqlite3.connect(original)
+        connection.execute('VACUUM')
+        connection.close()
+
+        migrate_config = {'SCHEMA_CHECK': False, 'STATION_INDEX_ENABLED': False}
+        with create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(original), **migrate_config}).app_context():
+            layout = weather_layout()
+        results['layouts'][f'original ({layout})'] = {
+            'bytes': database_bytes(original),
+            'scan': time_scan(original, repeat),
+            'endpoints': None if layout == 'legacy' else time_requests(
+                create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(original)}), ENDPOINT_CASES, repeat),
+        }
+
+        for name, without_rowid in (('rowid', False), ('without_rowid', True)):
+            copy = pathlib.Path(tmp) / f'{name}.db'
+            shutil.copyfile(original, copy)
+            start = time.perf_counter()
+            with create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(copy), **migrate_config}).app_context():
+                migrate_main(without_rowid)
+            migrate_seconds = time.perf_counter() - start
+
+            results['layouts'][name] = {
+                'bytes': database_bytes(copy),
+                'migrate_seconds': round(migrate_seconds, 3),
+                'scan': time_scan(copy, repeat),
+                'endpoints': time_requests(create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(copy)}), ENDPOINT_CASES, repeat),
+            }
+
+    return results
+
+
+# Page sizes and filter combinations of the endpoint matrix; every filter set is requested at every page size.
+MATRIX_PER_PAGE: tuple[int, ...] = (10, 100, 1000)
+# Stations of the real data set that filtered matrix cases request; synthetic data sets substitute their own.
+MATRIX_STATIONS: tuple[str, str] = ('USC00110072', 'USC00114823')
+MATRIX_FILTERS: dict[str, tuple[str, str]] = {
+    'weather': ('/api/weather', ''),
+    'weather_station': ('/api/weather', 'station_id={station}'),
+    'weather_date': ('/api/weather', 'date=2005-04-19'),
+    'weather_station_range': ('/api/weather', 'station_id={station}&start_date=2000-01-01&end_date=2004-12-31'),
+    'weather_stations_range': ('/api/weather', 'station_id={station},{other_station}&start_date=2001-01-01&end_date=2001-12-31'),
+    'weather_cursor': ('/api/weather', 'cursor='),
+    'weather_station_year_rollup': ('/api/weather', 'station_id={station}&group_by=year'),
+    'stats': ('/api/weather/stats', ''),
+    'stats_station': ('/api/weather/stats', 'station_id={other_station}'),
+    'stats_year': ('/api/weather/stats', 'year=1997'),
+    'stats_year_range': ('/api/weather/stats', 'start_year=1990&end_year=1999'),
+    'stats_month': ('/api/weather/stats', 'period=month&year=2000'),
+    'stats_season': ('/api/weather/stats', 'period=season&station_id={station}'),
+    'stats_region': ('/api/weather/stats', 'period=region'),
+    'yield_correlation': ('/api/yield/correlation', 'group_by=station'),
+}
+# Result keys that measure time; larger values of these are regressions.
+TIMING_KEYS: tuple[str, ...] = ('seconds', 'median_ms', 'p95_ms', 'p99_ms')
+
+
+def endpoint_matrix(per_pages: tuple[int, ...] = MATRIX_PER_PAGE, stations: tuple[str, str] = MATRIX_STATIONS) -> dict[str, str]:
+    """
+    Builds the endpoint cases of every filter combination at every page size.
+
+    Args:
+        per_pages (tuple[int, ...]): The page sizes.
+        stations (tuple[str, str]): The two stations that station filters request.
+
+    Returns:
+        dict[str, str]: The URLs, keyed by `<filters>_per_page_<size>`.
+    """
+    cases: dict[str, str] = {}
+    for name, (path, query) in MATRIX_FILTERS.items():
+        query = query.format(station=stations[0], other_station=stations[1])
+        for per_page in per_pages:
+            cases[f'{name}_per_page_{per_page}'] = f"{path}?{'&'.join(filter(None, [query, f'per_page={per_page}']))}"
+
+    return cases
+
+
+def scale_wx_data(source: pathlib.Path, target: pathlib.Path, factor: int) -> int:
+    """
+    Builds a weather data folder `factor` times the size of source by repeating its station files.
+
+    Copy 0 keeps the original station IDs and copy n appends `S<n>` to them, so filters on the
+    original stations still match. Files are hard-linked where the file system allows it.
+
+    Args:
+        source (pathlib.Path): The weather data folder to scale.
+        target (pathlib.Path): The folder to create.
+        factor (int): The number of copies of every station.
+
+    Returns:
+        int: The number of station files in target.
+    """
+    target.mkdir(parents=True, exist_ok=True)
+    num_files = 0
+    for file in sorted(source.iterdir()):
+        if not file.is_file():
+            continue
+        for copy in range(factor):
+            destination = target / (file.name if copy == 0 else f'{file.stem}S{copy:03d}{file.suffix}')
+            try:
+                os.link(file, destination)
+            except OSError:
+                shutil.copyfile(file, destination)
+            num_files += 1
+
+    return num_files
+
+
+def _run_stages(wx_data: pathlib.Path, yld_data: pathlib.Path, database: pathlib.Path, batch_size: int) -> dict:
+    """
+    Runs the ingestion pipeline stage by stage into an empty database, in a fresh process.
+
+    Args:
+        wx_data (pathlib.Path): The weather data folder.
+        yld_data (pathlib.Path): The yield data file.
+        database (pathlib.Path): The database file to create.
+        batch_size (int): The number of rows staged per statement.
+
+    Returns:
+        dict: The number of rows, the database size and the seconds, peak RSS and RSS growth of every stage.
+    """
+    from app import create_app
+    from ingest_data import push_raw_data, push_rollups, push_weather_analysis, weather_analysis, wx_consolidation, yld_consolidation
+    from models import db
+
+    stages: dict[str, dict] = {}
+
+    def measure(name: str, function, *args):
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        result = function(*args)
+        # The push helpers leave the commit to their caller; it belongs to the cost of the stage.
+        db.session.commit()
+        seconds = time.perf_counter() - start
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stages[name] = {
+            'seconds': round(seconds, 3),
+            'peak_rss_mib': round(after / 1024, 1),
+            'rss_growth_mib': round((after - before) / 1024, 1),
+        }
+        return result
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database), 'STATS_CACHE_BACKEND': 'none'})
+    with app.app_context():
+        wx_df = measure('wx_consolidation', wx_consolidation, wx_data)
+        wx_analysis_df = measure('weather_analysis', weather_analysis, wx_df)
+        measure('push_raw_data', push_raw_data, wx_df, yld_consolidation(yld_data), False, batch_size)
+        measure('push_weather_analysis', push_weather_analysis, wx_analysis_df, batch_size)
+        measure('push_rollups', push_rollups, wx_df, wx_df, batch_size)
+
+    return {'rows': wx_df.height, 'database_bytes': database.stat().st_size, 'stages': stages}
+
+
+def benchmark_stages(wx_data: pathlib.Path, yld_data: pathlib.Path, database: pathlib.Path, batch_size: int) -> dict:
+    """
+    Measures every stage of the ingestion pipeline separately, in its own process so peak RSS is isolated.
+
+    Args:
+        wx_data (pathlib.Path): The weather data folder.
+        yld_data (pathlib.Path): The yield data file.
+        database (pathlib.Path): The database file to create; it must not exist yet.
+        batch_size (int): The number of rows staged per statement.
+
+    Returns:
+        dict: The results of _run_stages.
+    """
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(_run_stages, (wx_data, yld_data, database, batch_size))
+
+
+def benchmark_suite(wx_data: pathlib.Path, yld_data: pathlib.Path, scales: list[int], repeat: int, batch_size: int,
+                    synthetic: bool = False) -> dict:
+    """
+    Runs the ingestion stages and the endpoint matrix on weather data scaled by each factor.
+
+    Every scale is ingested into a fresh database in a temporary folder, which is then benchmarked
+    with the endpoint matrix. Synthetic runs generate `scale` times as many stations as the source
+    folder holds, over the same 30 years, instead of repeating its files.
+
+    Args:
+        wx_data (pathlib.Path): The weather data folder to scale.
+        yld_data (pathlib.Path): The yield data file.
+        scales (list[int]): The scale factors, e.g. 1, 10 and 100.
+        repeat (int): The number of timed requests per endpoint case.
+        batch_size (int): The number of rows staged per statement.
+        synthetic (bool): Whether to benchmark on synthetic data instead of copies of wx_data.
+
+    Returns:
+        dict: The environment of the run and the stage and endpoint results per scale.
+    """
+    from app import create_app
+    from synthetic import SYNTHETIC_YEARS, YIELD_FILE, generate_wx_data, generate_yld_data, station_ids
+
+    num_stations = sum(1 for file in wx_data.iterdir() if file.is_file())
+    results: dict[str, dict] = {}
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = pathlib.Path(tmp)
+            scaled, yields, stations = wx_data, yld_data, MATRIX_STATIONS
+            if synthetic:
+                scaled, yields, stations = root / 'wx_data', root / 'yld_data' / YIELD_FILE, tuple(station_ids(2))
+                generate_wx_data(scaled, num_stations * scale, SYNTHETIC_YEARS)
+                generate_yld_data(yields, SYNTHETIC_YEARS)
+            elif scale != 1:
+                scaled = root / 'wx_data'
+                scale_wx_data(wx_data, scaled, scale)
+            database = root / 'database.db'
+
+            ingest = benchmark_stages(scaled, yields, database, batch_size)
+            app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database), 'STATS_CACHE_BACKEND': 'none'})
+            results[f'x{scale}'] = {'ingest': ingest, 'endpoints': time_requests(app, endpoint_matrix(stations=stations), repeat)}
+
+    return {'environment': environment(), 'wx_data': 'synthetic' if synthetic else str(wx_data), 'repeat': repeat,
+            'scales': results}
+
+
+def environment() -> dict:
+    """
+    Describes where a benchmark ran, so results from different machines or commits are not confused.
+
+    Returns:
+        dict: The time, commit, Python and Polars versions, platform and CPU count.
+    """
+    import polars as pl
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=pathlib.Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'polars': pl.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float, path: str = '') -> list[dict]:
+    """
+    Finds the timings of a benchmark result that regressed against a baseline result of the same benchmark.
+
+    Both results are walked together; only timing keys present in both are compared.
+
+    Args:
+        baseline (dict): The earlier result.
+        current (dict): The result to check.
+        threshold (float): The relative slowdown tolerated, e.g. 0.2 for 20%.
+        path (str): The dotted path of the dicts being compared, for the report.
+
+    Returns:
+        list[dict]: The path, baseline and current value and relative change of every regression.
+    """
+    regressions: list[dict] = []
+    for key, value in current.items():
+        if key not in baseline:
+            continue
+        name = f'{path}.{key}' if path else key
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            regressions.extend(compare_results(baseline[key], value, threshold, name))
+        elif key in TIMING_KEYS and isinstance(value, (int, float)) and baseline[key]:
+            change = (value - baseline[key]) / baseline[key]
+            if change > threshold:
+                regressions.append({'path': name, 'baseline': baseline[key], 'current': value, 'change': round(change, 3)})
+
+    return regressions
+
+
+# A mix of indexed lookups, statistics and rollups, requested round-robin by every load test client.
+LOAD_CASES: list[str] = [
+    '/api/weather?station_id=USC00110072',
+    '/api/weather?station_id=USC00114823&date=2001-04-11',
+    '/api/weather?date=2005-04-19',
+    '/api/weather/stats?station_id=USC00111436',
+    '/api/weather/stats?period=month&station_id=USC00110072&year=2000&per_page=12',
+    '/api/weather/stats?period=region&per_page=100',
+]
+
+
+def load_test(base_url: str, paths: list[str], clients: int, duration: float) -> dict:
+    """
+    Requests paths from a running server with concurrent clients for a fixed time.
+
+    Each client is a thread that sends its next request as soon as the previous one completes.
+
+    Args:
+        base_url (str): The server's URL, e.g. http://127.0.0.1:5000.
+        paths (list[str]): The paths to request, round-robin.
+        clients (int): The number of concurrent clients.
+        duration (float): The number of seconds to keep requesting.
+
+    Returns:
+        dict: The number of requests and errors, the throughput and the median, p95 and p99 latency in milliseconds.
+    """
+    timings: list[list[float]] = [[] for _ in range(clients)]
+    errors = [0] * clients
+    deadline = time.perf_counter() + duration
+
+    def client(index: int):
+        position = index
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + paths[position % len(paths)]) as response:
+                    response.read()
+                timings[index].append((time.perf_counter() - start) * 1000)
+            except (urllib.error.URLError, OSError):
+                errors[index] += 1
+            position += 1
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(timing for client_timings in timings for timing in client_timings)
+    if not latencies:
+        return {'clients': clients, 'requests': 0, 'errors': sum(errors)}
+
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'median_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(latencies[max(0, int(len(latencies) * .95) - 1)], 3),
+        'p99_ms': round(latencies[max(0, int(len(latencies) * .99) - 1)], 3),
+    }
+
+
+def serve(database: pathlib.Path, ports: multiprocessing.Queue):
+    """
+    Serves the application with Werkzeug's threaded server on a free local port; runs in a child process.
+
+    Args:
+        database (pathlib.Path): The database file to serve.
+        ports (multiprocessing.Queue): Receives the port once the server listens.
+    """
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(database), 'DB_READ_ONLY': True})
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+def benchmark_load(database: pathlib.Path, url: str | None, clients: list[int], duration: float) -> dict:
+    """
+    Measures throughput and latency at increasing numbers of concurrent clients.
+
+    Without url, the application is served from a child process by Werkzeug's threaded server,
+    with pooled read-only connections on the database, so the clients do not compete with it for the GIL.
+
+    Args:
+        database (pathlib.Path): The database file to serve when no url is given.
+        url (str | None): The base URL of an already running server, e.g. gunicorn or uvicorn.
+        clients (list[int]): The numbers of concurrent clients to test, in order.
+        duration (float): The number of seconds each level runs.
+
+    Returns:
+        dict: The results per number of clients.
+    """
+    process = None
+    if url is None:
+        ports = multiprocessing.Queue()
+        process = multiprocessing.Process(target=serve, args=(database, ports), daemon=True)
+        process.start()
+        url = f'http://127.0.0.1:{ports.get(timeout=120)}'
+
+    try:
+        load_test(url, LOAD_CASES, 1, 1)
+        levels = [load_test(url, LOAD_CASES, level, duration) for level in clients]
+    finally:
+        if process is not None:
+            process.terminate()
+            process.join()
+
+    return {'url': url, 'duration_seconds': duration, 'levels': levels}
+
+
+def main():
+    """
+    Command-line entry point; prints the results of the chosen benchmark as JSON.
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks for the weather API and ingestion pipeline.')
+    parser.add_argument('--database', type=pathlib.Path, default=pathlib.Path('instance') / 'database.db',
+                        help='SQLite database file to benchmark against')
+    parser.add_argument('--repeat', type=int, default=20, help='timed repetitions per case')
+    parser.add_argument('--output', type=pathlib.Path, default=None, help='also write the JSON results to this file')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    subparsers.add_parser('endpoints', help='per-endpoint latency')
+    subparsers.add_parser('indexes', help='per-endpoint latency before and after the index migration')
+    subparsers.add_parser('plans', help='SQLite query plans of the statements issued by each endpoint case')
+    loader_parser = subparsers.add_parser('loader', help='wall-clock time and peak RSS of the weather file loaders')
+    loader_parser.add_argument('--wx-data', type=pathlib.Path, default=None, help='weather data folder')
+    columnar_parser = subparsers.add_parser('columnar', help='SQLite against Parquet backend latency on full-history queries')
+    columnar_parser.add_argument('--store', type=pathlib.Path, default=None,
+                                 help='existing columnar store, built from the database if omitted')
+    subparsers.add_parser('station_index', help='per-station lookup latency with and without the station index')
+    subparsers.add_parser('storage', help='file size, scan time and latency of the weather table layouts')
+    serialize_parser = subparsers.add_parser('serialize', help='rows per second fetched and serialized by the read paths')
+    serialize_parser.add_argument('--rows', type=int, default=10_000, help='rows fetched per run')
+    load_parser = subparsers.add_parser('load', help='throughput and latency at 1, 8 and 64 concurrent clients')
+    load_parser.add_argument('--url', type=str, default=None,
+                             help='base URL of a running server, served locally from the database if omitted')
+    load_parser.add_argument('--clients', type=str, default='1,8,64', help='comma-separated numbers of concurrent clients')
+    load_parser.add_argument('--duration', type=float, default=10, help='seconds per number of clients')
+    suite_parser = subparsers.add_parser('suite', help='ingestion stages and endpoint matrix on scaled weather data')
+    suite_parser.add_argument('--wx-data', type=pathlib.Path, default=None, help='weather data folder to scale')
+    suite_parser.add_argument('--yld-data', type=pathlib.Path, default=None, help='yield data file')
+    suite_parser.add_argument('--scales', type=str, default='1,10,100', help='comma-separated scale factors')
+    suite_parser.add_argument('--batch-size', type=int, default=None, help='rows staged per statement')
+    suite_parser.add_argument('--synthetic', action='store_true',
+                              help='generate scale times as many synthetic stations instead of copying wx-data')
+    compare_parser = subparsers.add_parser('compare', help='timings of a result that regressed against a baseline result')
+    compare_parser.add_argument('baseline', type=pathlib.Path, help='JSON result of an earlier run')
+    compare_parser.add_argument('current', type=pathlib.Path, help='JSON result to check')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown tolerated')
+    args = parser.parse_args()
+
+    if args.benchmark == 'endpoints':
+        results = benchmark_endpoints(args.database, args.repeat)
+    elif args.benchmark == 'indexes':
+        results = benchmark_indexes(args.database, args.repeat)
+    elif args.benchmark == 'plans':
+        from app import create_app
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': sqlite_uri(args.database)})
+        results = {'database': str(args.database), 'plans': explain_requests(app, ENDPOINT_CASES)}
+    elif args.benchmark == 'loader':
+        from ingest_data import WX_DATA
+
+        results = benchmark_loader(args.wx_data or WX_DATA)
+    elif args.benchmark == 'columnar':
+        results = benchmark_columnar(args.database, args.store, args.repeat)
+    elif args.benchmark == 'station_index':
+        results = benchmark_station_index(args.database, args.repeat)
+    elif args.benchmark == 'storage':
+        results = benchmark_storage(args.database, args.repeat)
+    elif args.benchmark == 'serialize':
+        results = benchmark_serialization(args.database, args.rows, args.repeat)
+    elif args.benchmark == 'load':
+        results = benchmark_load(args.database, args.url, [int(value) for value in args.clients.split(',')], args.duration)
+    elif args.benchmark == 'suite':
+        from ingest_data import STAGING_BATCH_SIZE, WX_DATA, YLD_DATA
+
+        results = benchmark_suite(args.wx_data or WX_DATA, args.yld_data or YLD_DATA,
+                                  [int(value) for value in args.scales.split(',')], args.repeat,
+                                  args.batch_size or STAGING_BATCH_SIZE, args.synthetic)
+    elif args.benchmark == 'compare':
+        regressions = compare_results(json.loads(args.baseline.read_text()), json.loads(args.current.read_text()), args.threshold)
+        results = {'threshold': args.threshold, 'regressions': regressions}
+
+    print(json.dumps(results, indent=2))
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.benchmark == 'compare' and results['regressions']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pytz import timezone
+from sqlalchemy import update
+from models import db, DatasetVersion
+
+
+def dataset_version(name: str) -> DatasetVersion | None:
+    """
+    Looks up the current version of a dataset.
+
+    Args:
+        name (str): The name of the dataset.
+
+    Returns:
+        DatasetVersion | None: The version, or None if the dataset was never ingested.
+    """
+    return db.session.query(DatasetVersion).filter_by(name=name).one_or_none()
+
+
+def bump_dataset_version(name: str):
+    """
+    Marks a dataset as changed, invalidating every cached response built from an older version.
+
+    The caller commits the session, so the bump lands in the same transaction as the data.
+
+    Args:
+        name (str): The name of the dataset.
+    """
+    now = datetime.now(timezone('UTC'))
+    result = db.session.execute(
+        update(DatasetVersion).where(DatasetVersion.name == name).values(version=DatasetVersion.version + 1, updated=now)
+    )
+    if result.rowcount == 0:
+        db.session.add(DatasetVersion(name, 1, now))
+
+
+class MemoryBackend:
+    """
+    An in-process LRU cache whose entries also expire after a time to live.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept.
+        ttl (float): The number of seconds an entry stays valid.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """
+    A cache backend on a Redis server, shared by every worker process.
+
+    Any client with the get, set(..., ex=...), scan_iter and delete methods of redis.Redis can be used.
+
+    Attributes:
+        client: The Redis client.
+        ttl (float): The number of seconds an entry stays valid.
+        prefix (str): The prefix of every key written by this backend.
+    """
+    def __init__(self, client, ttl: float = 3600, prefix: str = 'weather-api:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float = 3600) -> 'RedisBackend':
+        """
+        Connects to a Redis server.
+
+        Args:
+            url (str): The Redis URL, e.g. redis://localhost:6379/0.
+            ttl (float): The number of seconds an entry stays valid.
+
+        Returns:
+            RedisBackend: The backend.
+
+        Raises:
+            ImportError: If the redis package is not installed.
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The redis cache backend requires the 'redis' package") from e
+
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes):
+        self.client.set(self.prefix + key, value, ex=int(self.ttl))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResponseCache:
+    """
+    Caches serialized API responses under keys derived from the dataset version and the normalized query.
+
+    Because the version is part of the key, a bump by ingestion makes every older entry unreachable
+    without having to reach the caches of other worker processes.
+
+    Attributes:
+        backend: The storage backend, MemoryBackend, RedisBackend or None to disable caching.
+    """
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    @staticmethod
+    def key(endpoint: str, version: int, args: dict[str, str | list[str]]) -> str:
+        """
+        Builds the cache key of a request.
+
+        Args:
+            endpoint (str): The name of the endpoint.
+            version (int): The version of the dataset the endpoint serves.
+            args (dict[str, str | list[str]]): The query arguments of the request, every value of a
+                repeated argument in request order, e.g. `request.args.to_dict(flat=False)`.
+
+        Returns:
+            str: The key; it doubles as the strong ETag of the response.
+        """
+        normalized = '&'.join(f'{name}={value}' for name, values in sorted(args.items())
+                              for value in ([values] if isinstance(values, str) else values) if value != '')
+        return hashlib.sha1(f'{endpoint}:{version}:{normalized}'.encode()).hexdigest()
+
+    def get(self, key: str) -> bytes | None:
+        if self.backend is None:
+            return None
+        return self.backend.get(key)
+
+    def set(self, key: str, value: bytes):
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def create_response_cache(backend: str, url: str | None = None, maxsize: int = 1024, ttl: float = 3600) -> ResponseCache:
+    """
+    Creates a response cache from configuration values.
+
+    Args:
+        backend (str): 'memory', 'redis' or 'none'.
+        url (str | None): The Redis URL for the redis backend.
+        maxsize (int): The maximum number of entries of the memory backend.
+        ttl (float): The number of seconds an entry stays valid.
+
+    Returns:
+        ResponseCache: The cache.
+
+    Raises:
+        ValueError: If the backend is unknown or the redis backend has no URL.
+    """
+    if backend == 'memory':
+        return ResponseCache(MemoryBackend(maxsize, ttl))
+    if backend == 'redis':
+        if not url:
+            raise ValueError("The redis cache backend requires a URL")
+        return ResponseCache(RedisBackend.from_url(url, ttl))
+    if backend == 'none':
+        return ResponseCache(None)
+
+    raise ValueError(f"Unknown cache backend '{backend}'")
@@ -0,0 +1,312 @@
+import os
+import pathlib
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import polars as pl
+from sqlalchemy import DateTime, Integer, select
+from filters import Filter
+from models import db, RegionalAnalysis, Weather, WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis
+import logging
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WEATHER_BACKENDS: tuple[str, ...] = ('sqlite', 'parquet')
+WEATHER_STORE: str = 'weather'
+PARTITION_FILE: str = 'part-0.parquet'
+# Station IDs that can be used in a partition path; others cannot have been written and match nothing.
+STATION_ID_PATTERN: re.Pattern = re.compile(r'[A-Za-z0-9_-]+')
+PARTITION_SCHEMA: dict[str, pl.DataType] = {
+    'date': pl.Date,
+    'max_temp': pl.Int32,
+    'min_temp': pl.Int32,
+    'precipitation': pl.Int32,
+}
+# The statistics tables, each kept as a single snapshot file named after the table.
+ANALYSIS_MODELS: tuple[type[db.Model], ...] = (WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis, RegionalAnalysis)
+
+
+def partition_path(store: pathlib.Path, weather_station_id: str, year: int) -> pathlib.Path:
+    """
+    Returns the Hive-style path of the Parquet file holding one station's records for one year.
+
+    Args:
+        store (pathlib.Path): The root folder of the columnar store.
+        weather_station_id (str): The weather station ID.
+        year (int): The year.
+
+    Returns:
+        pathlib.Path: The partition file.
+    """
+    return store / WEATHER_STORE / f'weather_station_id={weather_station_id}' / f'year={year}' / PARTITION_FILE
+
+
+def analysis_path(store: pathlib.Path, model: type[db.Model]) -> pathlib.Path:
+    """
+    Returns the path of the Parquet file holding the snapshot of a statistics table.
+
+    Args:
+        store (pathlib.Path): The root folder of the columnar store.
+        model (type[db.Model]): The model of the statistics table.
+
+    Returns:
+        pathlib.Path: The snapshot file.
+    """
+    return store / f'{model.__tablename__}.parquet'
+
+
+def analysis_schema(model: type[db.Model]) -> dict[str, pl.DataType]:
+    """
+    Returns the Polars schema of a statistics table, in column order.
+
+    Args:
+        model (type[db.Model]): The model of the statistics table.
+
+    Returns:
+        dict[str, pl.DataType]: The column types.
+    """
+    schema: dict[str, pl.DataType] = {}
+    for column in model.__table__.columns:
+        if isinstance(column.type, Integer):
+            schema[column.name] = pl.Int64
+        elif isinstance(column.type, DateTime):
+            schema[column.name] = pl.Datetime('us')
+        else:
+            schema[column.name] = pl.String
+
+    return schema
+
+
+def write_parquet_atomic(df: pl.DataFrame, path: pathlib.Path):
+    """
+    Writes a DataFrame to a Parquet file that readers never see half-written.
+
+    Args:
+        df (pl.DataFrame): The DataFrame to write.
+        path (pathlib.Path): The destination file; its folder is created if needed.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f'.{path.name}.tmp')
+    df.write_parquet(temp_path, statistics=True)
+    os.replace(temp_path, path)
+
+
+def write_weather_partitions(wx_df: pl.DataFrame, store: pathlib.Path) -> int:
+    """
+    Writes weather records to the columnar store, partitioned by station and year.
+
+    Each (station, year) group in wx_df replaces its partition, so wx_df must hold every record of
+    the groups it touches, like the analysis input of the ingestion pipeline.
+
+    Args:
+        wx_df (pl.DataFrame): The cleansed weather records, in the column layout of wx_consolidation.
+        store (pathlib.Path): The root folder of the columnar store.
+
+    Returns:
+        int: The number of partitions written.
+    """
+    # Sorting once and slicing at the group boundaries is much faster than partition_by on
+    # thousands of groups, and the slices are zero-copy.
+    df = wx_df.with_columns(year=pl.col('date').dt.year()).sort('weather_station_id', 'date')
+    bounds = df.with_row_index('row').group_by('weather_station_id', 'year', maintain_order=True).agg(
+        pl.first('row').alias('offset'), pl.len().alias('length')
+    )
+    df = df.select(PARTITION_SCHEMA).cast(PARTITION_SCHEMA)
+
+    def write(bound):
+        weather_station_id, year, offset, length = bound
+        write_parquet_atomic(df.slice(offset, length), partition_path(store, weather_station_id, year))
+
+    # Polars releases the GIL while encoding, so partitions are written in parallel.
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(write, bounds.iter_rows()))
+
+    return bounds.height
+
+
+def delete_stale_partitions(store: pathlib.Path, wx_df: pl.DataFrame, stations: list[str]) -> int:
+    """
+    Deletes the partitions of stations whose records no longer cover their year.
+
+    Args:
+        store (pathlib.Path): The root folder of the columnar store.
+        wx_df (pl.DataFrame): Every record of the stations, e.g. the records of their rewritten files.
+        stations (list[str]): The weather station IDs whose partitions are checked.
+
+    Returns:
+        int: The number of partitions deleted.
+    """
+    kept = set(wx_df.select('weather_station_id', pl.col('date').dt.year()).unique().iter_rows())
+    num_deleted = 0
+    for weather_station_id in stations:
+        for folder in (store / WEATHER_STORE / f'weather_station_id={weather_station_id}').glob('year=*'):
+            year = int(folder.name.removeprefix('year='))
+            if (weather_station_id, year) not in kept:
+                (folder / PARTITION_FILE).unlink(missing_ok=True)
+                folder.rmdir()
+                num_deleted += 1
+
+    return num_deleted
+
+
+def write_analysis(store: pathlib.Path, model: type[db.Model]) -> int:
+    """
+    Writes a snapshot of a statistics table to the columnar store.
+
+    The statistics tables are small, so each is kept in a single file that is replaced after every ingest.
+
+    Args:
+        store (pathlib.Path): The root folder of the columnar store.
+        model (type[db.Model]): The model of the statistics table.
+
+    Returns:
+        int: The number of records written.
+    """
+    schema = analysis_schema(model)
+    with db.engine.connect() as connection:
+        df = pl.read_database(select(*model.__table__.columns), connection, schema_overrides=schema)
+
+    write_parquet_atomic(df.select(schema).cast(schema), analysis_path(store, model))
+    return df.height
+
+
+def export_store(store: pathlib.Path) -> dict:
+    """
+    Builds the whole columnar store from the database, one station at a time to bound memory.
+
+    Args:
+        store (pathlib.Path): The root folder of the columnar store.
+
+    Returns:
+        dict: The number of weather partitions written and of records written per statistics table.
+    """
+    stations = db.session.execute(select(Weather.weather_station_id).distinct()).scalars().all()
+    columns = [Weather.date, Weather.max_temp, Weather.min_temp, Weather.precipitation, Weather.weather_station_id]
+
+    num_partitions = 0
+    with db.engine.connect() as connection:
+        for weather_station_id in stations:
+            query = select(*columns).where(Weather.weather_station_id == weather_station_id)
+            wx_df = pl.read_database(query, connection, schema_overrides={'date': pl.Date})
+            num_partitions += write_weather_partitions(wx_df, store)
+
+    return {
+        'weather_partitions': num_partitions,
+        'analysis_records': {model.__tablename__: write_analysis(store, model) for model in ANALYSIS_MODELS},
+    }
+
+
+def frame_predicate(filters: list[Filter]) -> pl.Expr | None:
+    """
+    Translates filters into a Polars predicate.
+
+    Args:
+        filters (list[Filter]): The filters.
+
+    Returns:
+        pl.Expr | None: The conjunction of the filters, or None if there are none.
+    """
+    predicate = None
+    for name, operator, value in filters:
+        column = pl.col(name)
+        if operator == 'in':
+            condition = column.is_in(value)
+        elif operator == '==':
+            condition = column == value
+        elif operator == '>=':
+            condition = column >= value
+        else:
+            condition = column <= value
+        predicate = condition if predicate is None else predicate & condition
+
+    return predicate
+
+
+def scan_weather(store: pathlib.Path, filters: list[Filter]) -> pl.LazyFrame:
+    """
+    Lazily scans the weather records of the columnar store that match filters.
+
+    Date filters are also applied to the year partition column, so Polars skips the files of
+    stations and years outside the filters instead of opening them.
+
+    Args:
+        store (pathlib.Path): The root folder of the columnar store.
+        filters (list[Filter]): The weather filters of the request.
+
+    Returns:
+        pl.LazyFrame: The records, with date, max_temp, min_temp, precipitation, weather_station_id and year columns.
+    """
+    partitions = store / WEATHER_STORE
+    station_ids = None
+    for name, operator, value in filters:
+        if name == 'weather_station_id':
+            station_ids = value if operator == 'in' else [value]
+
+    # Listing thousands of partition folders costs more than reading one station, so station
+    # filters only list the folders of their stations.
+    if station_ids is None:
+        files = sorted(partitions.glob(f'*/*/{PARTITION_FILE}'))
+    else:
+        files = sorted(file for weather_station_id in station_ids if STATION_ID_PATTERN.fullmatch(weather_station_id)
+                       for file in partitions.glob(f'weather_station_id={weather_station_id}/*/{PARTITION_FILE}'))
+
+    if not files:
+        frame = pl.LazyFrame(schema={**PARTITION_SCHEMA, 'weather_station_id': pl.String, 'year': pl.Int64})
+    else:
+        frame = pl.scan_parquet(files, hive_partitioning=True)
+
+    year_filters = [('year', operator, value.year) for name, operator, value in filters
+                    if name == 'date' and operator != 'in']
+    predicate = frame_predicate(filters + year_filters)
+    return frame if predicate is None else frame.filter(predicate)
+
+
+def scan_analysis(store: pathlib.Path, model: type[db.Model], filters: list[Filter]) -> pl.LazyFrame:
+    """
+    Lazily scans the records of a statistics table in the columnar store that match filters.
+
+    Args:
+        store (pathlib.Path): The root folder of the columnar store.
+        model (type[db.Model]): The model of the statistics table.
+        filters (list[Filter]): The filters of the request.
+
+    Returns:
+        pl.LazyFrame: The statistics, with the columns of the table.
+    """
+    path = analysis_path(store, model)
+    if not path.exists():
+        frame = pl.LazyFrame(schema=analysis_schema(model))
+    else:
+        frame = pl.scan_parquet(str(path))
+
+    predicate = frame_predicate(filters)
+    return frame if predicate is None else frame.filter(predicate)
+
+
+def columnar_main(store: pathlib.Path):
+    """
+    Main function to build the columnar store from the configured database.
+
+    It logs the number of partitions and records written and the total time taken.
+
+    Args:
+        store (pathlib.Path): The root folder of the columnar store.
+    """
+    start_time = datetime.now()
+    written = export_store(store)
+    end_time = datetime.now()
+
+    logger.info(f"Weather partitions written: {written['weather_partitions']}")
+    for table_name, num_records in written['analysis_records'].items():
+        logger.info(f"Records of {table_name} written: {num_records}")
+    logger.info(f"Columnar store built in {(end_time - start_time).total_seconds()} seconds.")
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        columnar_main(pathlib.Path(app.config['PARQUET_STORE']))
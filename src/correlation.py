@@ -0,0 +1,130 @@
+import pathlib
+import polars as pl
+from sqlalchemy import select
+from columnar import analysis_schema, scan_analysis
+from filters import Filter, sql_conditions
+from models import db, request_engine, WeatherAnalysis, WeatherSeasonAnalysis, YieldData
+from serialization import Field
+
+
+# The statistics tables whose values are related to the yield of the same year.
+CORRELATION_PERIODS: dict[str, type[db.Model]] = {
+    'year': WeatherAnalysis,
+    'season': WeatherSeasonAnalysis,
+}
+
+# Response name and source column of each weather variable.
+CORRELATION_VARIABLES: dict[str, str] = {
+    'avg_max_temp': 'avg_max_temp_celsius',
+    'avg_min_temp': 'avg_min_temp_celsius',
+    'accumulated_precipitation': 'accumulated_precipitation_cm',
+}
+
+CORRELATION_STATISTICS: list[Field] = [
+    ('n', None, None),
+    ('pearson', None, None),
+    ('spearman', None, None),
+    ('slope', None, None),
+    ('intercept', None, None),
+    ('r_squared', None, None),
+]
+
+
+def analysis_frame(model: type[db.Model], filters: list[Filter], store: pathlib.Path | None = None) -> pl.LazyFrame:
+    """
+    Reads the records of a statistics table that match filters into a Polars frame.
+
+    Args:
+        model (type[db.Model]): The model of the statistics table.
+        filters (list[Filter]): The filters of the request.
+        store (pathlib.Path | None): The columnar store to scan, or None to read the database.
+
+    Returns:
+        pl.LazyFrame: The statistics, with the columns of the table.
+    """
+    if store is not None:
+        return scan_analysis(store, model, filters)
+
+    schema = analysis_schema(model)
+    query = select(*model.__table__.columns).where(*sql_conditions(model, filters))
+    with request_engine().connect() as connection:
+        return pl.read_database(query, connection, schema_overrides=schema).cast(schema).lazy()
+
+
+def yield_frame() -> pl.LazyFrame:
+    """
+    Reads the yearly yields into a Polars frame.
+
+    Returns:
+        pl.LazyFrame: The yields, with year and yield_amount columns.
+    """
+    rows = db.session.execute(select(YieldData.year, YieldData.yield_amount)).all()
+    return pl.DataFrame([tuple(row) for row in rows], schema={'year': pl.Int64, 'yield_amount': pl.Int64}, orient='row').lazy()
+
+
+def weather_variables(frames: dict[str, pl.LazyFrame]) -> pl.LazyFrame:
+    """
+    Stacks the weather variables of statistics frames into one long frame.
+
+    Args:
+        frames (dict[str, pl.LazyFrame]): The statistics of each period.
+
+    Returns:
+        pl.LazyFrame: One row per station, year, period and variable, with its value.
+    """
+    return pl.concat([
+        frame.select(
+            'weather_station_id',
+            'year',
+            pl.lit(period).alias('period'),
+            pl.lit(variable).alias('variable'),
+            pl.col(column).cast(pl.Float64).alias('value'),
+        )
+        for period, frame in frames.items()
+        for variable, column in CORRELATION_VARIABLES.items()
+    ])
+
+
+def correlate(variables: pl.LazyFrame, yields: pl.LazyFrame, by_station: bool = False) -> tuple[pl.DataFrame, list[Field]]:
+    """
+    Relates each weather variable to the yield of the same year.
+
+    For every variable, and every station if asked, one aggregation computes the Pearson and
+    Spearman correlations and the least-squares line `yield = intercept + slope * value`. Without
+    by_station, each year's value is the mean over the stations first. Years without a value or a
+    yield are left out; statistics that are undefined, e.g. for fewer than two years, are null.
+
+    Args:
+        variables (pl.LazyFrame): The weather variables, as returned by weather_variables.
+        yields (pl.LazyFrame): The yields, as returned by yield_frame.
+        by_station (bool): Whether to relate the variables of each station separately.
+
+    Returns:
+        tuple[pl.DataFrame, list[Field]]: The statistics, sorted by their keys, and the response fields of its columns.
+    """
+    keys = ['weather_station_id', 'period', 'variable'] if by_station else ['period', 'variable']
+    if not by_station:
+        variables = variables.group_by('period', 'variable', 'year').agg(pl.mean('value'))
+
+    x, y = pl.col('value'), pl.col('yield_amount').cast(pl.Float64)
+    df = variables.join(yields, on='year').filter(x.is_not_null() & y.is_not_null()).group_by(keys).agg(
+        pl.len().alias('n'),
+        pl.corr(x, y, method='pearson').alias('pearson'),
+        pl.corr(x, y, method='spearman').alias('spearman'),
+        (pl.cov(x, y) / x.var()).alias('slope'),
+        x.mean().alias('value_mean'),
+        y.mean().alias('yield_mean'),
+    ).select(
+        *keys,
+        'n',
+        'pearson',
+        'spearman',
+        'slope',
+        (pl.col('yield_mean') - pl.col('slope') * pl.col('value_mean')).alias('intercept'),
+        (pl.col('pearson') ** 2).alias('r_squared'),
+    )
+
+    statistics = [name for name, _, _ in CORRELATION_STATISTICS if name != 'n']
+    df = df.with_columns(pl.col(statistics).fill_nan(None)).sort(keys).collect()
+
+    return df, [(name, None, None) for name in keys] + CORRELATION_STATISTICS
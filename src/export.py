@@ -0,0 +1,117 @@
+import csv
+import io
+from typing import Iterator
+import polars as pl
+from sqlalchemy import Select
+from models import request_engine
+from serialization import Field, dumps, rows_to_dicts
+
+
+EXPORT_CHUNK_SIZE: int = 10_000
+
+EXPORT_FORMATS: dict[str, tuple[str, str]] = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.file', 'arrow'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def stream_partitions(query: Select, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[list]:
+    """
+    Executes a query on its own connection with a streaming cursor and yields its rows in chunks.
+
+    Only one chunk is held in memory at a time, however many rows the query matches.
+
+    Args:
+        query (Select): The query to execute.
+        chunk_size (int): The number of rows per chunk.
+
+    Yields:
+        list: The next chunk of rows.
+    """
+    with request_engine().connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for partition in result.partitions():
+            yield partition
+
+
+def stream_ndjson(query: Select, fields: list[Field]) -> Iterator[bytes]:
+    """
+    Streams the rows of a query as newline-delimited JSON, one object per row in the schema of the JSON API.
+
+    Args:
+        query (Select): The query to export; it must select the columns of fields.
+        fields (list[Field]): The response fields.
+
+    Yields:
+        bytes: The serialized lines of the next chunk of rows.
+    """
+    for partition in stream_partitions(query):
+        yield b''.join(dumps(row) for row in rows_to_dicts(partition, fields))
+
+
+def stream_csv(query: Select, fields: list[Field]) -> Iterator[bytes]:
+    """
+    Streams the rows of a query as CSV with a header line.
+
+    Dates and timestamps are written in ISO 8601 and missing values as empty fields.
+
+    Args:
+        query (Select): The query to export; it must select the columns of fields.
+        fields (list[Field]): The response fields.
+
+    Yields:
+        bytes: The header, then the serialized lines of the next chunk of rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+
+    writer.writerow([name for name, _, _ in fields])
+    yield buffer.getvalue().encode()
+
+    for partition in stream_partitions(query):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([value.isoformat() if hasattr(value, 'isoformat') else value for value in row] for row in partition)
+        yield buffer.getvalue().encode()
+
+
+def export_frame(query: Select, fields: list[Field]) -> pl.DataFrame:
+    """
+    Reads the rows of a query into a Polars DataFrame named after the response fields.
+
+    Args:
+        query (Select): The query to export; it must select the columns of fields.
+        fields (list[Field]): The response fields.
+
+    Returns:
+        pl.DataFrame: The rows, with typed date and timestamp columns.
+    """
+    with request_engine().connect() as connection:
+        df = pl.read_database(query, connection, batch_size=EXPORT_CHUNK_SIZE, infer_schema_length=None)
+
+    names = [name for name, _, _ in fields]
+    if df.width == 0:
+        return pl.DataFrame(schema=names)
+    return df.rename(dict(zip(df.columns, names)))
+
+
+def write_frame(df: pl.DataFrame, file_format: str) -> bytes:
+    """
+    Serializes a DataFrame as an Arrow IPC file or as Parquet.
+
+    Args:
+        df (pl.DataFrame): The DataFrame to serialize.
+        file_format (str): 'arrow' or 'parquet'.
+
+    Returns:
+        bytes: The serialized file.
+    """
+    buffer = io.BytesIO()
+    if file_format == 'arrow':
+        df.write_ipc(buffer)
+    else:
+        df.write_parquet(buffer)
+
+    return buffer.getvalue()
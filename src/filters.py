@@ -0,0 +1,273 @@
+from datetime import date, datetime
+from typing import Any
+from sqlalchemy import ColumnElement
+from werkzeug.datastructures import MultiDict
+from models import Weather, WeatherAnalysis
+
+
+WEATHER_FILTERS: tuple[str, ...] = ('station_id', 'date', 'start_date', 'end_date')
+WEATHER_ANALYSIS_FILTERS: tuple[str, ...] = ('station_id', 'year', 'start_year', 'end_year')
+
+# Column name, operator ('==', 'in', '>=' or '<=') and value of one condition, independent of the storage backend.
+Filter = tuple[str, str, Any]
+
+
+class FilterError(ValueError):
+    """
+    Raised when the filter parameters of a request are invalid.
+    """
+
+
+def parse_list(args: MultiDict, name: str) -> list[str]:
+    """
+    Parses an optional list argument given as comma-separated values, repeated arguments or both.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+        name (str): The name of the argument.
+
+    Returns:
+        list[str]: The distinct non-empty values, in request order.
+    """
+    values = [value.strip() for arg in args.getlist(name) for value in arg.split(',')]
+    return list(dict.fromkeys(value for value in values if value))
+
+
+def parse_int(args: MultiDict, name: str) -> int | None:
+    """
+    Parses an optional integer query argument.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+        name (str): The name of the argument.
+
+    Returns:
+        int | None: The integer, or None if the argument is missing or empty.
+
+    Raises:
+        FilterError: If the argument is not an integer.
+    """
+    value = args.get(name, type=str)
+    if not value:
+        return None
+
+    try:
+        return int(value)
+    except ValueError as e:
+        raise FilterError(f"{name} must be an integer") from e
+
+
+def parse_float(args: MultiDict, name: str) -> float | None:
+    """
+    Parses an optional number query argument.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+        name (str): The name of the argument.
+
+    Returns:
+        float | None: The number, or None if the argument is missing or empty.
+
+    Raises:
+        FilterError: If the argument is not a number.
+    """
+    value = args.get(name, type=str)
+    if not value:
+        return None
+
+    try:
+        return float(value)
+    except ValueError as e:
+        raise FilterError(f"{name} must be a number") from e
+
+
+def parse_date_value(value: Any, name: str) -> date:
+    """
+    Parses a YYYY-MM-DD date.
+
+    Args:
+        value (Any): The value to parse.
+        name (str): The name of the value, used in the error message.
+
+    Returns:
+        date: The date.
+
+    Raises:
+        FilterError: If the value is not a valid date.
+    """
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError) as e:
+        raise FilterError(f"{name} must be a date in YYYY-MM-DD format") from e
+
+
+def parse_date(args: MultiDict, name: str) -> date | None:
+    """
+    Parses an optional YYYY-MM-DD query argument.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+        name (str): The name of the argument.
+
+    Returns:
+        date | None: The date, or None if the argument is missing or empty.
+
+    Raises:
+        FilterError: If the argument is not a valid date.
+    """
+    value = args.get(name, type=str)
+    if not value:
+        return None
+
+    return parse_date_value(value, name)
+
+
+def station_filters(args: MultiDict) -> list[Filter]:
+    """
+    Parses the `station_id` argument, a single station or a comma-separated list of stations.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        list[Filter]: The station filter, or no filter if the argument is missing.
+    """
+    station_ids = parse_list(args, 'station_id')
+    if len(station_ids) == 1:
+        return [('weather_station_id', '==', station_ids[0])]
+    if station_ids:
+        return [('weather_station_id', 'in', station_ids)]
+    return []
+
+
+def range_filters(column: str, exact, start, end, names: tuple[str, str]) -> list[Filter]:
+    """
+    Builds the filters for an exact value and an inclusive range on one column.
+
+    Args:
+        column (str): The column to filter.
+        exact: The exact value, or None.
+        start: The first value of the range, or None.
+        end: The last value of the range, or None.
+        names (tuple[str, str]): The names of the start and end arguments, for error messages.
+
+    Returns:
+        list[Filter]: The filters.
+
+    Raises:
+        FilterError: If the range is empty.
+    """
+    if start is not None and end is not None and start > end:
+        raise FilterError(f"{names[0]} must not be after {names[1]}")
+
+    filters: list[Filter] = []
+    if exact is not None:
+        filters.append((column, '==', exact))
+    if start is not None:
+        filters.append((column, '>=', start))
+    if end is not None:
+        filters.append((column, '<=', end))
+
+    return filters
+
+
+def weather_filters(args: MultiDict) -> list[Filter]:
+    """
+    Parses the station and date filters of a request on weather records.
+
+    Supported arguments are `station_id`, a comma-separated list of stations, an exact `date` and an
+    inclusive `start_date`/`end_date` range.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        list[Filter]: The filters, to be combined with AND.
+
+    Raises:
+        FilterError: If a date is invalid or the range is empty.
+    """
+    return station_filters(args) + range_filters(
+        'date', parse_date(args, 'date'), parse_date(args, 'start_date'), parse_date(args, 'end_date'),
+        ('start_date', 'end_date')
+    )
+
+
+def weather_analysis_filters(args: MultiDict) -> list[Filter]:
+    """
+    Parses the station and year filters of a request on weather statistics.
+
+    Supported arguments are `station_id`, a comma-separated list of stations, an exact `year` and an
+    inclusive `start_year`/`end_year` range.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        list[Filter]: The filters, to be combined with AND.
+
+    Raises:
+        FilterError: If a year is invalid or the range is empty.
+    """
+    return station_filters(args) + range_filters(
+        'year', parse_int(args, 'year') or None, parse_int(args, 'start_year'), parse_int(args, 'end_year'),
+        ('start_year', 'end_year')
+    )
+
+
+def sql_conditions(model: type, filters: list[Filter]) -> list[ColumnElement[bool]]:
+    """
+    Translates filters into WHERE conditions on a model.
+
+    Args:
+        model (type): The model whose columns are filtered.
+        filters (list[Filter]): The filters.
+
+    Returns:
+        list[ColumnElement[bool]]: The conditions, to be combined with AND.
+    """
+    conditions: list[ColumnElement[bool]] = []
+    for name, operator, value in filters:
+        column = getattr(model, name)
+        if operator == 'in':
+            conditions.append(column.in_(value))
+        elif operator == '==':
+            conditions.append(column == value)
+        elif operator == '>=':
+            conditions.append(column >= value)
+        elif operator == '<=':
+            conditions.append(column <= value)
+
+    return conditions
+
+
+def weather_conditions(args: MultiDict) -> list[ColumnElement[bool]]:
+    """
+    Builds the WHERE conditions on Weather for the station and date filters of a request.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        list[ColumnElement[bool]]: The conditions, to be combined with AND.
+
+    Raises:
+        FilterError: If a date is invalid or the range is empty.
+    """
+    return sql_conditions(Weather, weather_filters(args))
+
+
+def weather_analysis_conditions(args: MultiDict) -> list[ColumnElement[bool]]:
+    """
+    Builds the WHERE conditions on WeatherAnalysis for the station and year filters of a request.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        list[ColumnElement[bool]]: The conditions, to be combined with AND.
+
+    Raises:
+        FilterError: If a year is invalid or the range is empty.
+    """
+    return sql_conditions(WeatherAnalysis, weather_analysis_filters(args))
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import pathlib
+import sys
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command-line arguments of the ingest command.
+
+    Args:
+        argv (list[str] | None): The arguments to parse, defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description='Ingest weather and yield data into the database.')
+    parser.add_argument('--wx-data', type=pathlib.Path, default=None,
+                        help='folder containing the weather station files, defaults to wx_data/')
+    parser.add_argument('--yld-data', type=pathlib.Path, default=None,
+                        help='yield data file, defaults to yld_data/US_corn_grain_yield.txt')
+    parser.add_argument('--stations-file', type=pathlib.Path, default=None,
+                        help='GHCN-style stations file with the station locations, defaults to STATIONS_FILE')
+    parser.add_argument('--database', type=str, default=None,
+                        help='SQLAlchemy database URI, defaults to the application database')
+    parser.add_argument('--parquet-store', type=pathlib.Path, default=None,
+                        help='columnar store to update, defaults to PARQUET_STORE when WEATHER_BACKEND=parquet')
+    parser.add_argument('--station-index', type=pathlib.Path, default=None,
+                        help='station index file to rebuild, defaults to STATION_INDEX_PATH when STATION_INDEX_ENABLED=1')
+    parser.add_argument('--full', action='store_true', help='ignore the ingest manifest and re-read every file')
+    parser.add_argument('--dry-run', action='store_true', help='parse the changed files without writing to the database')
+    parser.add_argument('--batch-size', type=int, default=None, help='rows staged per statement')
+    parser.add_argument('--chunk-files', type=int, default=None,
+                        help='changed weather files ingested and committed together')
+    parser.add_argument('--workers', type=int, default=None, help='threads used to parse the source files')
+
+    args = parser.parse_args(argv)
+    if args.batch_size is not None and args.batch_size < 1:
+        parser.error('--batch-size must be a positive integer')
+    if args.chunk_files is not None and args.chunk_files < 1:
+        parser.error('--chunk-files must be a positive integer')
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be a positive integer')
+
+    return args
+
+
+def main(argv: list[str] | None = None):
+    """
+    Command-line entry point; runs the ingestion pipeline and prints its summary as JSON.
+
+    Exits with status 1 when ingest chunks failed, after printing the summary of the run.
+
+    Args:
+        argv (list[str] | None): The arguments to parse, defaults to sys.argv.
+    """
+    args = parse_args(argv)
+
+    if args.workers is not None:
+        # Polars sizes its thread pool once, when it is first imported.
+        os.environ['POLARS_MAX_THREADS'] = str(args.workers)
+
+    from app import create_app
+    from ingest_data import INGEST_CHUNK_FILES, STAGING_BATCH_SIZE, WX_DATA, YLD_DATA, IngestError, ingest_data_main
+
+    app = create_app(None if args.database is None else {'SQLALCHEMY_DATABASE_URI': args.database})
+    parquet_store = args.parquet_store
+    if parquet_store is None and app.config['WEATHER_BACKEND'] == 'parquet':
+        parquet_store = pathlib.Path(app.config['PARQUET_STORE'])
+    station_index = args.station_index
+    if station_index is None and app.config['STATION_INDEX_ENABLED']:
+        station_index = pathlib.Path(app.config['STATION_INDEX_PATH'])
+
+    failed = False
+    with app.app_context():
+        try:
+            summary = ingest_data_main(args.wx_data or WX_DATA, args.yld_data or YLD_DATA, full=args.full,
+                                       dry_run=args.dry_run, batch_size=args.batch_size or STAGING_BATCH_SIZE,
+                                       parquet_store=parquet_store, station_index=station_index,
+                                       chunk_files=args.chunk_files or INGEST_CHUNK_FILES,
+                                       quality_rules=app.extensions['quality_rules'],
+                                       stations_file=args.stations_file or app.config['STATIONS_FILE'])
+        except IngestError as e:
+            summary, failed = e.summary, True
+
+    print(json.dumps(summary, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,95 @@
 import polars as pl
+import io
 import pathlib
-from models import Weather, YieldData, WeatherAnalysis, db
-from datetime import datetime
+from models import Station, StationMetadata, Weather, weather_table, YieldData, WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis, RegionalAnalysis, WeatherQuarantine, StationCompleteness, db
+from manifest import SourceChange, detect_changes, record_changes
+from cache import bump_dataset_version
+from columnar import ANALYSIS_MODELS, delete_stale_partitions, write_analysis, write_weather_partitions
+from station_index import build_station_index, station_index_lock
+from metrics import INGEST_RUNS, StageRecorder
+from quality import QualityRules, station_completeness, validate_weather
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Callable, Iterator
+from pytz import timezone
+from sqlalchemy import Column, Engine, Integer, MetaData, Table, and_, delete, event, exists, func, literal, or_, select, true
+from sqlalchemy.engine import Connection
 import logging
 
 
 __PROJECT_DIR__: pathlib.Path = pathlib.Path(__file__).parent.parent
 WX_DATA: pathlib.Path = __PROJECT_DIR__ / 'wx_data'
 YLD_DATA: pathlib.Path = __PROJECT_DIR__ / 'yld_data' / 'US_corn_grain_yield.txt'
+STN_DATA: pathlib.Path = __PROJECT_DIR__ / 'stn_data' / 'ghcnd-stations.txt'
+STAGING_BATCH_SIZE: int = 50_000
+# Stations looked up per IN list, below SQLite's default limit of bound parameters.
+STATION_BATCH_SIZE: int = 500
+# Changed station files ingested, committed and checkpointed in the manifest together.
+INGEST_CHUNK_FILES: int = 64
+# SQLite settings of the connections used by a bulk load: a 256 MiB page cache for the index updates
+# of the merges, and temporary staging tables and sorts kept in memory.
+BULK_LOAD_PRAGMAS: dict[str, str] = {
+    'cache_size': '-262144',
+    'temp_store': 'MEMORY',
+}
+WX_SCHEMA: dict[str, pl.DataType] = {
+    'date': pl.String,
+    'max_temp': pl.String,
+    'min_temp': pl.String,
+    'precipitation': pl.String,
+}
+WX_FRAME_SCHEMA: dict[str, pl.DataType] = {
+    'date': pl.Date,
+    'max_temp': pl.Int32,
+    'min_temp': pl.Int32,
+    'precipitation': pl.Int32,
+    'weather_station_id': pl.String,
+}
+# Name, first character and width of the fields of a GHCN-Daily stations file (ghcnd-stations.txt).
+STN_FIELDS: tuple[tuple[str, int, int], ...] = (
+    ('weather_station_id', 0, 11),
+    ('latitude', 12, 8),
+    ('longitude', 21, 9),
+    ('elevation', 31, 6),
+    ('state', 38, 2),
+    ('name', 41, 30),
+)
+# Elevation GHCN-Daily writes for stations whose elevation is unknown.
+STN_MISSING_ELEVATION: float = -999.9
+# The months of the growing season covered by WeatherSeasonAnalysis.
+SEASON_MONTHS: tuple[int, int] = (4, 9)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def wx_consolidation_cleanse(df: pl.DataFrame, weather_station_id:str) -> pl.DataFrame:
+class IngestError(RuntimeError):
+    """
+    Raised when chunks of an ingest run failed; the other chunks were committed.
+
+    Attributes:
+        summary (dict): The summary of the run, with the failed chunks under 'chunks_failed'.
+    """
+    def __init__(self, message: str, summary: dict):
+        super().__init__(message)
+        self.summary = summary
+
+
+def wx_consolidation_cleanse(df: pl.DataFrame | pl.LazyFrame, weather_station_id: str | None = None) -> pl.DataFrame | pl.LazyFrame:
     """
     Cleanses weather data from a specific weather station
 
     Args:
-        df (pl.DataFrame): the dataframe containing raw weather data.
-        weather_station_id (str): the ID of the weather station
+        df (pl.DataFrame | pl.LazyFrame): the dataframe containing raw weather data.
+        weather_station_id (str | None): the ID of the weather station, or None if df already has a weather_station_id column
 
     Returns:
-        pl.DataFrame: the cleansed dataframe for designated weather station
+        pl.DataFrame | pl.LazyFrame: the cleansed dataframe for designated weather station, lazy if df is lazy
     """
-    df = df.with_columns(weather_station_id = pl.lit(weather_station_id).cast(pl.String),
-                         date = pl.col('date').cast(pl.String).str.to_date(r'%Y%m%d'),
+    if weather_station_id is not None:
+        df = df.with_columns(weather_station_id = pl.lit(weather_station_id).cast(pl.String))
+
+    df = df.with_columns(date = pl.col('date').cast(pl.String).str.to_date(r'%Y%m%d'),
                          max_temp = pl.col('max_temp').str.strip_chars().cast(pl.Int32),
                          min_temp = pl.col('min_temp').str.strip_chars().cast(pl.Int32),
                          precipitation = pl.col('precipitation').str.strip_chars().cast(pl.Int32))
@@ -40,12 +104,77 @@ def wx_consolidation_cleanse(df: pl.DataFrame, weather_station_id:str) -> pl.Dat
     return df
 
 
-def wx_consolidation(folderpath:str) -> pl.DataFrame:
+def scan_wx_file(file: pathlib.Path) -> pl.LazyFrame:
+    """
+    Lazily scans a single weather station file.
+
+    Args:
+        file (pathlib.Path): The path to the station file; its name without suffix is the weather station ID.
+
+    Returns:
+        pl.LazyFrame: The raw readings of the station, with a weather_station_id column taken from the file path.
+    """
+    return pl.scan_csv(file, separator='\t', has_header=False, schema=WX_SCHEMA).with_columns(
+        weather_station_id = pl.lit(file.stem, dtype=pl.String)
+    )
+
+
+def read_wx_tail(file: pathlib.Path, offset: int) -> pl.LazyFrame:
+    """
+    Reads the lines appended to a weather station file after a byte offset.
+
+    Args:
+        file (pathlib.Path): The path to the station file.
+        offset (int): The byte offset where the new lines start; it must fall on a line boundary.
+
+    Returns:
+        pl.LazyFrame: The raw appended readings, with a weather_station_id column taken from the file path.
+    """
+    with open(file, 'rb') as f:
+        f.seek(offset)
+        tail: bytes = f.read()
+
+    if not tail.strip():
+        return pl.LazyFrame(schema=WX_SCHEMA).with_columns(weather_station_id = pl.lit(file.stem, dtype=pl.String))
+
+    df = pl.read_csv(io.BytesIO(tail), separator='\t', has_header=False, schema=WX_SCHEMA)
+    return df.lazy().with_columns(weather_station_id = pl.lit(file.stem, dtype=pl.String))
+
+
+def scan_wx_data(folderpath: pathlib.Path) -> pl.LazyFrame:
+    """
+    Builds one lazy query over every weather station file in a folder.
+
+    The files are scanned in parallel when the query is collected, and the -9999 null handling and
+    type casts run inside the same plan instead of on one eager frame per file.
+
+    Args:
+        folderpath (pathlib.Path): The path to the folder containing weather data files
+
+    Returns:
+        pl.LazyFrame: The cleansed weather readings of all stations.
+
+    Raises:
+        FileNotFoundError: If the specified folder does not exist.
+        ValueError: If the folder contains no weather data files.
+    """
+    if not folderpath.exists() or not folderpath.is_dir():
+        raise FileNotFoundError(f"The folder path '{folderpath}' does not exist or is not a directory.")
+
+    files: list[pathlib.Path] = sorted(file for file in folderpath.iterdir() if file.is_file())
+    if not files:
+        raise ValueError("No valid weather data files found in the specified folder.")
+
+    lf = pl.concat([scan_wx_file(file) for file in files], how='vertical', parallel=True)
+    return wx_consolidation_cleanse(lf)
+
+
+def wx_consolidation(folderpath: pathlib.Path) -> pl.DataFrame:
     """
     Consolidates weather data from multiple files in a given folder
 
     Args:
-        folderpath (str): The path to the folder containing weather data files
+        folderpath (pathlib.Path): The path to the folder containing weather data files
 
     Returns:
         pl.DataFrame: The consolidated weather dataframe with cleaned and combined data from all files in the folerpath    
@@ -54,25 +183,7 @@ def wx_consolidation(folderpath:str) -> pl.DataFrame:
         FileNotFoundError: If the specified folder does not exist.
         ValueError: If there is an issue reading or processing any of the files in the folder.
     """
-    df: list[pl.DataFrame] = []
-    
-    for file in folderpath.iterdir():
-        if not folderpath.exists() or not folderpath.is_dir():
-            raise FileNotFoundError(f"The folder path '{folderpath}' does not exist or is not a directory.")
-
-        if file.is_file():
-            weather_station_id: str = file.name.replace('.txt', '')
-            headers: list = ["date", "max_temp", "min_temp", "precipitation"]
-            temp_df = pl.read_csv(file, separator='\t', new_columns = headers)
-            temp_df = wx_consolidation_cleanse(temp_df, weather_station_id)
-            
-            df.append(temp_df)
-
-    if not df:
-        raise ValueError("No valid weather data files found in the specified folder.")
-    
-    wx_df = pl.concat(df)
-    return wx_df
+    return scan_wx_data(folderpath).collect(streaming=True)
 
 
 def yld_consolidation_cleanse(df: pl.DataFrame) -> pl.DataFrame:
@@ -109,175 +220,915 @@ def yld_consolidation(file:str) -> pl.DataFrame:
         pl.DataFrame: The consolidated yield data DataFrame.
     """
     headers: list = ["year", "yield_amount"]
-    df = pl.read_csv(file, separator='\t', new_columns=headers)
+    df = pl.read_csv(file, separator='\t', has_header=False, new_columns=headers)
     yld_df = yld_consolidation_cleanse(df)
     
     return yld_df
 
 
+def stn_consolidation(file: pathlib.Path) -> pl.DataFrame:
+    """
+    Reads station locations from a GHCN-Daily style stations file of fixed-width lines.
+
+    Args:
+        file (pathlib.Path): The path to the stations file.
+
+    Returns:
+        pl.DataFrame: One row per station with its ID, latitude, longitude, elevation in meters, state and
+            name; unknown elevations and blank states and names are null.
+    """
+    lines = pl.Series('line', file.read_text().splitlines(), dtype=pl.String)
+    df = pl.DataFrame(lines).filter(pl.col('line').str.strip_chars() != '').select(
+        pl.col('line').str.slice(start, width).str.strip_chars().alias(name) for name, start, width in STN_FIELDS
+    )
+
+    df = df.with_columns(pl.col('elevation', 'state', 'name').replace('', None)).with_columns(
+        pl.col('latitude', 'longitude', 'elevation').cast(pl.Float64)
+    )
+
+    return df.with_columns(pl.col('elevation').replace(STN_MISSING_ELEVATION, None)).unique(
+        'weather_station_id', keep='last', maintain_order=True
+    )
+
+
+def _dialect_insert(table: Table):
+    """
+    Builds an INSERT construct for the bound database dialect that supports ON CONFLICT.
+
+    Args:
+        table (Table): The table to insert into.
+
+    Returns:
+        Insert: A dialect-specific insert statement.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    return insert(table)
+
+
+@contextmanager
+def bulk_load(engine: Engine) -> Iterator[None]:
+    """
+    Applies BULK_LOAD_PRAGMAS to the SQLite connections checked out while the context is open.
+
+    Each connection gets its previous settings back when it returns to the pool, so connections
+    that later serve API requests are unaffected. Other databases are left alone.
+
+    Args:
+        engine (Engine): The engine the bulk load writes through.
+    """
+    if engine.dialect.name != 'sqlite':
+        yield
+        return
+
+    def tune(dbapi_connection, connection_record, connection_proxy):
+        cursor = dbapi_connection.cursor()
+        connection_record.info['bulk_load_pragmas'] = {
+            name: cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in BULK_LOAD_PRAGMAS
+        }
+        for name, value in BULK_LOAD_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    def restore(dbapi_connection, connection_record):
+        previous = connection_record.info.pop('bulk_load_pragmas', None)
+        if previous is None or dbapi_connection is None:
+            return
+        cursor = dbapi_connection.cursor()
+        for name, value in previous.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
 
-def push_raw_data(wx_df: pl.DataFrame | None = None, yld_df: pl.DataFrame | None = None) -> tuple[int, int]:
+    event.listen(engine, 'checkout', tune)
+    event.listen(engine, 'checkin', restore)
+    try:
+        yield
+    finally:
+        event.remove(engine, 'checkout', tune)
+        event.remove(engine, 'checkin', restore)
+
+
+def stage_frame(connection: Connection, staging: Table, df: pl.DataFrame, batch_size: int = STAGING_BATCH_SIZE):
+    """
+    Loads a dataframe into a staging table with one DBAPI executemany per batch.
+
+    Values go through the bind processors of the staging columns, so they are stored like a Core insert
+    would store them, without building a parameter dictionary per row.
+
+    Args:
+        connection (Connection): The connection holding the staging table.
+        staging (Table): The staging table; df has its columns, in order.
+        df (pl.DataFrame): The rows to load.
+        batch_size (int): The number of rows per executemany.
+    """
+    dialect = connection.dialect
+    processors = {column.name: column.type.bind_processor(dialect) for column in staging.columns}
+    df = df.with_columns([
+        pl.Series(name, [None if value is None else process(value) for value in df[name].to_list()], dtype=pl.Object)
+        for name, process in processors.items() if process is not None
+    ])
+    compiled = staging.insert().compile(dialect=dialect)
+    names = compiled.positiontup if dialect.positional else None
+
+    for chunk in df.iter_slices(batch_size):
+        if names is None:
+            rows = chunk.to_dicts()
+        else:
+            rows = chunk.select(names).rows()
+        connection.exec_driver_sql(compiled.string, rows)
+
+
+def merge_frame(df: pl.DataFrame, model: type[db.Model], key_columns: list[str], update: bool = False,
+                batch_size: int = STAGING_BATCH_SIZE) -> tuple[int, int]:
+    """
+    Merges a dataframe into the table of the given model.
+
+    The dataframe is bulk-loaded into a temporary staging table and then merged with a single
+    INSERT ... SELECT ... ON CONFLICT statement on the model's natural-key unique constraint,
+    so existing rows never have to be loaded into Python.
+
+    Args:
+        df (pl.DataFrame): The DataFrame to merge. Columns that are not on the model are ignored.
+        model (type[db.Model]): The model whose table receives the rows.
+        key_columns (list[str]): The columns of the natural-key unique constraint.
+        update (bool): Whether rows whose key already exists are updated when their values differ, instead of skipped.
+        batch_size (int): The number of rows loaded into the staging table per statement.
+
+    Returns:
+        tuple[int, int]: The number of rows inserted or updated and the number of rows skipped as already present.
+    """
+    table: Table = model.__table__
+    columns: list[str] = [name for name in df.columns if name in table.c]
+    staging = Table(f'staging_{table.name}', MetaData(),
+                    *[Column(name, table.c[name].type) for name in columns],
+                    prefixes=['TEMPORARY'])
+
+    connection = db.session.connection()
+    staging.drop(connection, checkfirst=True)
+    staging.create(connection)
+
+    stage_frame(connection, staging, df.select(columns), batch_size)
+
+    created = literal(datetime.now(timezone('UTC')), table.c['created'].type)
+    merge = _dialect_insert(table).from_select(
+        columns + ['created'],
+        select(*staging.c, created).where(true())
+    )
+
+    value_columns: list[str] = [name for name in columns if name not in key_columns]
+    if update and value_columns:
+        merge = merge.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={name: merge.excluded[name] for name in value_columns + ['created']},
+            where=or_(*[table.c[name].is_distinct_from(merge.excluded[name]) for name in value_columns])
+        )
+    else:
+        merge = merge.on_conflict_do_nothing(index_elements=key_columns)
+
+    num_written: int = connection.execute(merge).rowcount
+    staging.drop(connection)
+
+    return num_written, df.height - num_written
+
+
+def push_stations(names: list[str]) -> dict[str, int]:
+    """
+    Adds the stations that are missing from the station table, in sorted order.
+
+    Args:
+        names (list[str]): The IDs of the weather stations.
+
+    Returns:
+        dict[str, int]: The integer key of every given station.
+    """
+    connection = db.session.connection()
+    names = sorted(set(names))
+    if names:
+        connection.execute(_dialect_insert(Station.__table__).on_conflict_do_nothing(),
+                           [{'weather_station_id': name} for name in names])
+
+    keys: dict[str, int] = {}
+    for start in range(0, len(names), STATION_BATCH_SIZE):
+        query = select(Station.weather_station_id, Station.station_id).where(
+            Station.weather_station_id.in_(names[start:start + STATION_BATCH_SIZE]))
+        keys.update(connection.execute(query).all())
+
+    return keys
+
+
+def merge_weather(wx_df: pl.DataFrame, update: bool = False, batch_size: int = STAGING_BATCH_SIZE) -> tuple[int, int]:
+    """
+    Merges weather readings keyed by station ID into the weather table, which is keyed by the station's integer key.
+
+    Missing stations are added first. The readings are staged like in merge_frame; new rows are numbered in
+    file order after the highest existing weather_id, so the IDs are the ones an autoincrement key would have
+    assigned, also when the table is clustered on (station_id, date) without a rowid.
+
+    Args:
+        wx_df (pl.DataFrame): The weather readings, with a weather_station_id column.
+        update (bool): Whether rows whose key already exists are updated when their values differ, instead of skipped.
+        batch_size (int): The number of rows loaded into the staging table per statement.
+
+    Returns:
+        tuple[int, int]: The number of rows inserted or updated and the number of rows skipped as already present.
+    """
+    stations = push_stations(wx_df['weather_station_id'].unique().to_list())
+    keys = pl.DataFrame({'weather_station_id': list(stations), 'station_id': list(stations.values())},
+                        schema={'weather_station_id': pl.String, 'station_id': pl.Int64})
+    value_columns: list[str] = [name for name in ('max_temp', 'min_temp', 'precipitation') if name in wx_df.columns]
+    df = (wx_df.with_row_index('position')
+          .join(keys, on='weather_station_id', how='inner')
+          .sort('position')
+          .select('position', 'station_id', 'date', *value_columns))
+
+    staging = Table('staging_weather', MetaData(),
+                    Column('position', Integer),
+                    *[Column(name, weather_table.c[name].type) for name in df.columns[1:]],
+                    prefixes=['TEMPORARY'])
+
+    connection = db.session.connection()
+    staging.drop(connection, checkfirst=True)
+    staging.create(connection)
+
+    stage_frame(connection, staging, df, batch_size)
+
+    created = literal(datetime.now(timezone('UTC')), weather_table.c['created'].type)
+    same_key = and_(weather_table.c.station_id == staging.c.station_id, weather_table.c.date == staging.c.date)
+
+    num_updated: int = 0
+    if update and value_columns:
+        changed = weather_table.update().where(
+            same_key,
+            or_(*[weather_table.c[name].is_distinct_from(staging.c[name]) for name in value_columns])
+        ).values({**{name: staging.c[name] for name in value_columns}, 'created': created})
+        num_updated = connection.execute(changed).rowcount
+
+    next_id = select(func.coalesce(func.max(weather_table.c.weather_id), 0)).scalar_subquery()
+    new_rows = select(
+        next_id + func.row_number().over(order_by=staging.c.position),
+        *[staging.c[name] for name in df.columns[1:]],
+        created,
+    ).where(~exists().where(same_key))
+    insert = _dialect_insert(weather_table).from_select(
+        ['weather_id', *df.columns[1:], 'created'], new_rows
+    ).on_conflict_do_nothing(index_elements=['station_id', 'date'])
+    num_inserted: int = connection.execute(insert).rowcount
+    staging.drop(connection)
+
+    num_written = num_updated + num_inserted
+    return num_written, wx_df.height - num_written
+
+
+def push_raw_data(wx_df: pl.DataFrame | None = None, yld_df: pl.DataFrame | None = None, update: bool = False,
+                  batch_size: int = STAGING_BATCH_SIZE) -> tuple[int, int]:
     """
-    Pushes raw weather and yield data into the database.
+    Pushes raw weather and yield data into the database. The caller commits the session.
 
     Args:
         wx_df (pl.DataFrame | None): The DataFrame containing weather data.
         yld_df (pl.DataFrame | None): The DataFrame containing yield data.
+        update (bool): Whether existing records are overwritten with differing values, e.g. from a rewritten source file.
+        batch_size (int): The number of rows staged per statement.
 
     Returns:
-        tuple[int, int]: A tuple containing the number of new weather records ingested and the number of new yield records ingested.
+        tuple[int, int]: A tuple containing the number of new or updated weather records and the number of new or updated yield records.
 
     Raises:
-        Exception: If there is an error during the database operations.
+        SQLAlchemyError: If a write fails.
     """
-    try:
-        num_wx_records = num_yld_records = 0
-        
-        if wx_df is not None:
-            weather_records = db.session.query(Weather).all()
-
-            existing_weather = {}
-
-            for row in weather_records:
-                key = (row.weather_station_id, row.date)
-                existing_weather[key] = row
-
-            new_weather_records = []
-            for row in wx_df.iter_rows():
-                if (row[4], row[0]) not in existing_weather:
-                    weather = Weather(
-                        weather_station_id=row[4],
-                        date=row[0],
-                        max_temp=row[1],
-                        min_temp=row[2],
-                        precipitation=row[3]
-                    )
-                    new_weather_records.append(weather)
-            db.session.bulk_save_objects(new_weather_records)
-            db.session.commit()
-            logger.info("Weather data ingestion complete")
-            num_wx_records = len(new_weather_records)
-        
-        if yld_df is not None:
-            yield_records = db.session.query(YieldData).all()
-
-            existing_yield_records = {}
-
-            for row in yield_records:
-                key = (row.year)
-                existing_yield_records[key] = row
-
-            new_yield_records = []
-            for row in yld_df.iter_rows():
-                if (row[0]) not in existing_yield_records:
-                    yield_data = YieldData(
-                        year=row[0],
-                        yield_amount=row[1]
-                    )
-                    new_yield_records.append(yield_data)
-            db.session.bulk_save_objects(new_yield_records)
-            db.session.commit()
-            logger.info("Yield Data ingestion complete")
-            num_yld_records = len(new_yield_records)
+    num_wx_records = num_yld_records = 0
+    if wx_df is not None:
+        num_wx_records, num_wx_skipped = merge_weather(wx_df, update, batch_size)
+        if num_wx_records:
+            bump_dataset_version(Weather.__tablename__)
+        logger.info(f"Weather data ingestion complete: {num_wx_records} written, {num_wx_skipped} skipped")
 
-    except Exception as e:
-        logger.error(f"Error: {e}")
+    if yld_df is not None:
+        num_yld_records, num_yld_skipped = merge_frame(yld_df, YieldData, ['year'], update, batch_size)
+        if num_yld_records:
+            bump_dataset_version(YieldData.__tablename__)
+        logger.info(f"Yield Data ingestion complete: {num_yld_records} written, {num_yld_skipped} skipped")
 
     return num_wx_records, num_yld_records
 
 
 
-def weather_analysis(wx_df: pl.DataFrame) -> pl.DataFrame:
+def summarize_weather(df: pl.LazyFrame, keys: list[str]) -> pl.DataFrame:
     """
-    Analyzes weather data to calculate statistics.
+    Calculates the weather statistics of groups of records.
 
     Args:
-        wx_df (pl.DataFrame): The DataFrame containing weather data.
+        df (pl.LazyFrame): The weather records, with the key columns.
+        keys (list[str]): The columns to group by.
 
     Returns:
-        pl.DataFrame: DataFrame containing analyzed weather data with statistics (average max temp, average min temp, accumulated precipitation).
+        pl.DataFrame: One row per group with the key columns and the average max temp, average min
+        temp and accumulated precipitation.
     """
-    df = wx_df.with_columns((
-        pl.col("date").dt.year().alias('year'),
-        pl.col('precipitation') * .01) 
-        )
-
-    df = df.group_by('weather_station_id', 'year').agg([
+    df = df.with_columns(pl.col('precipitation') * .01).group_by(keys).agg([
         pl.mean('max_temp').cast(pl.Float32).round().alias('avg_max_temp_celsius'),
         pl.mean('min_temp').cast(pl.Float32).round().alias('avg_min_temp_celsius'),
         pl.sum('precipitation').cast(pl.Float32).round().alias('accumulated_precipitation_cm')
     ])
 
-    return df
+    return df.collect(streaming=True)
 
 
-def push_weather_analysis(wx_analysis_df: pl.DataFrame) -> int:
+def weather_analysis(wx_df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    """
+    Analyzes weather data to calculate statistics.
+
+    Args:
+        wx_df (pl.DataFrame | pl.LazyFrame): The DataFrame containing weather data, or a lazy query producing it.
+
+    Returns:
+        pl.DataFrame: DataFrame containing analyzed weather data with statistics (average max temp, average min temp, accumulated precipitation).
+    """
+    df = wx_df.lazy().with_columns(pl.col("date").dt.year().alias('year'))
+
+    return summarize_weather(df, ['weather_station_id', 'year'])
+
+
+def monthly_analysis(wx_df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    """
+    Analyzes weather data to calculate statistics per station and calendar month.
+
+    Args:
+        wx_df (pl.DataFrame | pl.LazyFrame): The DataFrame containing weather data, or a lazy query producing it.
+
+    Returns:
+        pl.DataFrame: DataFrame containing the statistics of each (station, year, month).
+    """
+    df = wx_df.lazy().with_columns(
+        pl.col('date').dt.year().alias('year'),
+        pl.col('date').dt.month().alias('month')
+    )
+
+    return summarize_weather(df, ['weather_station_id', 'year', 'month'])
+
+
+def season_analysis(wx_df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    """
+    Analyzes weather data to calculate statistics per station over the growing season of each year.
+
+    Args:
+        wx_df (pl.DataFrame | pl.LazyFrame): The DataFrame containing weather data, or a lazy query producing it.
+
+    Returns:
+        pl.DataFrame: DataFrame containing the statistics of each (station, year) with records
+        between April and September.
+    """
+    df = wx_df.lazy().filter(pl.col('date').dt.month().is_between(*SEASON_MONTHS)).with_columns(
+        pl.col('date').dt.year().alias('year')
+    )
+
+    return summarize_weather(df, ['weather_station_id', 'year'])
+
+
+def regional_analysis(wx_analysis_df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Combines the yearly statistics of every station into statistics per year.
+
+    Each value is the mean of the stations' yearly values, so stations weigh the same whatever
+    the number of days they reported.
+
+    Args:
+        wx_analysis_df (pl.DataFrame): The yearly statistics of every station for the years to combine.
+
+    Returns:
+        pl.DataFrame: DataFrame containing the statistics and the number of stations of each year.
+    """
+    return wx_analysis_df.group_by('year').agg([
+        pl.len().alias('station_count'),
+        pl.mean('avg_max_temp_celsius').cast(pl.Float32).round(),
+        pl.mean('avg_min_temp_celsius').cast(pl.Float32).round(),
+        pl.mean('accumulated_precipitation_cm').cast(pl.Float32).round()
+    ])
+
+
+def delete_station_records(stations: list[str]) -> tuple[int, list[int]]:
+    """
+    Deletes the weather records and per-station statistics of stations whose source files were rewritten.
+
+    A rewritten file is read in full, so deleting first keeps records and statistics of dates and years
+    that are no longer in the file from outliving it. The caller commits the session.
+
+    Args:
+        stations (list[str]): The IDs of the weather stations.
+
+    Returns:
+        tuple[int, list[int]]: The number of weather records deleted and the years that had yearly
+            statistics of the stations, whose regional statistics must be recomputed.
+    """
+    station = Station.__table__
+    num_deleted = 0
+    years: set[int] = set()
+    changed: set[str] = set()
+    for start in range(0, len(stations), STATION_BATCH_SIZE):
+        batch = stations[start:start + STATION_BATCH_SIZE]
+        years.update(db.session.scalars(select(WeatherAnalysis.year).where(WeatherAnalysis.weather_station_id.in_(batch)).distinct()))
+        keys = select(station.c.station_id).where(station.c.weather_station_id.in_(batch))
+        num_batch = db.session.execute(delete(weather_table).where(weather_table.c.station_id.in_(keys))).rowcount
+        if num_batch:
+            num_deleted += num_batch
+            changed.add(Weather.__tablename__)
+        for model in (WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis, StationCompleteness):
+            if db.session.execute(delete(model).where(model.weather_station_id.in_(batch))).rowcount:
+                changed.add(model.__tablename__)
+
+    for table_name in sorted(changed):
+        bump_dataset_version(table_name)
+    logger.info(f"Rewritten stations cleared: {num_deleted} weather records deleted")
+
+    return num_deleted, sorted(years)
+
+
+def push_station_metadata(stn_df: pl.DataFrame, batch_size: int = STAGING_BATCH_SIZE) -> int:
+    """
+    Pushes station locations into the database, updating stations whose entry changed. The caller commits the session.
+
+    Args:
+        stn_df (pl.DataFrame): The station locations, as returned by stn_consolidation.
+        batch_size (int): The number of rows staged per statement.
+
+    Returns:
+        int: The number of new or updated stations.
+
+    Raises:
+        SQLAlchemyError: If a write fails.
+    """
+    num_records, num_skipped = merge_frame(stn_df, StationMetadata, ['weather_station_id'], True, batch_size)
+    if num_records:
+        bump_dataset_version(StationMetadata.__tablename__)
+    logger.info(f"Station metadata ingestion complete: {num_records} written, {num_skipped} unchanged")
+
+    return num_records
+
+
+def push_analysis(df: pl.DataFrame, model: type[db.Model], key_columns: list[str],
+                  batch_size: int = STAGING_BATCH_SIZE) -> int:
+    """
+    Pushes statistics into the table of the given model.
+
+    Existing records are replaced when their recomputed statistics differ, and the dataset version
+    of the table is bumped when anything changed. The caller commits the session.
+
+    Args:
+        df (pl.DataFrame): The DataFrame containing the statistics.
+        model (type[db.Model]): The model of the statistics table.
+        key_columns (list[str]): The columns of the natural-key unique constraint.
+        batch_size (int): The number of rows staged per statement.
+
+    Returns:
+        int: The number of new or updated records.
+
+    Raises:
+        SQLAlchemyError: If a write fails.
+    """
+    num_records = 0
+    if df is None:
+        return num_records
+
+    num_records, num_skipped = merge_frame(df, model, key_columns, True, batch_size)
+    if num_records:
+        bump_dataset_version(model.__tablename__)
+    logger.info(f"Ingestion of {model.__tablename__} complete: {num_records} written, {num_skipped} unchanged")
+
+    return num_records
+
+
+def push_weather_analysis(wx_analysis_df: pl.DataFrame, batch_size: int = STAGING_BATCH_SIZE) -> int:
     """
     Pushes weather analysis data into the database.
 
+    Existing (station, year) records are replaced when their recomputed statistics differ. The caller
+    commits the session.
+
     Args:
         wx_analysis_df (pl.DataFrame): The DataFrame containing analyzed weather data.
+        batch_size (int): The number of rows staged per statement.
 
     Returns:
-        int: The number of new weather analysis records ingested.
+        int: The number of new or updated weather analysis records.
 
     Raises:
-        Exception: If there is an error during the database operations.
+        SQLAlchemyError: If a write fails.
     """
-    try:
-        num_analysis_records = 0
-        if wx_analysis_df is not None:
-            analysis_records = db.session.query(WeatherAnalysis).all()
-
-            existing_analysis = {}
-
-            for row in analysis_records:
-                key = (row.weather_station_id, row.year)
-                existing_analysis[key] = row
-
-            new_analysis_records = []
-            for row in wx_analysis_df.iter_rows():
-                if (row[0], row[1]) not in existing_analysis:
-                    weather_analysis = WeatherAnalysis(
-                        weather_station_id=row[0],
-                        year=row[1],
-                        avg_max_temp_celsius=row[2],
-                        avg_min_temp_celsius=row[3],
-                        accumulated_precipitation_cm=row[4]
-                    )
-                    new_analysis_records.append(weather_analysis)
-            db.session.bulk_save_objects(new_analysis_records)
-            db.session.commit()
-            logger.info("Weather data analysis ingestion complete")
-            num_analysis_records = len(new_analysis_records)
-        
-    except Exception as e:
-        print(f"Error: {e}")
+    return push_analysis(wx_analysis_df, WeatherAnalysis, ['weather_station_id', 'year'], batch_size)
 
-    return num_analysis_records
 
+def push_rollups(wx_df: pl.DataFrame, analysis_input: pl.DataFrame, batch_size: int = STAGING_BATCH_SIZE,
+                 stale_years: list[int] | None = None) -> dict:
+    """
+    Recomputes the monthly, growing-season and regional statistics of the groups touched by new records.
 
+    Only the (station, month) and (station, season) groups with records in wx_df are recomputed from
+    analysis_input, and the regional statistics of their years are recomputed from the stored yearly
+    statistics, so push_weather_analysis must have run first, in the same transaction. Years left
+    without yearly statistics lose their regional record. The caller commits the session.
 
-def ingest_data_main():
+    Args:
+        wx_df (pl.DataFrame): The new or changed weather records.
+        analysis_input (pl.DataFrame): Every record of the (station, year) groups touched by wx_df.
+        batch_size (int): The number of rows staged per statement.
+        stale_years (list[int] | None): Further years whose regional statistics are recomputed, e.g.
+            years whose yearly statistics were deleted by delete_station_records.
+
+    Returns:
+        dict: The number of new or updated records per statistics table.
+    """
+    touched = wx_df.select(
+        'weather_station_id',
+        pl.col('date').dt.year().alias('year'),
+        pl.col('date').dt.month().alias('month')
+    ).unique()
+    touched_seasons = touched.filter(pl.col('month').is_between(*SEASON_MONTHS)).select('weather_station_id', 'year').unique()
+
+    season_input = analysis_input.with_columns(year=pl.col('date').dt.year()).join(
+        touched_seasons, on=['weather_station_id', 'year'], how='semi'
+    ).drop('year')
+    monthly_df = monthly_analysis(analysis_input).join(touched, on=['weather_station_id', 'year', 'month'], how='semi')
+
+    years = sorted(set(touched['year'].unique().to_list()) | set(stale_years or []))
+    query = select(WeatherAnalysis.year, WeatherAnalysis.avg_max_temp_celsius, WeatherAnalysis.avg_min_temp_celsius,
+                   WeatherAnalysis.accumulated_precipitation_cm).where(WeatherAnalysis.year.in_(years))
+    yearly_df = pl.DataFrame([tuple(row) for row in db.session.execute(query)], orient='row', schema={
+        'year': pl.Int32,
+        'avg_max_temp_celsius': pl.Int64,
+        'avg_min_temp_celsius': pl.Int64,
+        'accumulated_precipitation_cm': pl.Int64,
+    })
+
+    regional_df = regional_analysis(yearly_df)
+    emptied = sorted(set(years) - set(regional_df['year'].to_list()))
+    if emptied and db.session.execute(delete(RegionalAnalysis).where(RegionalAnalysis.year.in_(emptied))).rowcount:
+        bump_dataset_version(RegionalAnalysis.__tablename__)
+
+    return {
+        WeatherMonthlyAnalysis.__tablename__: push_analysis(
+            monthly_df, WeatherMonthlyAnalysis, ['weather_station_id', 'year', 'month'], batch_size),
+        WeatherSeasonAnalysis.__tablename__: push_analysis(
+            season_analysis(season_input), WeatherSeasonAnalysis, ['weather_station_id', 'year'], batch_size),
+        RegionalAnalysis.__tablename__: push_analysis(regional_df, RegionalAnalysis, ['year'], batch_size),
+    }
+
+
+def push_quality(quarantine_df: pl.DataFrame, completeness_df: pl.DataFrame, replaced_stations: list[str],
+                 batch_size: int = STAGING_BATCH_SIZE) -> tuple[int, int]:
+    """
+    Stores the quarantined records of a run and the completeness of the (station, year) groups it touched.
+
+    The earlier quarantined records of the stations whose files were read in full are deleted first, and
+    the quarantined records of each group are counted from the stored table, so groups that only received
+    appended records keep the count of their earlier runs. The caller commits the session.
+
+    Args:
+        quarantine_df (pl.DataFrame): The failed records, as returned by validate_weather.
+        completeness_df (pl.DataFrame): The completeness of the touched groups, as returned by station_completeness.
+        replaced_stations (list[str]): The stations whose files were read in full.
+        batch_size (int): The number of rows staged per statement.
+
+    Returns:
+        tuple[int, int]: The number of quarantined records written and the number of new or updated completeness records.
+
+    Raises:
+        SQLAlchemyError: If a write fails.
+    """
+    num_quarantined = num_removed = 0
+    for start in range(0, len(replaced_stations), STATION_BATCH_SIZE):
+        batch = replaced_stations[start:start + STATION_BATCH_SIZE]
+        num_removed += db.session.execute(
+            delete(WeatherQuarantine).where(WeatherQuarantine.weather_station_id.in_(batch))
+        ).rowcount
+    if not quarantine_df.is_empty():
+        num_quarantined, _ = merge_frame(quarantine_df, WeatherQuarantine, ['weather_station_id', 'date', 'rules'],
+                                         True, batch_size)
+    if num_quarantined or num_removed:
+        bump_dataset_version(WeatherQuarantine.__tablename__)
+    logger.info(f"Quarantine complete: {num_quarantined} written, {num_removed} replaced")
+
+    stations: list[str] = completeness_df['weather_station_id'].unique().to_list()
+    counts: list[tuple] = []
+    for start in range(0, len(stations), STATION_BATCH_SIZE):
+        query = select(WeatherQuarantine.weather_station_id, WeatherQuarantine.year, func.count()).where(
+            WeatherQuarantine.weather_station_id.in_(stations[start:start + STATION_BATCH_SIZE])
+        ).group_by(WeatherQuarantine.weather_station_id, WeatherQuarantine.year)
+        counts += [tuple(row) for row in db.session.execute(query)]
+    flagged = pl.DataFrame(counts, orient='row', schema={
+        'weather_station_id': pl.String,
+        'year': pl.Int32,
+        'days_flagged': pl.Int32,
+    })
+
+    completeness_df = completeness_df.join(flagged, on=['weather_station_id', 'year'], how='left', coalesce=True).with_columns(
+        pl.col('days_flagged').fill_null(0)
+    )
+    num_completeness = push_analysis(completeness_df, StationCompleteness, ['weather_station_id', 'year'], batch_size)
+
+    return num_quarantined, num_completeness
+
+
+def load_weather_groups(groups: pl.DataFrame) -> pl.DataFrame:
+    """
+    Reads the stored weather records of (station, year) groups back from the database.
+
+    Args:
+        groups (pl.DataFrame): The groups, with weather_station_id and year columns.
+
+    Returns:
+        pl.DataFrame: The weather records of the groups, in the column layout of wx_consolidation.
+    """
+    conditions = [
+        and_(Weather.weather_station_id == weather_station_id,
+             Weather.date.between(date(min_year, 1, 1), date(max_year, 12, 31)))
+        for weather_station_id, min_year, max_year in groups.group_by('weather_station_id').agg(
+            pl.min('year').alias('min_year'), pl.max('year').alias('max_year')
+        ).iter_rows()
+    ]
+    if not conditions:
+        return pl.DataFrame(schema=WX_FRAME_SCHEMA)
+
+    query = select(Weather.date, Weather.max_temp, Weather.min_temp, Weather.precipitation, Weather.weather_station_id).where(or_(*conditions))
+    df = pl.DataFrame([tuple(row) for row in db.session.execute(query)], schema=WX_FRAME_SCHEMA, orient='row')
+
+    return df.with_columns(year = pl.col('date').dt.year()).join(
+        groups.select('weather_station_id', pl.col('year').cast(pl.Int32)),
+        on=['weather_station_id', 'year'],
+        how='semi'
+    ).drop('year')
+
+
+def ingest_data_main(wx_data: pathlib.Path = WX_DATA, yld_data: pathlib.Path = YLD_DATA, full: bool = False,
+                     dry_run: bool = False, batch_size: int = STAGING_BATCH_SIZE,
+                     progress: Callable[[str, dict], None] | None = None,
+                     parquet_store: pathlib.Path | None = None, station_index: pathlib.Path | None = None,
+                     chunk_files: int = INGEST_CHUNK_FILES, quality_rules: QualityRules | None = None,
+                     stations_file: pathlib.Path | None = STN_DATA) -> dict:
     """
     Main function to ingest weather and yield data, perform analysis, and store results in the database.
 
     This function consolidates weather and yield data from files, performs data analysis, 
     and pushes the raw and analyzed data into the database.
 
+    Runs are incremental: source files are compared with the ingest manifest, unchanged files are
+    skipped, only the appended tail of files that grew is parsed, and only the (station, year)
+    analysis groups with new or changed records are recomputed, along with their monthly,
+    growing-season and regional rollups.
+
+    Parsed weather records are checked against the validation rules before they are stored: failed
+    records go to the quarantine table, their failed readings are stored as null and repeated dates
+    are dropped, so none of them reach the statistics. The completeness of every touched
+    (station, year) group is recomputed along with the statistics.
+
+    The changed files are ingested in chunks: the yield file first, then chunk_files weather files at a
+    time. Each chunk is one transaction: its records, statistics, quarantine and manifest entries are
+    written by helpers that leave the commit to this function, and commit together at the manifest
+    checkpoint, so an interrupted run resumes with the first chunk it did not finish. A chunk that fails
+    is rolled back as a whole and reported, and the run carries on with the next one; its files are
+    retried by the next run. Parquet partitions are files outside the transaction and are rewritten
+    with the chunk on the next run.
+
     It logs the number of records ingested and the total time taken for the process.
+
+    Args:
+        wx_data (pathlib.Path): The folder containing the weather station files.
+        yld_data (pathlib.Path): The yield data file.
+        full (bool): Whether to ignore the manifest and re-read every file.
+        dry_run (bool): Whether to stop after parsing, without writing to the database.
+        batch_size (int): The number of rows staged per statement.
+        progress (Callable[[str, dict], None] | None): Called with the name of each stage as it starts and the summary so far.
+        parquet_store (pathlib.Path | None): The columnar store to update with the touched (station, year)
+            partitions and the statistics tables, or None to only write to the database.
+        station_index (pathlib.Path | None): The station index file to remove before weather records
+            are committed and to rebuild at the end of the run, or None to leave it alone.
+        chunk_files (int): The number of changed weather files ingested and committed together.
+        quality_rules (QualityRules | None): The validation rules, or None for the defaults.
+        stations_file (pathlib.Path | None): The GHCN-style stations file with the station locations, or
+            None to leave them alone; a missing file is skipped.
+
+    Returns:
+        dict: A summary of the run with the number of changed files and of records read and ingested.
+
+    Raises:
+        IngestError: If chunks failed, after the other chunks were committed.
     """
     start_time = datetime.now()
-    wx_df = wx_consolidation(WX_DATA)
-    yld_df = yld_consolidation(YLD_DATA)
-    wx_analysis_df = weather_analysis(wx_df)
-    num_wx_records, num_yld_records = push_raw_data(wx_df, yld_df)
-    num_analysis_records = push_weather_analysis(wx_analysis_df)
+    quality_rules = QualityRules() if quality_rules is None else quality_rules
+    summary: dict = {'dry_run': dry_run}
+    stages = StageRecorder()
+
+    def report(stage: str):
+        if stage == 'done':
+            stages.finish()
+            summary['stages'] = stages.stages
+        else:
+            stages.start(stage)
+        if progress is not None:
+            progress(stage, dict(summary))
+
+    if not wx_data.exists() or not wx_data.is_dir():
+        raise FileNotFoundError(f"The folder path '{wx_data}' does not exist or is not a directory.")
+
+    report('detect_changes')
+    wx_changes: list[SourceChange] = detect_changes(sorted(file for file in wx_data.iterdir() if file.is_file()), full)
+    yld_changes: list[SourceChange] = detect_changes([yld_data], full)
+    stn_changes: list[SourceChange] = []
+    if stations_file is not None and stations_file.is_file():
+        stn_changes = detect_changes([stations_file], full)
+    source_changes: list[SourceChange] = wx_changes + yld_changes + stn_changes
+    summary['files_total'] = len(source_changes)
+    summary['files_changed'] = sum(change.status != 'unchanged' for change in source_changes)
+    stages.add_rows(summary['files_total'])
+
+    changed_wx: list[SourceChange] = [change for change in wx_changes if change.status != 'unchanged']
+    chunks: list[list[SourceChange]] = [[change] for change in yld_changes + stn_changes if change.status != 'unchanged']
+    chunks += [changed_wx[start:start + chunk_files] for start in range(0, len(changed_wx), chunk_files)]
+    summary.update({
+        'chunks_total': len(chunks),
+        'chunks_done': 0,
+        'chunks_failed': [],
+        'wx_records_read': 0,
+        'wx_records_quarantined': 0,
+        'yld_records_read': 0,
+        'stn_records_read': 0,
+    })
+    if not dry_run:
+        summary.update({
+            'wx_records_ingested': 0,
+            'wx_records_deleted': 0,
+            'yld_records_ingested': 0,
+            'stn_records_ingested': 0,
+            'analysis_records_ingested': 0,
+            'rollup_records_ingested': {},
+            'completeness_records_ingested': 0,
+        })
+        if parquet_store is not None:
+            summary['parquet_partitions_written'] = 0
+
+    def ingest_chunk(chunk: list[SourceChange]):
+        report('parse')
+        wx_frames: list[pl.LazyFrame] = []
+        yld_df = stn_df = None
+        for change in chunk:
+            if change.path == yld_data:
+                yld_df = yld_consolidation(yld_data)
+            elif change.path == stations_file:
+                stn_df = stn_consolidation(stations_file)
+            elif change.status in ('new', 'rewritten'):
+                wx_frames.append(scan_wx_file(change.path))
+            elif change.status == 'appended':
+                wx_frames.append(read_wx_tail(change.path, change.offset))
+
+        wx_df = None
+        if wx_frames:
+            wx_df = wx_consolidation_cleanse(pl.concat(wx_frames, how='vertical', parallel=True)).collect(streaming=True)
+
+        wx_records_read = 0 if wx_df is None else wx_df.height
+        yld_records_read = 0 if yld_df is None else yld_df.height
+        stn_records_read = 0 if stn_df is None else stn_df.height
+        summary['wx_records_read'] += wx_records_read
+        summary['yld_records_read'] += yld_records_read
+        summary['stn_records_read'] += stn_records_read
+        stages.add_rows(wx_records_read + yld_records_read + stn_records_read)
+
+        quarantine_df = None
+        if wx_df is not None:
+            report('validate')
+            wx_df, quarantine_df = validate_weather(wx_df, quality_rules)
+            summary['wx_records_quarantined'] += quarantine_df.height
+            stages.add_rows(wx_records_read)
+        if dry_run:
+            return
+
+        report('push_raw_data')
+        rewritten: bool = any(change.status == 'rewritten' for change in chunk)
+        rewritten_stations = [change.path.stem for change in chunk
+                              if change.status == 'rewritten' and change.path not in (yld_data, stations_file)]
+        stale_years: list[int] = []
+        num_deleted = 0
+        if rewritten_stations:
+            num_deleted, stale_years = delete_station_records(rewritten_stations)
+            summary['wx_records_deleted'] += num_deleted
+            stages.add_rows(num_deleted)
+        if yld_df is not None and rewritten:
+            # Years dropped from a rewritten yield file are dropped from the table.
+            if db.session.execute(delete(YieldData).where(YieldData.year.not_in(yld_df['year'].to_list()))).rowcount:
+                bump_dataset_version(YieldData.__tablename__)
+        num_wx_records, num_yld_records = push_raw_data(wx_df, yld_df, rewritten, batch_size)
+        if quarantine_df is not None and not quarantine_df.is_empty() and not rewritten:
+            # Records stored before they were validated keep their failed readings unless updated.
+            corrected = wx_df.join(quarantine_df.select('weather_station_id', 'date'), on=['weather_station_id', 'date'], how='semi')
+            num_wx_records += push_raw_data(corrected, None, True, batch_size)[0]
+        summary['wx_records_ingested'] += num_wx_records
+        summary['yld_records_ingested'] += num_yld_records
+        stages.add_rows(num_wx_records + num_yld_records)
+        if stn_df is not None:
+            num_stn_records = push_station_metadata(stn_df, batch_size)
+            summary['stn_records_ingested'] += num_stn_records
+            stages.add_rows(num_stn_records)
+
+        last_dates: dict[pathlib.Path, date] = {}
+        if wx_df is not None:
+            report('weather_analysis')
+            fully_read = {change.path.stem for change in chunk if change.status in ('new', 'rewritten')}
+            groups = wx_df.select('weather_station_id', pl.col('date').dt.year().alias('year')).unique()
+            appended_groups = groups.filter(~pl.col('weather_station_id').is_in(list(fully_read)))
+
+            analysis_input = pl.concat([
+                wx_df.filter(pl.col('weather_station_id').is_in(list(fully_read))),
+                load_weather_groups(appended_groups),
+            ])
+            num_analysis_records = push_weather_analysis(weather_analysis(analysis_input), batch_size)
+            summary['analysis_records_ingested'] += num_analysis_records
+            stages.add_rows(num_analysis_records)
+
+            report('rollups')
+            for table_name, num_records in push_rollups(wx_df, analysis_input, batch_size, stale_years).items():
+                summary['rollup_records_ingested'][table_name] = summary['rollup_records_ingested'].get(table_name, 0) + num_records
+                stages.add_rows(num_records)
+
+            report('quality')
+            num_quarantined, num_completeness = push_quality(quarantine_df, station_completeness(analysis_input),
+                                                             list(fully_read), batch_size)
+            summary['completeness_records_ingested'] += num_completeness
+            stages.add_rows(num_quarantined + num_completeness)
+
+            if parquet_store is not None:
+                report('parquet_store')
+                delete_stale_partitions(parquet_store, analysis_input, rewritten_stations)
+                num_partitions = write_weather_partitions(analysis_input, parquet_store)
+                summary['parquet_partitions_written'] += num_partitions
+                stages.add_rows(num_partitions)
+
+            station_last_dates = dict(wx_df.group_by('weather_station_id').agg(pl.max('date')).iter_rows())
+            last_dates = {change.path: station_last_dates.get(change.path.stem) for change in chunk}
+
+        # The manifest is the checkpoint: the chunk's files count as ingested once this commits.
+        record_changes(chunk, last_dates)
+        if station_index is not None and (num_wx_records or num_deleted):
+            # Removing the index first sends lookups to SQL until it is rebuilt at the end of the run; the
+            # lock keeps a worker starting up from publishing an index of the data before this commit.
+            with station_index_lock(station_index):
+                station_index.unlink(missing_ok=True)
+                db.session.commit()
+        else:
+            db.session.commit()
+
+    db.session.commit()
+    with bulk_load(db.engine):
+        for number, chunk in enumerate(chunks, 1):
+            try:
+                ingest_chunk(chunk)
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(f"Ingest chunk {number}/{len(chunks)} failed: {e}")
+                summary['chunks_failed'].append({
+                    'chunk': number,
+                    'files': [change.path.name for change in chunk],
+                    'error': str(e),
+                })
+                continue
+
+            summary['chunks_done'] += 1
+            logger.info(f"Ingest chunk {number}/{len(chunks)} {'parsed' if dry_run else 'committed'}: {len(chunk)} files")
+
+    if not dry_run:
+        record_changes([change for change in source_changes if change.status == 'unchanged'])
+        db.session.commit()
+
+        weather_changed: bool = bool(summary['wx_records_ingested'] or summary['wx_records_deleted'])
+        if parquet_store is not None and weather_changed:
+            for model in ANALYSIS_MODELS:
+                write_analysis(parquet_store, model)
+            # The chunks committed their versions before the snapshots were replaced, so requests in between
+            # cached the old snapshots under the new versions; bumping them again retires those entries.
+            for model in ANALYSIS_MODELS:
+                bump_dataset_version(model.__tablename__)
+            db.session.commit()
+
+        if station_index is not None and (weather_changed or not station_index.exists()):
+            report('station_index')
+            summary['station_index_records'] = build_station_index(station_index)
+            stages.add_rows(summary['station_index_records'])
 
     end_time = datetime.now()
+    summary['seconds'] = (end_time - start_time).total_seconds()
+    report('done')
+    INGEST_RUNS.inc()
 
     
-    logger.info(f"Data ingestion completed in {(end_time - start_time).total_seconds()} seconds.")
-    logger.info(f"Number of weather records ingested: {num_wx_records}")
-    logger.info(f"Number of yield records ingested: {num_yld_records}")
-    logger.info(f"Number of weather data analysis records ingested: {num_analysis_records}")
+    logger.info(f"Data ingestion {'dry run ' if dry_run else ''}completed in {summary['seconds']} seconds.")
+    logger.info(f"Source files changed: {summary['files_changed']} of {summary['files_total']}")
+    logger.info(f"Number of weather records ingested: {summary.get('wx_records_ingested', 0)}")
+    logger.info(f"Number of weather records quarantined: {summary['wx_records_quarantined']}")
+    logger.info(f"Number of yield records ingested: {summary.get('yld_records_ingested', 0)}")
+    logger.info(f"Number of weather data analysis records ingested: {summary.get('analysis_records_ingested', 0)}")
+
+    if summary['chunks_failed']:
+        failed = ', '.join(str(failure['chunk']) for failure in summary['chunks_failed'])
+        raise IngestError(f"{len(summary['chunks_failed'])} of {len(chunks)} ingest chunks failed: {failed}", summary)
+
+    return summary
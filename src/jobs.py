@@ -0,0 +1,150 @@
+import pathlib
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import Flask
+from pytz import timezone
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class IngestJob:
+    """
+    Represents one run of the ingestion pipeline on a background worker.
+
+    Attributes:
+        job_id (str): The unique identifier for the job.
+        options (dict): The keyword arguments passed to ingest_data_main.
+        status (str): 'queued', 'running', 'succeeded' or 'failed'.
+        stage (str | None): The pipeline stage currently running.
+        progress (dict): The summary reported by the pipeline so far.
+        error (str | None): The error message if the job failed.
+        submitted (datetime.datetime): The timestamp when the job was submitted.
+        started (datetime.datetime | None): The timestamp when the job started running.
+        finished (datetime.datetime | None): The timestamp when the job finished.
+    """
+    def __init__(self, options: dict):
+        self.job_id = uuid.uuid4().hex
+        self.options = options
+        self.status = 'queued'
+        self.stage = None
+        self.progress = {}
+        self.error = None
+        self.submitted = datetime.now(timezone('UTC'))
+        self.started = None
+        self.finished = None
+
+    def __repr__(self):
+        return f"IngestJob(job_id={self.job_id}, status={self.status}, stage={self.stage})"
+
+    def serialize(self):
+        return {
+            'job_id': self.job_id,
+            'options': self.options,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'error': self.error,
+            'submitted': self.submitted.isoformat(),
+            'started': self.started.isoformat() if self.started else None,
+            'finished': self.finished.isoformat() if self.finished else None
+        }
+
+
+class IngestJobRunner:
+    """
+    Runs ingestion jobs one at a time on a background thread so the API keeps serving meanwhile.
+
+    Only one job runs at a time because the pipeline writes to a single database. The most recent
+    max_jobs jobs are kept for status lookups; older finished jobs are forgotten.
+
+    Attributes:
+        app (Flask): The application whose configuration and database the jobs use.
+        max_jobs (int): The number of jobs kept.
+    """
+    def __init__(self, app: Flask, max_jobs: int = 100):
+        self.app = app
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest')
+        self._jobs: dict[str, IngestJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, options: dict) -> IngestJob | None:
+        """
+        Starts an ingestion job unless one is already queued or running.
+
+        Args:
+            options (dict): The keyword arguments for ingest_data_main.
+
+        Returns:
+            IngestJob | None: The new job, or None if another job is still active.
+        """
+        with self._lock:
+            if any(job.status in ('queued', 'running') for job in self._jobs.values()):
+                return None
+            job = IngestJob(options)
+            self._jobs[job.job_id] = job
+            # Jobs are kept in submission order and only the new one is active, so the oldest go first.
+            while len(self._jobs) > self.max_jobs:
+                del self._jobs[next(iter(self._jobs))]
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        """
+        Looks up a job.
+
+        Args:
+            job_id (str): The ID of the job.
+
+        Returns:
+            IngestJob | None: The job, or None if it is unknown.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: IngestJob):
+        """
+        Runs the pipeline for a job inside an application context and records its outcome.
+
+        Args:
+            job (IngestJob): The job to run.
+        """
+        from ingest_data import IngestError, ingest_data_main
+
+        def progress(stage: str, summary: dict):
+            job.stage = stage
+            job.progress = summary
+
+        parquet_store = None
+        if self.app.config.get('WEATHER_BACKEND') == 'parquet':
+            parquet_store = pathlib.Path(self.app.config['PARQUET_STORE'])
+        station_index = None
+        if self.app.config.get('STATION_INDEX_ENABLED'):
+            station_index = pathlib.Path(self.app.config['STATION_INDEX_PATH'])
+
+        job.status = 'running'
+        job.started = datetime.now(timezone('UTC'))
+        try:
+            with self.app.app_context():
+                ingest_data_main(self.app.config['WX_DATA'], self.app.config['YLD_DATA'], progress=progress,
+                                 parquet_store=parquet_store, station_index=station_index,
+                                 quality_rules=self.app.extensions.get('quality_rules'),
+                                 stations_file=self.app.config.get('STATIONS_FILE'), **job.options)
+            job.status = 'succeeded'
+        except IngestError as e:
+            logger.error(f"Ingest job {job.job_id} failed: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+            job.progress = e.summary
+        except Exception as e:
+            logger.error(f"Ingest job {job.job_id} failed: {e}\n{traceback.format_exc()}")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished = datetime.now(timezone('UTC'))
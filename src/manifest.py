@@ -0,0 +1,150 @@
+import hashlib
+import pathlib
+from typing import NamedTuple
+from datetime import date, datetime
+from pytz import timezone
+from models import db, IngestManifest
+
+
+HASH_CHUNK_SIZE: int = 1 << 20
+
+
+class SourceChange(NamedTuple):
+    """
+    Describes how a source file changed since its last ingestion.
+
+    Attributes:
+        path (pathlib.Path): The source file.
+        status (str): 'new', 'unchanged', 'appended' or 'rewritten'.
+        offset (int): The byte offset to read from; the previous size for appended files, otherwise 0.
+        size (int): The current size of the file in bytes.
+        mtime_ns (int): The current modification time of the file in nanoseconds.
+        content_hash (str | None): The SHA-256 hex digest of the current content, None if it did not need hashing.
+    """
+    path: pathlib.Path
+    status: str
+    offset: int
+    size: int
+    mtime_ns: int
+    content_hash: str | None
+
+
+def _hash_file(path: pathlib.Path, prefix_size: int | None = None) -> tuple[str, str | None, bytes]:
+    """
+    Hashes a file, optionally also hashing its first bytes and reporting the byte that ends them.
+
+    Args:
+        path (pathlib.Path): The file to hash.
+        prefix_size (int | None): The number of leading bytes to hash separately.
+
+    Returns:
+        tuple[str, str | None, bytes]: The digest of the whole file, the digest of the prefix and the last byte of the prefix.
+    """
+    hasher = hashlib.sha256()
+    prefix_hash = None
+    prefix_end = b''
+
+    with open(path, 'rb') as file:
+        if prefix_size is not None:
+            remaining = prefix_size
+            while remaining > 0:
+                chunk = file.read(min(HASH_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                prefix_end = chunk[-1:]
+                remaining -= len(chunk)
+            prefix_hash = hasher.copy().hexdigest()
+
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+
+    return hasher.hexdigest(), prefix_hash, prefix_end
+
+
+def detect_change(path: pathlib.Path, entry: IngestManifest | None) -> SourceChange:
+    """
+    Compares a source file with its manifest entry.
+
+    Files whose size and mtime match the entry are reported unchanged without being read. A file
+    that grew is reported appended when its previous content is an unchanged prefix ending on a
+    line break, so only the new tail has to be parsed.
+
+    Args:
+        path (pathlib.Path): The source file.
+        entry (IngestManifest | None): The manifest entry of the file, None if it was never ingested.
+
+    Returns:
+        SourceChange: The detected change.
+    """
+    stat = path.stat()
+
+    if entry is None:
+        content_hash, _, _ = _hash_file(path)
+        return SourceChange(path, 'new', 0, stat.st_size, stat.st_mtime_ns, content_hash)
+
+    if stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns:
+        return SourceChange(path, 'unchanged', 0, stat.st_size, stat.st_mtime_ns, entry.content_hash)
+
+    if stat.st_size > entry.size:
+        content_hash, prefix_hash, prefix_end = _hash_file(path, entry.size)
+        if prefix_hash == entry.content_hash and prefix_end in (b'\n', b''):
+            return SourceChange(path, 'appended', entry.size, stat.st_size, stat.st_mtime_ns, content_hash)
+    else:
+        content_hash, _, _ = _hash_file(path)
+        if content_hash == entry.content_hash:
+            return SourceChange(path, 'unchanged', 0, stat.st_size, stat.st_mtime_ns, content_hash)
+
+    return SourceChange(path, 'rewritten', 0, stat.st_size, stat.st_mtime_ns, content_hash)
+
+
+def detect_changes(paths: list[pathlib.Path], full: bool = False) -> list[SourceChange]:
+    """
+    Compares source files with the manifest.
+
+    Args:
+        paths (list[pathlib.Path]): The source files.
+        full (bool): Whether to ignore the manifest and report every file as new.
+
+    Returns:
+        list[SourceChange]: The detected change of every file, in the order of paths.
+    """
+    entries: dict[str, IngestManifest] = {}
+    if not full:
+        entries = {entry.source_file: entry for entry in db.session.query(IngestManifest).all()}
+
+    return [detect_change(path, entries.get(str(path.resolve()))) for path in paths]
+
+
+def record_changes(changes: list[SourceChange], last_dates: dict[pathlib.Path, date] | None = None):
+    """
+    Stores the current state of source files in the manifest.
+
+    Unchanged files whose entry is already current are left alone. The caller commits the session.
+
+    Args:
+        changes (list[SourceChange]): The changes returned by detect_changes.
+        last_dates (dict[pathlib.Path, date] | None): The latest observation date read from each file.
+    """
+    last_dates = last_dates or {}
+    entries: dict[str, IngestManifest] = {entry.source_file: entry for entry in db.session.query(IngestManifest).all()}
+    now = datetime.now(timezone('UTC'))
+
+    for change in changes:
+        source_file = str(change.path.resolve())
+        entry = entries.get(source_file)
+        last_date = last_dates.get(change.path)
+
+        if entry is None:
+            db.session.add(IngestManifest(source_file, change.size, change.mtime_ns, change.content_hash, last_date, now))
+            continue
+
+        if change.status == 'unchanged' and entry.mtime_ns == change.mtime_ns:
+            continue
+
+        entry.size = change.size
+        entry.mtime_ns = change.mtime_ns
+        entry.content_hash = change.content_hash
+        if last_date is not None and (change.status != 'appended' or entry.last_ingested_date is None or last_date > entry.last_ingested_date):
+            entry.last_ingested_date = last_date
+        entry.updated = now
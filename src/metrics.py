@@ -0,0 +1,422 @@
+import math
+import resource
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import Engine, event
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histograms, in seconds; requests range from a millisecond to whole-table scans.
+LATENCY_BUCKETS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Endpoints whose requests are timed, by Flask endpoint name.
+INSTRUMENTED_ENDPOINTS: tuple[str, ...] = ('weather', 'weather_stats')
+# Parts of a request that are timed separately; the rest of the total is filter parsing, caching and framework overhead.
+REQUEST_PHASES: tuple[str, ...] = ('sql', 'count', 'serialize')
+CONTENT_TYPE: str = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    A family of Prometheus samples sharing a name and label names.
+
+    Attributes:
+        name (str): The metric name.
+        help (str): The description shown by Prometheus.
+        labels (tuple[str, ...]): The label names; every sample has a value for each of them.
+    """
+    type: str = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(name={self.name}, labels={self.labels})"
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects the labels {', '.join(self.labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _selector(self, key: tuple, extra: tuple = ()) -> str:
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def samples(self) -> list[str]:
+        """
+        Returns the sample lines of the metric in the Prometheus text format.
+
+        Returns:
+            list[str]: The lines, without the HELP and TYPE comments.
+        """
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        """
+        Returns the metric in the Prometheus text format.
+
+        Returns:
+            list[str]: The HELP and TYPE comments followed by the sample lines.
+        """
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}', *self.samples()]
+
+
+class Counter(Metric):
+    """
+    A value that only grows, such as a number of requests.
+    """
+    type = 'counter'
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels):
+        """
+        Adds to the value of a label set.
+
+        Args:
+            amount (float): The non-negative amount to add.
+            **labels: The value of every label.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def value(self, **labels) -> float:
+        """
+        Returns the value of a label set, 0 if it was never incremented.
+
+        Args:
+            **labels: The value of every label.
+
+        Returns:
+            float: The value.
+        """
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            return [f'{self.name}{self._selector(key)} {_format_value(value)}' for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    """
+    A value that can go up and down, such as the duration of the last run of an ingestion stage.
+    """
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        """
+        Replaces the value of a label set.
+
+        Args:
+            value (float): The new value.
+            **labels: The value of every label.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Counts observations into cumulative buckets, such as request durations.
+
+    Attributes:
+        buckets (tuple[float, ...]): The inclusive upper bounds of the buckets, in increasing order.
+    """
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels):
+        """
+        Records one observation.
+
+        Args:
+            value (float): The observed value.
+            **labels: The value of every label.
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        """
+        Returns the number of observations of a label set.
+
+        Args:
+            **labels: The value of every label.
+
+        Returns:
+            int: The number of observations.
+        """
+        with self._lock:
+            return sum(self._counts.get(self._key(labels), []))
+
+    def samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for key in sorted(self._counts):
+                cumulative = 0
+                for bound, count in zip(self.buckets, self._counts[key]):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{self._selector(key, [("le", _format_value(bound))])} {cumulative}')
+                lines.append(f'{self.name}_sum{self._selector(key)} {_format_value(self._sums[key])}')
+                lines.append(f'{self.name}_count{self._selector(key)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """
+    The metrics of a process, rendered together at the `/metrics` endpoint.
+    """
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def __repr__(self):
+        return f"Registry(metrics={list(self._metrics)})"
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Adds a metric to the registry.
+
+        Args:
+            metric (Metric): The metric.
+
+        Returns:
+            Metric: The metric, so registration can be chained with its definition.
+
+        Raises:
+            ValueError: If another metric has the same name.
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f"A metric named {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition, ending with a newline.
+        """
+        return ''.join(line + '\n' for metric in self._metrics.values() for line in metric.render())
+
+
+REGISTRY = Registry()
+REQUESTS = REGISTRY.register(Counter(
+    'weather_api_requests_total', 'Requests served, by endpoint and status code.', ('endpoint', 'status')))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'weather_api_request_seconds', 'Time to serve a request, by endpoint.', ('endpoint',)))
+REQUEST_PHASE_SECONDS = REGISTRY.register(Histogram(
+    'weather_api_request_phase_seconds', 'Time spent on SQL, counting and serialization per request.', ('endpoint', 'phase')))
+SLOW_QUERIES = REGISTRY.register(Counter(
+    'weather_api_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS.'))
+INGEST_RUNS = REGISTRY.register(Counter(
+    'weather_ingest_runs_total', 'Completed runs of the ingestion pipeline.'))
+INGEST_STAGE_SECONDS = REGISTRY.register(Gauge(
+    'weather_ingest_stage_seconds', 'Duration of each stage in the last ingest.', ('stage',)))
+INGEST_STAGE_ROWS = REGISTRY.register(Gauge(
+    'weather_ingest_stage_rows', 'Rows processed by each stage in the last ingest.', ('stage',)))
+INGEST_STAGE_PEAK_RSS = REGISTRY.register(Gauge(
+    'weather_ingest_stage_peak_rss_bytes', 'Peak resident memory of the process at the end of each stage in the last ingest.', ('stage',)))
+
+
+def peak_rss() -> int:
+    """
+    Returns the peak resident memory of the process so far.
+
+    Returns:
+        int: The peak RSS in bytes.
+    """
+    # ru_maxrss is in kibibytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Adds the time spent in a block to a phase of the current request, if the request is instrumented.
+
+    Outside instrumented requests, e.g. in ingestion or exports, the block runs untimed.
+
+    Args:
+        name (str): The phase, one of REQUEST_PHASES.
+    """
+    if not has_request_context() or 'request_phases' not in g:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.request_phases[name] += time.perf_counter() - start
+
+
+def instrument_requests(app: Flask, endpoints: tuple[str, ...] = INSTRUMENTED_ENDPOINTS):
+    """
+    Records the duration of every request to endpoints, and of its phases, in the request histograms.
+
+    Args:
+        app (Flask): The application.
+        endpoints (tuple[str, ...]): The endpoint names to instrument.
+    """
+    @app.before_request
+    def start_request_timer():
+        if request.endpoint in endpoints:
+            g.request_start = time.perf_counter()
+            g.request_phases = dict.fromkeys(REQUEST_PHASES, 0.0)
+
+    @app.after_request
+    def record_request_timer(response: Response) -> Response:
+        if 'request_start' in g:
+            REQUESTS.inc(endpoint=request.endpoint, status=response.status_code)
+            REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint=request.endpoint)
+            for name, seconds in g.request_phases.items():
+                REQUEST_PHASE_SECONDS.observe(seconds, endpoint=request.endpoint, phase=name)
+        return response
+
+
+def explain_statement(dbapi_connection, dialect: str, statement: str, parameters) -> list[str]:
+    """
+    Returns the query plan of a statement, on a new cursor of the connection that ran it.
+
+    Args:
+        dbapi_connection: The DBAPI connection.
+        dialect (str): The SQLAlchemy dialect name, e.g. 'sqlite' or 'postgresql'.
+        statement (str): The SQL statement, with DBAPI placeholders.
+        parameters: The DBAPI parameters of the statement.
+
+    Returns:
+        list[str]: The lines of the plan.
+    """
+    prefix = 'EXPLAIN QUERY PLAN' if dialect == 'sqlite' else 'EXPLAIN'
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f'{prefix} {statement}', parameters)
+        return [str(row[-1]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def log_slow_queries(engine: Engine, threshold_ms: float):
+    """
+    Logs every SELECT statement of an engine that takes longer than a threshold, with its query plan.
+
+    The time measured is that of the DBAPI execute call; rows fetched afterwards are not included.
+
+    Args:
+        engine (Engine): The engine to watch.
+        threshold_ms (float): The threshold in milliseconds.
+    """
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def check_query_timer(connection, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - connection.info['query_start'].pop()) * 1000
+        if elapsed_ms < threshold_ms or executemany or not statement.lstrip().upper().startswith('SELECT'):
+            return
+
+        SLOW_QUERIES.inc()
+        try:
+            plan = explain_statement(cursor.connection, engine.dialect.name, statement, parameters)
+        except Exception as e:
+            plan = [f'EXPLAIN failed: {e}']
+        logger.warning(f"Slow query ({elapsed_ms:.1f} ms): {' '.join(statement.split())} {parameters!r}\n"
+                       + '\n'.join(f'  {line}' for line in plan))
+
+
+class StageRecorder:
+    """
+    Times the stages of an ingestion run, one after the other, with their row counts and memory.
+
+    Each finished stage is logged, exported as gauges and kept in `stages`. A stage that runs again,
+    such as once per ingest chunk, adds its seconds and rows to the earlier runs.
+
+    Attributes:
+        stages (dict[str, dict]): The seconds, rows and peak RSS of each finished stage, in run order.
+    """
+    def __init__(self):
+        self.stages: dict[str, dict] = {}
+        self._stage: str | None = None
+        self._start = 0.0
+        self._rows = 0
+
+    def __repr__(self):
+        return f"StageRecorder(stage={self._stage}, finished={list(self.stages)})"
+
+    def start(self, stage: str):
+        """
+        Finishes the running stage, if any, and starts the next one.
+
+        Args:
+            stage (str): The name of the stage.
+        """
+        self.finish()
+        self._stage = stage
+        self._start = time.perf_counter()
+        self._rows = 0
+
+    def add_rows(self, rows: int):
+        """
+        Adds to the number of rows processed by the running stage.
+
+        Args:
+            rows (int): The number of rows.
+        """
+        self._rows += rows
+
+    def finish(self):
+        """
+        Finishes the running stage, if any.
+        """
+        if self._stage is None:
+            return
+
+        stage, self._stage = self._stage, None
+        seconds = time.perf_counter() - self._start
+        rss = peak_rss()
+        previous = self.stages.get(stage, {'seconds': 0.0, 'rows': 0})
+        total_seconds = previous['seconds'] + seconds
+        total_rows = previous['rows'] + self._rows
+        self.stages[stage] = {'seconds': round(total_seconds, 3), 'rows': total_rows, 'peak_rss_mib': round(rss / 2 ** 20, 1)}
+
+        INGEST_STAGE_SECONDS.set(total_seconds, stage=stage)
+        INGEST_STAGE_ROWS.set(total_rows, stage=stage)
+        INGEST_STAGE_PEAK_RSS.set(rss, stage=stage)
+        logger.info(f"Ingest stage {stage}: {seconds:.3f} seconds, {self._rows} rows, peak RSS {rss / 2 ** 20:.1f} MiB")
@@ -0,0 +1,224 @@
+from models import db, Station, weather_columns, weather_table, YieldData, WeatherAnalysis
+from sqlalchemy import Index, Integer, MetaData, Table, UniqueConstraint, cast, delete, func, inspect, select, text
+from datetime import datetime
+import argparse
+import logging
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def remove_duplicates(table: Table, key_columns: list[str]) -> int:
+    """
+    Removes rows that duplicate an earlier row on the natural key, keeping the oldest row.
+
+    Args:
+        table (Table): The table to deduplicate.
+        key_columns (list[str]): The columns of the natural key.
+
+    Returns:
+        int: The number of duplicate rows deleted.
+    """
+    primary_key = table.primary_key.columns.values()[0]
+    keep = select(func.min(primary_key)).group_by(*[table.c[name] for name in key_columns])
+    result = db.session.execute(delete(table).where(primary_key.not_in(keep)))
+
+    return result.rowcount
+
+
+def add_missing_indexes(table: Table) -> list[str]:
+    """
+    Creates the unique constraints and indexes declared on a model that are missing from the database.
+
+    Unique constraints are created as unique indexes, since SQLite cannot add constraints to an existing table.
+    An index counts as present when the database already has one over the same columns.
+
+    Args:
+        table (Table): The table whose declared indexes should exist.
+
+    Returns:
+        list[str]: The names of the indexes that were created.
+    """
+    inspector = inspect(db.session.connection())
+    existing: set[tuple[tuple[str, ...], bool]] = set()
+    for index in inspector.get_indexes(table.name):
+        existing.add((tuple(index['column_names']), bool(index['unique'])))
+    for constraint in inspector.get_unique_constraints(table.name):
+        existing.add((tuple(constraint['column_names']), True))
+
+    # The primary key of a WITHOUT ROWID table is its clustered unique index.
+    existing.add((tuple(inspector.get_pk_constraint(table.name)['constrained_columns']), True))
+
+    # Indexes built from the unique constraints attach to their table, so they are built on a detached copy.
+    table = table.to_metadata(MetaData())
+    declared: list[Index] = list(table.indexes)
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            declared.append(Index(constraint.name, *constraint.columns, unique=True))
+
+    created: list[str] = []
+    for index in declared:
+        if (tuple(column.name for column in index.columns), bool(index.unique)) not in existing:
+            index.create(db.session.connection())
+            created.append(index.name)
+
+    return created
+
+
+def weather_layout() -> str | None:
+    """
+    Tells how the weather table of the database is stored.
+
+    Returns:
+        str | None: 'legacy' for readings keyed by the station ID string, 'without_rowid' for a SQLite table
+            clustered on (station_id, date), 'rowid' for the default layout, or None if there is no table yet.
+    """
+    connection = db.session.connection()
+    inspector = inspect(connection)
+    if not inspector.has_table('weather'):
+        return None
+    if 'weather_station_id' in {column['name'] for column in inspector.get_columns('weather')}:
+        return 'legacy'
+    if connection.dialect.name == 'sqlite':
+        ddl = connection.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'weather'")).scalar()
+        if 'WITHOUT ROWID' in ddl.upper():
+            return 'without_rowid'
+
+    return 'rowid'
+
+
+def rebuild_weather_table(without_rowid: bool = False) -> int:
+    """
+    Copies the weather table into the current compact layout and swaps it in.
+
+    A legacy table has its station IDs moved to the station table and its dates and timestamps converted
+    to the compact SQLite encodings. Secondary indexes are left to add_missing_indexes, which builds them
+    faster on the filled table.
+
+    Args:
+        without_rowid (bool): Whether the new table is a SQLite WITHOUT ROWID table clustered on (station_id, date).
+
+    Returns:
+        int: The number of rows copied.
+    """
+    connection = db.session.connection()
+    sqlite = connection.dialect.name == 'sqlite'
+    layout = weather_layout()
+    source = Table('weather', MetaData(), autoload_with=connection)
+
+    if layout == 'legacy':
+        names = select(source.c.weather_station_id).where(source.c.weather_station_id.is_not(None)).distinct()
+        missing = names.where(source.c.weather_station_id.not_in(select(Station.weather_station_id)))
+        connection.execute(Station.__table__.insert().from_select(
+            ['weather_station_id'], missing.order_by(source.c.weather_station_id)))
+        num_orphans = connection.execute(
+            select(func.count()).where(source.c.weather_station_id.is_(None))).scalar()
+        if num_orphans:
+            logger.warning(f"Dropping {num_orphans} weather rows without a station ID")
+
+        station = Station.__table__
+        date_column = cast(func.julianday(source.c.date) + 0.5, Integer) if sqlite else source.c.date
+        created_column = (cast(func.strftime('%s', source.c.created), Integer) * 1_000_000
+                          + cast(func.substr(source.c.created, 21, 6), Integer)) if sqlite else source.c.created
+        rows = select(source.c.weather_id, station.c.station_id, date_column, source.c.max_temp,
+                      source.c.min_temp, source.c.precipitation, created_column
+                      ).join(station, station.c.weather_station_id == source.c.weather_station_id)
+    else:
+        rows = select(*[source.c[column.name] for column in weather_table.columns])
+
+    metadata = MetaData()
+    Station.__table__.to_metadata(metadata)
+    target = Table('weather_rebuild', metadata, *weather_columns(without_rowid),
+                   sqlite_with_rowid=not without_rowid)
+    target.drop(connection, checkfirst=True)
+    target.create(connection)
+
+    order = [rows.selected_columns[1], rows.selected_columns[2]] if without_rowid else [rows.selected_columns[0]]
+    num_rows = connection.execute(
+        target.insert().from_select([column.name for column in target.columns], rows.order_by(*order))
+    ).rowcount
+
+    source.drop(connection)
+    connection.execute(text('ALTER TABLE weather_rebuild RENAME TO weather'))
+    logger.info(f"Rebuilt weather ({layout} to {'without_rowid' if without_rowid else 'rowid'}): {num_rows} rows")
+
+    return num_rows
+
+
+def migrate_indexes(without_rowid: bool = False) -> dict[str, list[str]]:
+    """
+    Brings an existing database up to date with the natural-key constraints and query indexes of the models.
+
+    A legacy weather table, keyed by the station ID string, is deduplicated and rebuilt in the compact layout
+    first. Duplicate natural keys left behind by earlier ingests are removed so the unique indexes can be built.
+
+    Args:
+        without_rowid (bool): Whether the weather table is rebuilt as a SQLite WITHOUT ROWID table clustered
+            on (station_id, date), if it is not one already.
+
+    Returns:
+        dict[str, list[str]]: The names of the created indexes per table.
+    """
+    layout = weather_layout()
+    if layout == 'legacy':
+        legacy = Table('weather', MetaData(), autoload_with=db.session.connection())
+        num_duplicates = remove_duplicates(legacy, ['weather_station_id', 'date'])
+        if num_duplicates:
+            logger.info(f"Removed {num_duplicates} duplicate rows from weather")
+    if layout == 'legacy' or (without_rowid and layout == 'rowid' and db.engine.dialect.name == 'sqlite'):
+        rebuild_weather_table(without_rowid)
+
+    natural_keys: dict[Table, list[str]] = {
+        weather_table: ['station_id', 'date'],
+        YieldData.__table__: ['year'],
+        WeatherAnalysis.__table__: ['weather_station_id', 'year'],
+    }
+
+    created: dict[str, list[str]] = {}
+    for table, key_columns in natural_keys.items():
+        num_duplicates = remove_duplicates(table, key_columns)
+        if num_duplicates:
+            logger.info(f"Removed {num_duplicates} duplicate rows from {table.name}")
+        created[table.name] = add_missing_indexes(table)
+
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+
+    return created
+
+
+def migrate_main(without_rowid: bool = False):
+    """
+    Main function to migrate the configured database to the current schema.
+
+    A SQLite database is vacuumed afterwards so the space freed by a rebuilt table is returned.
+    It logs the indexes that were created and the total time taken for the migration.
+
+    Args:
+        without_rowid (bool): Whether the weather table is rebuilt as a SQLite WITHOUT ROWID table.
+    """
+    start_time = datetime.now()
+    db.create_all()
+    created = migrate_indexes(without_rowid)
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.exec_driver_sql('VACUUM')
+    end_time = datetime.now()
+
+    for table_name, index_names in created.items():
+        logger.info(f"Indexes created on {table_name}: {', '.join(index_names) or 'none'}")
+    logger.info(f"Migration completed in {(end_time - start_time).total_seconds()} seconds.")
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    parser = argparse.ArgumentParser(description="Migrate the configured database to the current schema.")
+    parser.add_argument('--without-rowid', action='store_true',
+                        help="Rebuild the weather table as a SQLite WITHOUT ROWID table clustered on (station_id, date).")
+    args = parser.parse_args()
+
+    app = create_app({'SCHEMA_CHECK': False, 'STATION_INDEX_ENABLED': False})
+    with app.app_context():
+        migrate_main(args.without_rowid)
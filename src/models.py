@@ -1,15 +1,237 @@
+from flask import has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from flask_sqlalchemy.session import Session
+from datetime import date, datetime, timedelta
 from pytz import timezone
+from sqlalchemy import Engine, TypeDecorator, select
+from sqlalchemy.orm import ColumnProperty, column_property
+from sqlalchemy.sql import operators
 
 
-db = SQLAlchemy()
+# Bind key of the optional read-only engine that serves GET and HEAD requests.
+READ_ONLY_BIND: str = 'read_only'
+READ_METHODS: tuple[str, ...] = ('GET', 'HEAD')
+
+# Julian day number of date.fromordinal(0); SQLite's date functions read integer dates as Julian day numbers.
+JULIAN_DAY_OFFSET: int = 1721425
+EPOCH: datetime = datetime(1970, 1, 1)
+
+class RoutingSession(Session):
+    """
+    A session that sends the queries of GET and HEAD requests to the read-only engine when one is configured.
+
+    Everything else, including ingestion outside of a request, uses the default engine.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and request.method in READ_METHODS:
+            engine = self._db.engines.get(READ_ONLY_BIND)
+            if engine is not None:
+                return engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def request_engine() -> Engine:
+    """
+    Returns the engine for connections opened outside the session, routed like RoutingSession.
+
+    Returns:
+        Engine: The read-only engine during GET and HEAD requests if one is configured, the default engine otherwise.
+    """
+    if has_request_context() and request.method in READ_METHODS:
+        return db.engines.get(READ_ONLY_BIND, db.engine)
+
+    return db.engine
+
+
+class CompactDate(TypeDecorator):
+    """
+    A date stored in SQLite as its integer Julian day number, 4 bytes instead of a 10 character string.
+
+    SQLite's strftime and julianday read the number directly, so grouping by year or month keeps working.
+    Other databases store a native DATE.
+    """
+    impl = db.Date
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return date
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'sqlite':
+            return dialect.type_descriptor(db.Integer())
+        return dialect.type_descriptor(db.Date())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return value.toordinal() + JULIAN_DAY_OFFSET
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return date.fromordinal(value - JULIAN_DAY_OFFSET)
+
+
+class CompactDateTime(TypeDecorator):
+    """
+    A naive UTC timestamp stored in SQLite as integer microseconds since the epoch, instead of a 26 character string.
+
+    Timezone-aware values are stored as their wall-clock time, as SQLAlchemy's SQLite DateTime does.
+    Other databases store a native TIMESTAMP.
+    """
+    impl = db.DateTime
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return datetime
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'sqlite':
+            return dialect.type_descriptor(db.BigInteger())
+        return dialect.type_descriptor(db.DateTime())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return (value.replace(tzinfo=None) - EPOCH) // timedelta(microseconds=1)
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return EPOCH + timedelta(microseconds=value)
+
+
+class Station(db.Model):
+    """
+    Represents a weather station, the dimension the weather readings refer to by integer key.
+
+    Attributes:
+        station_id (int): The unique identifier for the station.
+        weather_station_id (str): The ID of the weather station.
+    """
+    __tablename__ = 'station'
+    station_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    weather_station_id = db.Column(db.String(80), unique=True, nullable=False)
+
+    def __init__(self, weather_station_id):
+        self.weather_station_id = weather_station_id
+
+    def __repr__(self):
+        return f"Station(station_id={self.station_id}, weather_station_id={self.weather_station_id})"
+
+
+class StationMetadata(db.Model):
+    """
+    Represents the location of a weather station, as listed in a GHCN-style stations file.
+
+    The file may list stations without readings; the stations endpoint and the nearest-station lookup
+    only use those that also have a row in the station table.
+
+    Attributes:
+        station_metadata_id (int): The unique identifier for the metadata.
+        weather_station_id (str): The ID of the weather station.
+        name (str): The name of the station.
+        latitude (float): The latitude in decimal degrees.
+        longitude (float): The longitude in decimal degrees.
+        elevation (float): The elevation in meters, if known.
+        state (str): The two-letter state code, if any.
+        created (datetime.datetime): The timestamp when the metadata was created.
+    """
+    __tablename__ = 'station_metadata'
+    station_metadata_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    weather_station_id = db.Column(db.String(80), unique=True, nullable=False)
+    name = db.Column(db.String(80), nullable=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    elevation = db.Column(db.Float, nullable=True)
+    state = db.Column(db.String(2), nullable=True)
+    created = db.Column(db.DateTime, default=datetime.now(timezone('UTC')), nullable=False)
+
+    def __init__(self, weather_station_id, latitude, longitude, elevation=None, state=None, name=None, created=None):
+        self.weather_station_id = weather_station_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.elevation = elevation
+        self.state = state
+        self.name = name
+        if created is None:
+            created = datetime.now(timezone('UTC'))
+        self.created = created
+
+    def __repr__(self):
+        return f"StationMetadata(station_metadata_id={self.station_metadata_id}, weather_station_id={self.weather_station_id}, name={self.name}, latitude={self.latitude}, longitude={self.longitude}, elevation={self.elevation}, state={self.state}, created={self.created})"
+
+    def serialize(self):
+        return {
+            'weather_station_id':self.weather_station_id,
+            'name':self.name,
+            'latitude':self.latitude,
+            'longitude':self.longitude,
+            'elevation':self.elevation,
+            'state':self.state,
+        }
+
+
+def weather_columns(without_rowid: bool = False) -> list[db.Column]:
+    """
+    Builds the columns of the weather table.
+
+    Args:
+        without_rowid (bool): Whether the table is clustered on (station_id, date), the primary key of a
+            SQLite WITHOUT ROWID table, rather than on weather_id.
+
+    Returns:
+        list[db.Column]: The columns.
+    """
+    return [
+        db.Column('weather_id', db.Integer, primary_key=not without_rowid, autoincrement=not without_rowid, nullable=False),
+        db.Column('station_id', db.Integer, db.ForeignKey('station.station_id'), primary_key=without_rowid, nullable=False),
+        db.Column('date', CompactDate, primary_key=without_rowid, nullable=False),
+        db.Column('max_temp', db.SmallInteger, nullable=True),
+        db.Column('min_temp', db.SmallInteger, nullable=True),
+        db.Column('precipitation', db.SmallInteger, nullable=True),
+        db.Column('created', CompactDateTime, default=datetime.now(timezone('UTC'))),
+    ]
+
+
+# The readings, narrow integers keyed by station_id; `python migrate.py --without-rowid` rebuilds the
+# table clustered on (station_id, date), which the mapping below reads the same way.
+weather_table = db.Table(
+    'weather',
+    *weather_columns(),
+    db.UniqueConstraint('station_id', 'date', name='uq_weather_station_date'),
+    db.Index('ix_weather_date_station', 'date', 'station_id'),
+)
+
+
+class StationIdComparator(ColumnProperty.Comparator):
+    """
+    Compares Weather.weather_station_id by looking the station up first, so filters on a station
+    seek the (station_id, date) index of the readings instead of joining every reading to its station.
+    """
+    def operate(self, op, *other, **kwargs):
+        if op in (operators.eq, operators.in_op):
+            station = Station.__table__
+            keys = select(station.c.station_id).where(op(station.c.weather_station_id, *other, **kwargs))
+            return weather_table.c.station_id.in_(keys)
+
+        return super().operate(op, *other, **kwargs)
 
 
 class Weather(db.Model):
     """
     Represents weather data stored in the database.
 
+    The class maps the outer join of the weather and station tables, so the station ID reads and filters
+    like a column of the readings. Every reading has a station; the outer join keeps the readings as the
+    driving table, so unfiltered queries scan them in weather_id order and counts skip the join.
+
     Attributes:
         weather_id (int): The unique identifier for the weather data.
         weather_station_id (str): The ID of the weather station.
@@ -20,13 +242,11 @@ class Weather(db.Model):
         created (datetime.datetime): The timestamp when the data was created.
     """
     __tablename__ = 'weather'
-    weather_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
-    weather_station_id = db.Column(db.String(80))
-    date = db.Column(db.Date, nullable=False)
-    max_temp = db.Column(db.Integer, nullable=True)
-    min_temp = db.Column(db.Integer, nullable=True)
-    precipitation = db.Column(db.Integer, nullable=True)
-    created = db.Column(db.DateTime, default=datetime.now(timezone('UTC')))
+    __table__ = db.join(weather_table, Station.__table__, isouter=True)
+    __mapper_args__ = {'primary_key': [weather_table.c.weather_id]}
+    weather_id = weather_table.c.weather_id
+    station_id = column_property(weather_table.c.station_id, Station.__table__.c.station_id)
+    weather_station_id = column_property(Station.__table__.c.weather_station_id, comparator_factory=StationIdComparator)
 
     def __init__(self, weather_station_id, date, max_temp, min_temp, precipitation, created=None):
         self.weather_station_id = weather_station_id
@@ -64,6 +284,9 @@ class YieldData(db.Model):
         created (datetime.datetime): The timestamp when the data was created.
     """
     __tablename__ = 'yield_data'
+    __table_args__ = (
+        db.UniqueConstraint('year', name='uq_yield_data_year'),
+    )
     yield_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
     year = db.Column(db.Integer, nullable=False)
     yield_amount = db.Column(db.Integer, nullable=True)
@@ -103,6 +326,10 @@ class WeatherAnalysis(db.Model):
         created (datetime.datetime): The timestamp when the data was created.
     """
     __tablename__ = 'weather_analysis'
+    __table_args__ = (
+        db.UniqueConstraint('weather_station_id', 'year', name='uq_weather_analysis_station_year'),
+        db.Index('ix_weather_analysis_year_station', 'year', 'weather_station_id'),
+    )
     weather_analysis_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
     weather_station_id = db.Column(db.String(80), nullable=False)
     year = db.Column(db.Integer, nullable=False)
@@ -134,7 +361,345 @@ class WeatherAnalysis(db.Model):
             'accumulated_precipitation':self.accumulated_precipitation_cm,
             'created':self.created.isoformat()
         }
-    
 
 
+class WeatherMonthlyAnalysis(db.Model):
+    """
+    Represents the statistics of one weather station for one calendar month.
+
+    Attributes:
+        weather_monthly_analysis_id (int): The unique identifier for the monthly analysis data.
+        weather_station_id (str): The ID of the weather station.
+        year (int): The year of the month.
+        month (int): The month, from 1 to 12.
+        avg_max_temp_celsius (int): The average maximum temperature in Celsius.
+        avg_min_temp_celsius (int): The average minimum temperature in Celsius.
+        accumulated_precipitation_cm (int): The accumulated precipitation in centimeters.
+        created (datetime.datetime): The timestamp when the data was created.
+    """
+    __tablename__ = 'weather_monthly_analysis'
+    __table_args__ = (
+        db.UniqueConstraint('weather_station_id', 'year', 'month', name='uq_weather_monthly_analysis_station_year_month'),
+        db.Index('ix_weather_monthly_analysis_year_month_station', 'year', 'month', 'weather_station_id'),
+    )
+    weather_monthly_analysis_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    weather_station_id = db.Column(db.String(80), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    avg_max_temp_celsius = db.Column(db.Integer, nullable = True)
+    avg_min_temp_celsius = db.Column(db.Integer, nullable = True)
+    accumulated_precipitation_cm = db.Column(db.Integer, nullable = True)
+    created = db.Column(db.DateTime, default=datetime.now(timezone('UTC')), nullable=False)
+
+    def __init__(self, weather_station_id, year, month, avg_max_temp_celsius=None, avg_min_temp_celsius=None, accumulated_precipitation_cm=None, created=None):
+        self.weather_station_id = weather_station_id
+        self.year = year
+        self.month = month
+        self.avg_max_temp_celsius = avg_max_temp_celsius
+        self.avg_min_temp_celsius = avg_min_temp_celsius
+        self.accumulated_precipitation_cm = accumulated_precipitation_cm
+        if created is None:
+            created = datetime.now(timezone('UTC'))
+        self.created = created
+
+    def __repr__(self):
+        return f"WeatherMonthlyAnalysis(weather_monthly_analysis_id={self.weather_monthly_analysis_id}, weather_station_id={self.weather_station_id}, year={self.year}, month={self.month}, avg_max_temp={self.avg_max_temp_celsius}, avg_min_temp={self.avg_min_temp_celsius}, accumulated_precipitation={self.accumulated_precipitation_cm}, created={self.created})"
+
+    def serialize(self):
+        return {
+            'weather_monthly_analysis_id':self.weather_monthly_analysis_id,
+            'weather_station_id':self.weather_station_id,
+            'year':self.year,
+            'month':self.month,
+            'avg_max_temp':self.avg_max_temp_celsius,
+            'avg_min_temp':self.avg_min_temp_celsius,
+            'accumulated_precipitation':self.accumulated_precipitation_cm,
+            'created':self.created.isoformat()
+        }
+
+
+class WeatherSeasonAnalysis(db.Model):
+    """
+    Represents the statistics of one weather station for the growing season (April to September) of one year.
+
+    Attributes:
+        weather_season_analysis_id (int): The unique identifier for the growing season analysis data.
+        weather_station_id (str): The ID of the weather station.
+        year (int): The year of the growing season.
+        avg_max_temp_celsius (int): The average maximum temperature in Celsius.
+        avg_min_temp_celsius (int): The average minimum temperature in Celsius.
+        accumulated_precipitation_cm (int): The accumulated precipitation in centimeters.
+        created (datetime.datetime): The timestamp when the data was created.
+    """
+    __tablename__ = 'weather_season_analysis'
+    __table_args__ = (
+        db.UniqueConstraint('weather_station_id', 'year', name='uq_weather_season_analysis_station_year'),
+        db.Index('ix_weather_season_analysis_year_station', 'year', 'weather_station_id'),
+    )
+    weather_season_analysis_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    weather_station_id = db.Column(db.String(80), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    avg_max_temp_celsius = db.Column(db.Integer, nullable = True)
+    avg_min_temp_celsius = db.Column(db.Integer, nullable = True)
+    accumulated_precipitation_cm = db.Column(db.Integer, nullable = True)
+    created = db.Column(db.DateTime, default=datetime.now(timezone('UTC')), nullable=False)
 
+    def __init__(self, weather_station_id, year, avg_max_temp_celsius=None, avg_min_temp_celsius=None, accumulated_precipitation_cm=None, created=None):
+        self.weather_station_id = weather_station_id
+        self.year = year
+        self.avg_max_temp_celsius = avg_max_temp_celsius
+        self.avg_min_temp_celsius = avg_min_temp_celsius
+        self.accumulated_precipitation_cm = accumulated_precipitation_cm
+        if created is None:
+            created = datetime.now(timezone('UTC'))
+        self.created = created
+
+    def __repr__(self):
+        return f"WeatherSeasonAnalysis(weather_season_analysis_id={self.weather_season_analysis_id}, weather_station_id={self.weather_station_id}, year={self.year}, avg_max_temp={self.avg_max_temp_celsius}, avg_min_temp={self.avg_min_temp_celsius}, accumulated_precipitation={self.accumulated_precipitation_cm}, created={self.created})"
+
+    def serialize(self):
+        return {
+            'weather_season_analysis_id':self.weather_season_analysis_id,
+            'weather_station_id':self.weather_station_id,
+            'year':self.year,
+            'avg_max_temp':self.avg_max_temp_celsius,
+            'avg_min_temp':self.avg_min_temp_celsius,
+            'accumulated_precipitation':self.accumulated_precipitation_cm,
+            'created':self.created.isoformat()
+        }
+
+
+class RegionalAnalysis(db.Model):
+    """
+    Represents the statistics of all weather stations together for one year.
+
+    Each value is the mean of the stations' yearly statistics, so every station weighs the same
+    regardless of how many days it reported.
+
+    Attributes:
+        regional_analysis_id (int): The unique identifier for the regional analysis data.
+        year (int): The year for which the analysis is conducted.
+        station_count (int): The number of stations with statistics for the year.
+        avg_max_temp_celsius (int): The average maximum temperature in Celsius.
+        avg_min_temp_celsius (int): The average minimum temperature in Celsius.
+        accumulated_precipitation_cm (int): The average accumulated precipitation in centimeters.
+        created (datetime.datetime): The timestamp when the data was created.
+    """
+    __tablename__ = 'regional_analysis'
+    __table_args__ = (
+        db.UniqueConstraint('year', name='uq_regional_analysis_year'),
+    )
+    regional_analysis_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    year = db.Column(db.Integer, nullable=False)
+    station_count = db.Column(db.Integer, nullable=False)
+    avg_max_temp_celsius = db.Column(db.Integer, nullable = True)
+    avg_min_temp_celsius = db.Column(db.Integer, nullable = True)
+    accumulated_precipitation_cm = db.Column(db.Integer, nullable = True)
+    created = db.Column(db.DateTime, default=datetime.now(timezone('UTC')), nullable=False)
+
+    def __init__(self, year, station_count, avg_max_temp_celsius=None, avg_min_temp_celsius=None, accumulated_precipitation_cm=None, created=None):
+        self.year = year
+        self.station_count = station_count
+        self.avg_max_temp_celsius = avg_max_temp_celsius
+        self.avg_min_temp_celsius = avg_min_temp_celsius
+        self.accumulated_precipitation_cm = accumulated_precipitation_cm
+        if created is None:
+            created = datetime.now(timezone('UTC'))
+        self.created = created
+
+    def __repr__(self):
+        return f"RegionalAnalysis(regional_analysis_id={self.regional_analysis_id}, year={self.year}, station_count={self.station_count}, avg_max_temp={self.avg_max_temp_celsius}, avg_min_temp={self.avg_min_temp_celsius}, accumulated_precipitation={self.accumulated_precipitation_cm}, created={self.created})"
+
+    def serialize(self):
+        return {
+            'regional_analysis_id':self.regional_analysis_id,
+            'year':self.year,
+            'station_count':self.station_count,
+            'avg_max_temp':self.avg_max_temp_celsius,
+            'avg_min_temp':self.avg_min_temp_celsius,
+            'accumulated_precipitation':self.accumulated_precipitation_cm,
+            'created':self.created.isoformat()
+        }
+
+
+class WeatherQuarantine(db.Model):
+    """
+    Represents a raw weather record that failed validation, as read from its source file.
+
+    Readings flagged by a range or min_above_max rule are stored as null in the weather table; records
+    flagged as a duplicate date are not stored there at all.
+
+    Attributes:
+        weather_quarantine_id (int): The unique identifier for the quarantined record.
+        weather_station_id (str): The ID of the weather station.
+        date (datetime.date): The date of the record.
+        year (int): The year of the record.
+        max_temp (int): The maximum temperature as read, in tenths of a degree Celsius.
+        min_temp (int): The minimum temperature as read, in tenths of a degree Celsius.
+        precipitation (int): The precipitation as read, in tenths of a millimeter.
+        rules (str): The comma-separated names of the rules the record failed.
+        created (datetime.datetime): The timestamp when the record was quarantined.
+    """
+    __tablename__ = 'weather_quarantine'
+    __table_args__ = (
+        db.UniqueConstraint('weather_station_id', 'date', 'rules', name='uq_weather_quarantine_station_date_rules'),
+        db.Index('ix_weather_quarantine_station_year', 'weather_station_id', 'year'),
+    )
+    weather_quarantine_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    weather_station_id = db.Column(db.String(80), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    max_temp = db.Column(db.Integer, nullable = True)
+    min_temp = db.Column(db.Integer, nullable = True)
+    precipitation = db.Column(db.Integer, nullable = True)
+    rules = db.Column(db.String(200), nullable=False)
+    created = db.Column(db.DateTime, default=datetime.now(timezone('UTC')), nullable=False)
+
+    def __init__(self, weather_station_id, date, rules, max_temp=None, min_temp=None, precipitation=None, created=None):
+        self.weather_station_id = weather_station_id
+        self.date = date
+        self.year = date.year
+        self.max_temp = max_temp
+        self.min_temp = min_temp
+        self.precipitation = precipitation
+        self.rules = rules
+        if created is None:
+            created = datetime.now(timezone('UTC'))
+        self.created = created
+
+    def __repr__(self):
+        return f"WeatherQuarantine(weather_quarantine_id={self.weather_quarantine_id}, weather_station_id={self.weather_station_id}, date={self.date}, max_temp={self.max_temp}, min_temp={self.min_temp}, precipitation={self.precipitation}, rules={self.rules}, created={self.created})"
+
+    def serialize(self):
+        return {
+            'weather_quarantine_id':self.weather_quarantine_id,
+            'weather_station_id':self.weather_station_id,
+            'date':self.date,
+            'max_temp':self.max_temp,
+            'min_temp':self.min_temp,
+            'precipitation':self.precipitation,
+            'rules':self.rules.split(','),
+            'created':self.created.isoformat()
+        }
+
+
+class StationCompleteness(db.Model):
+    """
+    Represents how complete the records of one weather station are for one year.
+
+    Attributes:
+        station_completeness_id (int): The unique identifier for the completeness data.
+        weather_station_id (str): The ID of the weather station.
+        year (int): The year.
+        days_in_year (int): The number of days of the year.
+        days_present (int): The number of days with a stored record.
+        days_complete (int): The number of days whose record has all three readings after validation.
+        days_flagged (int): The number of quarantined records of the year.
+        completeness (float): The share of the days of the year with a stored record.
+        created (datetime.datetime): The timestamp when the data was created.
+    """
+    __tablename__ = 'station_completeness'
+    __table_args__ = (
+        db.UniqueConstraint('weather_station_id', 'year', name='uq_station_completeness_station_year'),
+        db.Index('ix_station_completeness_year_station', 'year', 'weather_station_id'),
+    )
+    station_completeness_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    weather_station_id = db.Column(db.String(80), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    days_in_year = db.Column(db.Integer, nullable=False)
+    days_present = db.Column(db.Integer, nullable=False)
+    days_complete = db.Column(db.Integer, nullable=False)
+    days_flagged = db.Column(db.Integer, nullable=False)
+    completeness = db.Column(db.Float, nullable=False)
+    created = db.Column(db.DateTime, default=datetime.now(timezone('UTC')), nullable=False)
+
+    def __init__(self, weather_station_id, year, days_in_year, days_present, days_complete, days_flagged=0, created=None):
+        self.weather_station_id = weather_station_id
+        self.year = year
+        self.days_in_year = days_in_year
+        self.days_present = days_present
+        self.days_complete = days_complete
+        self.days_flagged = days_flagged
+        self.completeness = days_present / days_in_year
+        if created is None:
+            created = datetime.now(timezone('UTC'))
+        self.created = created
+
+    def __repr__(self):
+        return f"StationCompleteness(station_completeness_id={self.station_completeness_id}, weather_station_id={self.weather_station_id}, year={self.year}, days_in_year={self.days_in_year}, days_present={self.days_present}, days_complete={self.days_complete}, days_flagged={self.days_flagged}, created={self.created})"
+
+    def serialize(self):
+        return {
+            'station_completeness_id':self.station_completeness_id,
+            'weather_station_id':self.weather_station_id,
+            'year':self.year,
+            'days_in_year':self.days_in_year,
+            'days_present':self.days_present,
+            'days_complete':self.days_complete,
+            'days_flagged':self.days_flagged,
+            'completeness':self.completeness,
+            'created':self.created.isoformat()
+        }
+
+
+class IngestManifest(db.Model):
+    """
+    Represents the state of a source file as of its last ingestion.
+
+    Attributes:
+        manifest_id (int): The unique identifier for the manifest entry.
+        source_file (str): The absolute path of the source file.
+        size (int): The size of the file in bytes when it was last ingested.
+        mtime_ns (int): The modification time of the file in nanoseconds when it was last ingested.
+        content_hash (str): The SHA-256 hex digest of the file content when it was last ingested.
+        last_ingested_date (datetime.date): The latest observation date read from the file, if it holds daily data.
+        updated (datetime.datetime): The timestamp when the entry was last updated.
+    """
+    __tablename__ = 'ingest_manifest'
+    manifest_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    source_file = db.Column(db.String(1024), nullable=False, unique=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    mtime_ns = db.Column(db.BigInteger, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    last_ingested_date = db.Column(db.Date, nullable=True)
+    updated = db.Column(db.DateTime, default=datetime.now(timezone('UTC')), nullable=False)
+
+    def __init__(self, source_file, size, mtime_ns, content_hash, last_ingested_date=None, updated=None):
+        self.source_file = source_file
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+        self.last_ingested_date = last_ingested_date
+        if updated is None:
+            updated = datetime.now(timezone('UTC'))
+        self.updated = updated
+
+    def __repr__(self):
+        return f"IngestManifest(manifest_id={self.manifest_id}, source_file={self.source_file}, size={self.size}, mtime_ns={self.mtime_ns}, content_hash={self.content_hash}, last_ingested_date={self.last_ingested_date}, updated={self.updated})"
+
+
+class DatasetVersion(db.Model):
+    """
+    Represents the version of a dataset, bumped whenever ingestion commits new or changed records to it.
+
+    Attributes:
+        dataset_version_id (int): The unique identifier for the dataset version.
+        name (str): The name of the dataset, e.g. the table name.
+        version (int): The number of ingestions that changed the dataset.
+        updated (datetime.datetime): The timestamp when the dataset last changed.
+    """
+    __tablename__ = 'dataset_version'
+    dataset_version_id = db.Column(db.Integer, primary_key = True, autoincrement = True)
+    name = db.Column(db.String(80), nullable=False, unique=True)
+    version = db.Column(db.Integer, nullable=False)
+    updated = db.Column(db.DateTime, default=datetime.now(timezone('UTC')), nullable=False)
+
+    def __init__(self, name, version=1, updated=None):
+        self.name = name
+        self.version = version
+        if updated is None:
+            updated = datetime.now(timezone('UTC'))
+        self.updated = updated
+
+    def __repr__(self):
+        return f"DatasetVersion(dataset_version_id={self.dataset_version_id}, name={self.name}, version={self.version}, updated={self.updated})"
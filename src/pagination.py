@@ -0,0 +1,244 @@
+import base64
+import json
+import polars as pl
+from sqlalchemy import Column, Select, func, select, tuple_
+from cache import MemoryBackend
+from metrics import phase
+from models import db
+
+
+COUNT_MODES: tuple[str, ...] = ('none', 'cached', 'exact')
+
+
+class PaginationError(ValueError):
+    """
+    Raised when the pagination parameters of a request are invalid.
+    """
+
+
+def encode_cursor(values: tuple) -> str:
+    """
+    Encodes the key of the last row on a page as an opaque cursor.
+
+    Args:
+        values (tuple): The key column values of the last row.
+
+    Returns:
+        str: The URL-safe cursor.
+    """
+    payload = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, key_columns: list[Column]) -> tuple:
+    """
+    Decodes a cursor produced by encode_cursor back into key column values.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+        key_columns (list[Column]): The key columns the cursor seeks on.
+
+    Returns:
+        tuple: The key column values, converted to the columns' Python types.
+
+    Raises:
+        PaginationError: If the cursor is malformed or does not match the key columns.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw_values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(raw_values) != len(key_columns):
+            raise ValueError("cursor does not match the key columns")
+
+        values = []
+        for column, value in zip(key_columns, raw_values):
+            python_type = column.type.python_type
+            values.append(python_type.fromisoformat(value) if hasattr(python_type, 'fromisoformat') else python_type(value))
+    except (ValueError, TypeError) as e:
+        raise PaginationError(f"Invalid cursor: {e}") from e
+
+    return tuple(values)
+
+
+def count_rows(query: Select) -> int:
+    """
+    Counts the rows matched by a select statement.
+
+    Args:
+        query (Select): The filtered select statement.
+
+    Returns:
+        int: The number of rows.
+    """
+    with phase('count'):
+        return db.session.execute(select(func.count()).select_from(query.order_by(None).subquery())).scalar_one()
+
+
+def offset_page(query: Select, page: int, per_page: int, total: int | None = None) -> dict:
+    """
+    Fetches one page of a select statement with LIMIT/OFFSET, like Flask-SQLAlchemy's paginate(error_out=False).
+
+    Args:
+        query (Select): The filtered select statement.
+        page (int): The page number; values below 1 select the first page.
+        per_page (int): The number of rows per page; values below 1 use 20.
+        total (int | None): The number of rows if already known, e.g. from a CountCache; counted otherwise.
+
+    Returns:
+        dict: The rows under 'items' and the 'page', 'per_page', 'total' and 'pages' fields.
+    """
+    page = page if page >= 1 else 1
+    per_page = per_page if per_page >= 1 else 20
+
+    with phase('sql'):
+        items = db.session.execute(query.limit(per_page).offset((page - 1) * per_page)).all()
+    if total is None:
+        total = count_rows(query)
+
+    return {
+        'items': items,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': -(-total // per_page) if total else 0
+    }
+
+
+def keyset_page(query: Select, key_columns: list[Column], cursor: str | None, per_page: int) -> tuple[list, str | None]:
+    """
+    Fetches one page of a query by seeking past the last key of the previous page.
+
+    Unlike OFFSET pagination, the cost of a page does not grow with its depth, because the
+    seek is answered by the index on the key columns.
+
+    Args:
+        query (Select): The filtered select statement to paginate; it must select the key columns.
+        key_columns (list[Column]): The unique key columns that order the pages.
+        cursor (str | None): The cursor of the previous page, or None for the first page.
+        per_page (int): The number of rows per page.
+
+    Returns:
+        tuple[list, str | None]: The rows on the page and the cursor of the next page, None on the last page.
+
+    Raises:
+        PaginationError: If per_page is not positive or the cursor cannot be decoded.
+    """
+    if per_page < 1:
+        raise PaginationError("per_page must be a positive integer")
+    if cursor:
+        values = decode_cursor(cursor, key_columns)
+        query = query.where(tuple_(*key_columns) > tuple_(*values, types=[column.type for column in key_columns]))
+
+    with phase('sql'):
+        rows = db.session.execute(query.order_by(*key_columns).limit(per_page + 1)).all()
+    if len(rows) <= per_page:
+        return rows, None
+
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor(tuple(getattr(last, column.key) for column in key_columns))
+
+
+def offset_frame(df: pl.DataFrame, page: int, per_page: int) -> dict:
+    """
+    Slices one page out of a DataFrame, with the same fields and defaults as offset_page.
+
+    Args:
+        df (pl.DataFrame): The filtered and sorted rows.
+        page (int): The page number; values below 1 select the first page.
+        per_page (int): The number of rows per page; values below 1 use 20.
+
+    Returns:
+        dict: The row tuples under 'items' and the 'page', 'per_page', 'total' and 'pages' fields.
+    """
+    page = page if page >= 1 else 1
+    per_page = per_page if per_page >= 1 else 20
+    total = df.height
+
+    return {
+        'items': df.slice((page - 1) * per_page, per_page).rows(),
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': -(-total // per_page) if total else 0
+    }
+
+
+def keyset_frame(frame: pl.LazyFrame, key_columns: list[Column], cursor: str | None, per_page: int) -> tuple[list, str | None]:
+    """
+    Fetches one page of a Polars frame by seeking past the last key of the previous page, like keyset_page.
+
+    Cursors are interchangeable with those of keyset_page.
+
+    Args:
+        frame (pl.LazyFrame): The filtered rows; it must have columns named like the key columns.
+        key_columns (list[Column]): The unique key columns that order the pages.
+        cursor (str | None): The cursor of the previous page, or None for the first page.
+        per_page (int): The number of rows per page.
+
+    Returns:
+        tuple[list, str | None]: The row tuples on the page and the cursor of the next page, None on the last page.
+
+    Raises:
+        PaginationError: If per_page is not positive or the cursor cannot be decoded.
+    """
+    if per_page < 1:
+        raise PaginationError("per_page must be a positive integer")
+
+    names = [column.name for column in key_columns]
+    if cursor:
+        # Row-value comparison (a, b) > (x, y), expanded as a > x OR (a = x AND b > y).
+        values = decode_cursor(cursor, key_columns)
+        after = pl.lit(False)
+        for index in reversed(range(len(names))):
+            after = (pl.col(names[index]) > values[index]) | ((pl.col(names[index]) == values[index]) & after)
+        frame = frame.filter(after)
+
+    df = frame.sort(names).head(per_page + 1).collect()
+    if df.height <= per_page:
+        return df.rows(), None
+
+    df = df.head(per_page)
+    return df.rows(), encode_cursor(df.select(names).row(-1))
+
+
+class CountCache:
+    """
+    Caches query counts so cursor pagination can report a total without re-counting on every page.
+
+    Counts are kept in a MemoryBackend, so the cache is bounded however many distinct filters clients
+    send: expired counts are dropped when read, and the least recently used ones beyond maxsize are evicted.
+
+    Attributes:
+        ttl (float): The number of seconds a count stays valid.
+        maxsize (int): The maximum number of counts kept.
+    """
+    def __init__(self, ttl: float = 300, maxsize: int = 4096):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._counts = MemoryBackend(maxsize, ttl)
+
+    def get(self, key: tuple, query: Select) -> int:
+        """
+        Returns the cached count for a key, counting the query when it is missing or expired.
+
+        Args:
+            key (tuple): The normalized filters the query was built from.
+            query (Select): The select statement to count on a cache miss.
+
+        Returns:
+            int: The number of rows matched by the query.
+        """
+        count = self._counts.get(key)
+        if count is not None:
+            return count
+
+        count = count_rows(query)
+        self._counts.set(key, count)
+        return count
+
+    def clear(self):
+        """
+        Drops every cached count, e.g. after new data has been ingested.
+        """
+        self._counts.clear()
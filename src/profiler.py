@@ -0,0 +1,118 @@
+import atexit
+import pathlib
+import sys
+import threading
+from collections import Counter
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread at a fixed interval, with low enough overhead to leave on in production.
+
+    Stacks are written in the collapsed format (`outer;inner;leaf count` per line), which flame graph
+    tools such as flamegraph.pl and speedscope read directly.
+
+    Attributes:
+        interval (float): The seconds between samples.
+        path (pathlib.Path): The file the collapsed stacks are written to.
+    """
+    def __init__(self, interval: float, path: pathlib.Path):
+        self.interval = interval
+        self.path = path
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __repr__(self):
+        return f"SamplingProfiler(interval={self.interval}, path={self.path}, samples={self.samples})"
+
+    @property
+    def samples(self) -> int:
+        """
+        int: The number of thread stacks sampled so far.
+        """
+        with self._lock:
+            return sum(self._stacks.values())
+
+    def sample(self):
+        """
+        Records the current stack of every thread except the profiler's own.
+        """
+        own = threading.get_ident()
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{code.co_name} ({pathlib.Path(code.co_filename).name}:{code.co_firstlineno})')
+                frame = frame.f_back
+            stacks.append(';'.join(reversed(names)))
+
+        with self._lock:
+            self._stacks.update(stacks)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """
+        Starts sampling on a daemon thread; the stacks are written when the process exits.
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Sampling profiler started: every {self.interval * 1000:.0f} ms, writing to {self.path}")
+
+    def stop(self):
+        """
+        Stops sampling and writes the stacks.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.write()
+
+    def write(self):
+        """
+        Writes the stacks sampled so far to the output file, most frequent first.
+        """
+        with self._lock:
+            lines = [f'{stack} {count}\n' for stack, count in self._stacks.most_common()]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(''.join(lines))
+        logger.info(f"Sampling profiler wrote {len(lines)} stacks to {self.path}")
+
+
+_profiler: SamplingProfiler | None = None
+
+
+def start_profiler(interval: float, path: pathlib.Path) -> SamplingProfiler:
+    """
+    Starts the sampling profiler of the process, once; later calls return the running profiler.
+
+    Args:
+        interval (float): The seconds between samples.
+        path (pathlib.Path): The file the collapsed stacks are written to.
+
+    Returns:
+        SamplingProfiler: The profiler.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler(interval, path)
+        _profiler.start()
+
+    return _profiler
@@ -0,0 +1,279 @@
+import json
+import polars as pl
+from sqlalchemy import Column, ColumnElement, literal
+from werkzeug.datastructures import MultiDict
+from filters import FilterError, parse_float, sql_conditions, weather_analysis_filters, weather_filters
+from models import db, StationCompleteness, WeatherQuarantine
+from serialization import Field, STATION_COMPLETENESS_FIELDS, WEATHER_QUARANTINE_FIELDS
+
+
+READINGS: tuple[str, ...] = ('max_temp', 'min_temp', 'precipitation')
+# Inclusive bounds of each reading, in tenths of a degree Celsius or of a millimeter, just beyond the
+# world records: -89.2 °C, a 56.7 °C maximum, a 44.2 °C daily minimum and 1825 mm of rain in a day.
+DEFAULT_LIMITS: dict[str, tuple[int | None, int | None]] = {
+    'max_temp': (-900, 570),
+    'min_temp': (-900, 450),
+    'precipitation': (0, 18300),
+}
+RULE_NAMES: tuple[str, ...] = tuple(f'{reading}_range' for reading in READINGS) + ('min_above_max', 'duplicate_date')
+QUARANTINE_SCHEMA: dict[str, pl.DataType] = {
+    'weather_station_id': pl.String,
+    'date': pl.Date,
+    'year': pl.Int32,
+    'max_temp': pl.Int32,
+    'min_temp': pl.Int32,
+    'precipitation': pl.Int32,
+    'rules': pl.String,
+}
+
+
+class QualityRules:
+    """
+    The validation rules applied to weather records before they are stored.
+
+    Attributes:
+        limits (dict[str, tuple[int | None, int | None]]): The inclusive bounds of each checked reading,
+            None for an open side; a reading outside fails the rule '<reading>_range'.
+        min_above_max (bool): Whether a min_temp above the max_temp of the same day fails the rule 'min_above_max'.
+        duplicate_dates (bool): Whether the records of a station that repeat an earlier date fail the rule 'duplicate_date'.
+    """
+    def __init__(self, limits: dict[str, tuple[int | None, int | None]] | None = None, min_above_max: bool = True,
+                 duplicate_dates: bool = True):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.min_above_max = min_above_max
+        self.duplicate_dates = duplicate_dates
+
+    def __repr__(self):
+        return f"QualityRules(limits={self.limits}, min_above_max={self.min_above_max}, duplicate_dates={self.duplicate_dates})"
+
+    @classmethod
+    def from_config(cls, config: str | dict | None) -> 'QualityRules':
+        """
+        Builds the rules from the QUALITY_RULES setting, which overrides the defaults.
+
+        The setting is a JSON object or dict such as
+        `{"limits": {"max_temp": [-500, 500], "precipitation": null}, "min_above_max": false}`;
+        a null limit turns off the range rule of that reading and a null bound leaves that side open.
+
+        Args:
+            config (str | dict | None): The setting, or None for the default rules.
+
+        Returns:
+            QualityRules: The rules.
+
+        Raises:
+            ValueError: If the setting is not valid JSON or names unknown options or readings.
+        """
+        if not config:
+            return cls()
+        if isinstance(config, str):
+            try:
+                config = json.loads(config)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"QUALITY_RULES is not valid JSON: {e}") from e
+        if not isinstance(config, dict):
+            raise ValueError("QUALITY_RULES must be an object")
+
+        unknown = set(config) - {'limits', 'min_above_max', 'duplicate_dates'}
+        if unknown:
+            raise ValueError(f"Unknown QUALITY_RULES options: {', '.join(sorted(unknown))}")
+
+        limits = dict(DEFAULT_LIMITS)
+        for reading, bounds in (config.get('limits') or {}).items():
+            if reading not in READINGS:
+                raise ValueError(f"QUALITY_RULES limits must be one of {', '.join(READINGS)}")
+            if bounds is None:
+                limits.pop(reading, None)
+                continue
+            if not isinstance(bounds, (list, tuple)) or len(bounds) != 2 or \
+                    not all(bound is None or isinstance(bound, int) for bound in bounds):
+                raise ValueError(f"QUALITY_RULES limit of {reading} must be a [low, high] pair of integers or nulls")
+            limits[reading] = tuple(bounds)
+
+        return cls(limits, bool(config.get('min_above_max', True)), bool(config.get('duplicate_dates', True)))
+
+    def expressions(self) -> dict[str, pl.Expr]:
+        """
+        Builds one boolean expression per active rule, true where a record fails it; missing readings pass.
+
+        Returns:
+            dict[str, pl.Expr]: The expressions by rule name.
+        """
+        rules: dict[str, pl.Expr] = {}
+        for reading, (low, high) in self.limits.items():
+            bounds = [pl.col(reading) < low] if low is not None else []
+            bounds += [pl.col(reading) > high] if high is not None else []
+            if bounds:
+                rules[f'{reading}_range'] = pl.any_horizontal(bounds)
+        if self.min_above_max:
+            rules['min_above_max'] = pl.col('min_temp') > pl.col('max_temp')
+        if self.duplicate_dates:
+            rules['duplicate_date'] = ~pl.col('date').is_first_distinct().over('weather_station_id')
+
+        return {name: expr.fill_null(False) for name, expr in rules.items()}
+
+
+def validate_weather(wx_df: pl.DataFrame, rules: QualityRules) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Checks weather records against the validation rules in one vectorized pass.
+
+    Records that fail a rule are returned as read, for the quarantine table. The records to store keep
+    the first record of each (station, date) only, and have the readings that failed a range or
+    min_above_max rule set to null, so they stay out of the statistics.
+
+    Args:
+        wx_df (pl.DataFrame): The cleansed weather records.
+        rules (QualityRules): The rules to apply.
+
+    Returns:
+        tuple[pl.DataFrame, pl.DataFrame]: The records to store, with the columns of wx_df, and the
+            failed records with the comma-separated names of the rules they failed under 'rules'.
+    """
+    expressions = rules.expressions()
+    if not expressions:
+        return wx_df, pl.DataFrame(schema=QUARANTINE_SCHEMA)
+
+    names = list(expressions)
+    flagged = wx_df.with_columns(**expressions)
+    failed = flagged.filter(pl.any_horizontal(names))
+    if failed.is_empty():
+        return wx_df, pl.DataFrame(schema=QUARANTINE_SCHEMA)
+
+    quarantine_df = failed.select(
+        'weather_station_id',
+        'date',
+        pl.col('date').dt.year().alias('year'),
+        *READINGS,
+        pl.concat_str([pl.when(pl.col(name)).then(pl.lit(name)) for name in names], separator=',', ignore_nulls=True).alias('rules'),
+    )
+
+    if 'duplicate_date' in expressions:
+        flagged = flagged.filter(~pl.col('duplicate_date'))
+    nulled = {reading: [name for name in names if name == f'{reading}_range' or
+                        (name == 'min_above_max' and reading in ('max_temp', 'min_temp'))] for reading in READINGS}
+    valid_df = flagged.with_columns(**{
+        reading: pl.when(pl.any_horizontal(rule_names)).then(None).otherwise(pl.col(reading))
+        for reading, rule_names in nulled.items() if rule_names
+    }).select(wx_df.columns)
+
+    return valid_df, quarantine_df
+
+
+def station_completeness(wx_df: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame:
+    """
+    Measures how complete the records of each (station, year) are.
+
+    Args:
+        wx_df (pl.DataFrame | pl.LazyFrame): Every stored record of the (station, year) groups to measure.
+
+    Returns:
+        pl.DataFrame: The days of the year, the days with a record and the days with all three readings
+            of each group, and the share of the days of the year with a record.
+    """
+    return wx_df.lazy().group_by('weather_station_id', pl.col('date').dt.year().alias('year')).agg(
+        days_present=pl.len().cast(pl.Int32),
+        days_complete=pl.all_horizontal(pl.col(reading).is_not_null() for reading in READINGS).sum().cast(pl.Int32),
+    ).with_columns(
+        days_in_year=pl.date(pl.col('year'), 12, 31).dt.ordinal_day().cast(pl.Int32),
+    ).with_columns(
+        completeness=pl.col('days_present') / pl.col('days_in_year'),
+    ).collect()
+
+
+class QualityView:
+    """
+    Describes one table served by the quality endpoint.
+
+    Attributes:
+        model (type[db.Model]): The model of the table.
+        fields (list[Field]): The response fields of a record.
+        key_columns (list[Column]): The natural key of a record, which orders the pages.
+    """
+    def __init__(self, model: type[db.Model], fields: list[Field], key_columns: list[Column]):
+        self.model = model
+        self.fields = fields
+        self.key_columns = key_columns
+
+    def __repr__(self):
+        return f"QualityView(table={self.name})"
+
+    @property
+    def name(self) -> str:
+        """
+        str: The table name, used as the key of the records in responses.
+        """
+        return self.model.__tablename__
+
+
+QUALITY_VIEWS: dict[str, QualityView] = {
+    'completeness': QualityView(
+        StationCompleteness, STATION_COMPLETENESS_FIELDS,
+        [StationCompleteness.weather_station_id, StationCompleteness.year]
+    ),
+    'quarantine': QualityView(
+        WeatherQuarantine, WEATHER_QUARANTINE_FIELDS,
+        [WeatherQuarantine.weather_station_id, WeatherQuarantine.date, WeatherQuarantine.rules]
+    ),
+}
+
+
+def parse_quality_view(args: MultiDict) -> QualityView:
+    """
+    Parses the `view` argument of a quality request.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        QualityView: The requested view, the completeness per station and year by default.
+
+    Raises:
+        FilterError: If the view is unknown.
+    """
+    view = args.get('view', 'completeness', type=str) or 'completeness'
+    if view not in QUALITY_VIEWS:
+        raise FilterError(f"view must be one of {', '.join(QUALITY_VIEWS)}")
+
+    return QUALITY_VIEWS[view]
+
+
+def quality_conditions(args: MultiDict, view: QualityView) -> list[ColumnElement[bool]]:
+    """
+    Parses the filters of a quality request into WHERE conditions.
+
+    The completeness view accepts the station and year filters of the stats endpoint and
+    `max_completeness`, a share from 0 to 1. The quarantine view accepts the station and date filters
+    of the weather endpoint and a `rule` the records failed.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+        view (QualityView): The requested view.
+
+    Returns:
+        list[ColumnElement[bool]]: The conditions, to be combined with AND.
+
+    Raises:
+        FilterError: If a filter is invalid or not supported by the view.
+    """
+    if view.model is StationCompleteness:
+        if args.get('rule'):
+            raise FilterError("rule is only supported with view=quarantine")
+        filters = weather_analysis_filters(args)
+        max_completeness = parse_float(args, 'max_completeness')
+        if max_completeness is not None:
+            if not 0 <= max_completeness <= 1:
+                raise FilterError("max_completeness must be between 0 and 1")
+            filters.append(('completeness', '<=', max_completeness))
+        return sql_conditions(view.model, filters)
+
+    if args.get('max_completeness'):
+        raise FilterError("max_completeness is only supported with view=completeness")
+    conditions = sql_conditions(view.model, weather_filters(args))
+    rule = args.get('rule', type=str)
+    if rule:
+        if rule not in RULE_NAMES:
+            raise FilterError(f"rule must be one of {', '.join(RULE_NAMES)}")
+        # Rules are stored comma-separated; matching them with the separators around avoids partial names.
+        conditions.append((literal(',') + WeatherQuarantine.rules + literal(',')).contains(f',{rule},', autoescape=True))
+
+    return conditions
@@ -0,0 +1,137 @@
+from sqlalchemy import Column
+from werkzeug.datastructures import MultiDict
+from aggregation import (
+    REGIONAL_ANALYSIS_GROUPS, REGIONAL_ANALYSIS_MEASURES, WEATHER_ANALYSIS_GROUPS, WEATHER_ANALYSIS_MEASURES,
+    WEATHER_MONTHLY_ANALYSIS_GROUPS, WEATHER_MONTHLY_ANALYSIS_MEASURES, WEATHER_SEASON_ANALYSIS_GROUPS,
+    WEATHER_SEASON_ANALYSIS_MEASURES
+)
+from filters import Filter, FilterError, WEATHER_ANALYSIS_FILTERS, parse_int, weather_analysis_filters
+from models import db, RegionalAnalysis, WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis
+from serialization import (
+    Field, REGIONAL_ANALYSIS_FIELDS, WEATHER_ANALYSIS_FIELDS, WEATHER_MONTHLY_ANALYSIS_FIELDS,
+    WEATHER_SEASON_ANALYSIS_FIELDS
+)
+
+
+ROLLUP_FILTERS: tuple[str, ...] = WEATHER_ANALYSIS_FILTERS + ('month',)
+
+
+class Rollup:
+    """
+    Describes one precomputed statistics table served by the stats endpoint.
+
+    Attributes:
+        period (str): The value of the `period` argument that selects the table.
+        model (type[db.Model]): The model of the table.
+        fields (list[Field]): The response fields of a record.
+        key_columns (list[Column]): The natural key of a record, which also orders cursor pages.
+        index_columns (list[Column]): The columns of the table's secondary index, in index order.
+        groups (dict[str, list[Field]]): The group key fields for each group_by value.
+        measures (list[Field]): The columns that can be aggregated.
+    """
+    def __init__(self, period: str, model: type[db.Model], fields: list[Field], key_columns: list[Column],
+                 index_columns: list[Column], groups: dict[str, list[Field]], measures: list[Field]):
+        self.period = period
+        self.model = model
+        self.fields = fields
+        self.key_columns = key_columns
+        self.index_columns = index_columns
+        self.groups = groups
+        self.measures = measures
+
+    def __repr__(self):
+        return f"Rollup(period={self.period}, table={self.name})"
+
+    @property
+    def name(self) -> str:
+        """
+        str: The table name, used as the key of the records in responses and in the dataset version.
+        """
+        return self.model.__tablename__
+
+    @property
+    def stations(self) -> bool:
+        """
+        bool: Whether the table has one record per station.
+        """
+        return 'weather_station_id' in self.model.__table__.c
+
+
+ROLLUPS: dict[str, Rollup] = {
+    'year': Rollup(
+        'year', WeatherAnalysis, WEATHER_ANALYSIS_FIELDS,
+        [WeatherAnalysis.weather_station_id, WeatherAnalysis.year],
+        [WeatherAnalysis.year, WeatherAnalysis.weather_station_id],
+        WEATHER_ANALYSIS_GROUPS, WEATHER_ANALYSIS_MEASURES
+    ),
+    'month': Rollup(
+        'month', WeatherMonthlyAnalysis, WEATHER_MONTHLY_ANALYSIS_FIELDS,
+        [WeatherMonthlyAnalysis.weather_station_id, WeatherMonthlyAnalysis.year, WeatherMonthlyAnalysis.month],
+        [WeatherMonthlyAnalysis.year, WeatherMonthlyAnalysis.month, WeatherMonthlyAnalysis.weather_station_id],
+        WEATHER_MONTHLY_ANALYSIS_GROUPS, WEATHER_MONTHLY_ANALYSIS_MEASURES
+    ),
+    'season': Rollup(
+        'season', WeatherSeasonAnalysis, WEATHER_SEASON_ANALYSIS_FIELDS,
+        [WeatherSeasonAnalysis.weather_station_id, WeatherSeasonAnalysis.year],
+        [WeatherSeasonAnalysis.year, WeatherSeasonAnalysis.weather_station_id],
+        WEATHER_SEASON_ANALYSIS_GROUPS, WEATHER_SEASON_ANALYSIS_MEASURES
+    ),
+    'region': Rollup(
+        'region', RegionalAnalysis, REGIONAL_ANALYSIS_FIELDS,
+        [RegionalAnalysis.year],
+        [RegionalAnalysis.year],
+        REGIONAL_ANALYSIS_GROUPS, REGIONAL_ANALYSIS_MEASURES
+    ),
+}
+
+
+def parse_rollup(args: MultiDict) -> Rollup:
+    """
+    Parses the `period` argument of a stats request.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        Rollup: The requested rollup, yearly statistics per station by default.
+
+    Raises:
+        FilterError: If the period is unknown.
+    """
+    period = args.get('period', 'year', type=str) or 'year'
+    if period not in ROLLUPS:
+        raise FilterError(f"period must be one of {', '.join(ROLLUPS)}")
+
+    return ROLLUPS[period]
+
+
+def rollup_filters(args: MultiDict, rollup: Rollup) -> list[Filter]:
+    """
+    Parses the filters of a stats request on a rollup.
+
+    Besides the station and year filters of weather_analysis_filters, monthly statistics accept an
+    exact `month`. Regional statistics cover every station, so they reject `station_id`.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+        rollup (Rollup): The requested rollup.
+
+    Returns:
+        list[Filter]: The filters, to be combined with AND.
+
+    Raises:
+        FilterError: If a filter is invalid or not supported by the rollup.
+    """
+    if not rollup.stations and args.get('station_id'):
+        raise FilterError(f"station_id is not supported with period={rollup.period}")
+
+    filters = weather_analysis_filters(args)
+    month = parse_int(args, 'month')
+    if month is not None:
+        if 'month' not in rollup.model.__table__.c:
+            raise FilterError(f"month is not supported with period={rollup.period}")
+        if not 1 <= month <= 12:
+            raise FilterError("month must be between 1 and 12")
+        filters.append(('month', '==', month))
+
+    return filters
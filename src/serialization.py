@@ -0,0 +1,209 @@
+import functools
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Sequence
+from sqlalchemy import Column
+from werkzeug.http import http_date
+from metrics import phase
+from models import Station, StationMetadata, Weather, WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis, RegionalAnalysis, WeatherQuarantine, StationCompleteness
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Response field name, source column and value converter, in the order of the models' serialize() methods.
+Field = tuple[str, Column, Callable[[Any], Any] | None]
+
+
+@functools.lru_cache(maxsize=65536)
+def format_date(value: date) -> str:
+    """
+    Formats a date the way Flask's JSON provider does, as an RFC 822 date.
+
+    Dates repeat across stations, so the formatted strings are memoized.
+
+    Args:
+        value (date): The date to format.
+
+    Returns:
+        str: The formatted date.
+    """
+    return http_date(value)
+
+
+@functools.lru_cache(maxsize=4096)
+def format_datetime(value: datetime) -> str:
+    """
+    Formats a timestamp in ISO 8601, like the models' serialize() methods.
+
+    Rows ingested together share their created timestamp, so the formatted strings are memoized.
+
+    Args:
+        value (datetime): The timestamp to format.
+
+    Returns:
+        str: The formatted timestamp.
+    """
+    return value.isoformat()
+
+
+def split_list(value: str) -> list[str]:
+    """
+    Splits a comma-separated column value into a list, like the models' serialize() methods.
+
+    Args:
+        value (str): The stored value.
+
+    Returns:
+        list[str]: The items.
+    """
+    return value.split(',')
+
+
+WEATHER_FIELDS: list[Field] = [
+    ('weather_id', Weather.weather_id, None),
+    ('weather_station_id', Weather.weather_station_id, None),
+    ('date', Weather.date, format_date),
+    ('max_temp', Weather.max_temp, None),
+    ('min_temp', Weather.min_temp, None),
+    ('precipitation', Weather.precipitation, None),
+    ('created', Weather.created, format_datetime),
+]
+
+WEATHER_ANALYSIS_FIELDS: list[Field] = [
+    ('weather_analysis_id', WeatherAnalysis.weather_analysis_id, None),
+    ('weather_station_id', WeatherAnalysis.weather_station_id, None),
+    ('year', WeatherAnalysis.year, None),
+    ('avg_max_temp', WeatherAnalysis.avg_max_temp_celsius, None),
+    ('avg_min_temp', WeatherAnalysis.avg_min_temp_celsius, None),
+    ('accumulated_precipitation', WeatherAnalysis.accumulated_precipitation_cm, None),
+    ('created', WeatherAnalysis.created, format_datetime),
+]
+
+WEATHER_MONTHLY_ANALYSIS_FIELDS: list[Field] = [
+    ('weather_monthly_analysis_id', WeatherMonthlyAnalysis.weather_monthly_analysis_id, None),
+    ('weather_station_id', WeatherMonthlyAnalysis.weather_station_id, None),
+    ('year', WeatherMonthlyAnalysis.year, None),
+    ('month', WeatherMonthlyAnalysis.month, None),
+    ('avg_max_temp', WeatherMonthlyAnalysis.avg_max_temp_celsius, None),
+    ('avg_min_temp', WeatherMonthlyAnalysis.avg_min_temp_celsius, None),
+    ('accumulated_precipitation', WeatherMonthlyAnalysis.accumulated_precipitation_cm, None),
+    ('created', WeatherMonthlyAnalysis.created, format_datetime),
+]
+
+WEATHER_SEASON_ANALYSIS_FIELDS: list[Field] = [
+    ('weather_season_analysis_id', WeatherSeasonAnalysis.weather_season_analysis_id, None),
+    ('weather_station_id', WeatherSeasonAnalysis.weather_station_id, None),
+    ('year', WeatherSeasonAnalysis.year, None),
+    ('avg_max_temp', WeatherSeasonAnalysis.avg_max_temp_celsius, None),
+    ('avg_min_temp', WeatherSeasonAnalysis.avg_min_temp_celsius, None),
+    ('accumulated_precipitation', WeatherSeasonAnalysis.accumulated_precipitation_cm, None),
+    ('created', WeatherSeasonAnalysis.created, format_datetime),
+]
+
+REGIONAL_ANALYSIS_FIELDS: list[Field] = [
+    ('regional_analysis_id', RegionalAnalysis.regional_analysis_id, None),
+    ('year', RegionalAnalysis.year, None),
+    ('station_count', RegionalAnalysis.station_count, None),
+    ('avg_max_temp', RegionalAnalysis.avg_max_temp_celsius, None),
+    ('avg_min_temp', RegionalAnalysis.avg_min_temp_celsius, None),
+    ('accumulated_precipitation', RegionalAnalysis.accumulated_precipitation_cm, None),
+    ('created', RegionalAnalysis.created, format_datetime),
+]
+
+
+# Read from the station table outer-joined to its metadata, so stations without metadata have null locations.
+STATION_FIELDS: list[Field] = [
+    ('weather_station_id', Station.weather_station_id, None),
+    ('name', StationMetadata.name, None),
+    ('latitude', StationMetadata.latitude, None),
+    ('longitude', StationMetadata.longitude, None),
+    ('elevation', StationMetadata.elevation, None),
+    ('state', StationMetadata.state, None),
+]
+
+WEATHER_QUARANTINE_FIELDS: list[Field] = [
+    ('weather_quarantine_id', WeatherQuarantine.weather_quarantine_id, None),
+    ('weather_station_id', WeatherQuarantine.weather_station_id, None),
+    ('date', WeatherQuarantine.date, format_date),
+    ('max_temp', WeatherQuarantine.max_temp, None),
+    ('min_temp', WeatherQuarantine.min_temp, None),
+    ('precipitation', WeatherQuarantine.precipitation, None),
+    ('rules', WeatherQuarantine.rules, split_list),
+    ('created', WeatherQuarantine.created, format_datetime),
+]
+
+STATION_COMPLETENESS_FIELDS: list[Field] = [
+    ('station_completeness_id', StationCompleteness.station_completeness_id, None),
+    ('weather_station_id', StationCompleteness.weather_station_id, None),
+    ('year', StationCompleteness.year, None),
+    ('days_in_year', StationCompleteness.days_in_year, None),
+    ('days_present', StationCompleteness.days_present, None),
+    ('days_complete', StationCompleteness.days_complete, None),
+    ('days_flagged', StationCompleteness.days_flagged, None),
+    ('completeness', StationCompleteness.completeness, None),
+    ('created', StationCompleteness.created, format_datetime),
+]
+
+
+def field_columns(fields: list[Field]) -> list[Column]:
+    """
+    Returns the columns to select for a list of response fields.
+
+    Args:
+        fields (list[Field]): The response fields.
+
+    Returns:
+        list[Column]: The source columns, in field order.
+    """
+    return [column for _, column, _ in fields]
+
+
+def rows_to_dicts(rows: Sequence[Sequence], fields: list[Field]) -> list[dict]:
+    """
+    Converts selected row tuples into response dicts without materializing ORM objects.
+
+    Values are converted column by column, so each converter runs in one tight loop.
+
+    Args:
+        rows (Sequence[Sequence]): The rows, with values in field order.
+        fields (list[Field]): The response fields.
+
+    Returns:
+        list[dict]: One dict per row, with converted values.
+    """
+    if not rows:
+        return []
+
+    with phase('serialize'):
+        names = [name for name, _, _ in fields]
+        columns = [list(column) for column in zip(*rows)]
+        for index, (_, _, convert) in enumerate(fields):
+            if convert is not None:
+                columns[index] = [None if value is None else convert(value) for value in columns[index]]
+
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serializes an object to the same bytes as Flask's jsonify in production mode.
+
+    Uses orjson when it is installed and the standard library otherwise. Both produce compact JSON
+    with sorted keys and a trailing newline; date values must already be converted to strings. The
+    output matches jsonify byte for byte as long as strings are ASCII, which holds for every field of
+    the weather tables.
+
+    Args:
+        obj (Any): The object to serialize.
+
+    Returns:
+        bytes: The JSON document.
+    """
+    with phase('serialize'):
+        if orjson is not None:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+
+        return (json.dumps(obj, sort_keys=True, ensure_ascii=True, separators=(',', ':')) + '\n').encode()
@@ -0,0 +1,330 @@
+import array
+import bisect
+import fcntl
+import mmap
+import os
+import pathlib
+import struct
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Iterator
+from sqlalchemy import select
+from cache import dataset_version
+from export import stream_partitions
+from models import Weather
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC: bytes = b'WXIX'
+FORMAT_VERSION: int = 1
+# Magic, format version, byte order (1 for little-endian), station count, row count, weather dataset version.
+HEADER: struct.Struct = struct.Struct('<4sHHIQQ')
+# Stand-ins for NULL in the integer columns.
+NULL_INT32: int = -2 ** 31
+NULL_INT64: int = -2 ** 63
+EPOCH: datetime = datetime(1970, 1, 1)
+# Per-row columns in file order, with their array type codes; 8-byte columns first keeps every section aligned.
+COLUMNS: tuple[tuple[str, str], ...] = (
+    ('weather_id', 'q'),
+    ('created', 'q'),
+    ('date', 'i'),
+    ('max_temp', 'i'),
+    ('min_temp', 'i'),
+    ('precipitation', 'i'),
+)
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+@contextmanager
+def station_index_lock(path: pathlib.Path) -> Iterator[None]:
+    """
+    Holds an exclusive lock on a station index across processes, e.g. gunicorn workers starting together.
+
+    The lock is a flock on a file next to the index, released when the block exits or the process dies.
+
+    Args:
+        path (pathlib.Path): The index file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f'.{path.name}.lock'), 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def index_version(path: pathlib.Path) -> int | None:
+    """
+    Reads the weather dataset version a station index file was built from, without mapping the file.
+
+    Args:
+        path (pathlib.Path): The index file.
+
+    Returns:
+        int | None: The version, or None if the file is missing or not a station index of this format.
+    """
+    try:
+        with open(path, 'rb') as file:
+            magic, format_version, little_endian, _, _, version = HEADER.unpack(file.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    if magic != MAGIC or format_version != FORMAT_VERSION or little_endian != (sys.byteorder == 'little'):
+        return None
+
+    return version
+
+
+def build_station_index(path: pathlib.Path) -> int:
+    """
+    Writes the weather table to a station index file, sorted by (station, date).
+
+    The file is written to a temporary file of its own next to path and moved into place with
+    os.replace under the station index lock, so processes that have the previous file mapped keep
+    reading it, new readers see the complete new file and concurrent builds do not interleave.
+
+    Args:
+        path (pathlib.Path): The index file to write.
+
+    Returns:
+        int: The number of records written.
+    """
+    with station_index_lock(path):
+        return _write_station_index(path)
+
+
+def ensure_station_index(path: pathlib.Path) -> int | None:
+    """
+    Builds the station index unless the file is already built from the current weather dataset version.
+
+    The check runs under the station index lock, so of several processes starting together only the
+    first builds the file and the others wait for it and reuse it.
+
+    Args:
+        path (pathlib.Path): The index file.
+
+    Returns:
+        int | None: The number of records written, or None if the file was up to date.
+    """
+    with station_index_lock(path):
+        version = dataset_version(Weather.__tablename__)
+        if index_version(path) == (version.version if version else 0):
+            return None
+        return _write_station_index(path)
+
+
+def _write_station_index(path: pathlib.Path) -> int:
+    version = dataset_version(Weather.__tablename__)
+    columns = {name: array.array(typecode) for name, typecode in COLUMNS}
+    stations: list[str] = []
+    offsets = array.array('q')
+
+    query = select(Weather.weather_station_id, Weather.weather_id, Weather.created, Weather.date, Weather.max_temp,
+                   Weather.min_temp, Weather.precipitation).order_by(Weather.weather_station_id, Weather.date)
+    num_rows = 0
+    microsecond = timedelta(microseconds=1)
+    for partition in stream_partitions(query):
+        station_ids, weather_ids, created, dates, max_temps, min_temps, precipitations = zip(*partition)
+        for position, weather_station_id in enumerate(station_ids):
+            if not stations or stations[-1] != weather_station_id:
+                stations.append(weather_station_id)
+                offsets.append(num_rows + position)
+        num_rows += len(partition)
+
+        # Rows ingested together share their created timestamp, so conversions are memoized.
+        timestamps = {value: NULL_INT64 if value is None else (value.replace(tzinfo=None) - EPOCH) // microsecond
+                      for value in set(created)}
+        columns['weather_id'].extend(weather_ids)
+        columns['created'].extend([timestamps[value] for value in created])
+        columns['date'].extend([value.toordinal() for value in dates])
+        for name, values in (('max_temp', max_temps), ('min_temp', min_temps), ('precipitation', precipitations)):
+            columns[name].extend([NULL_INT32 if value is None else value for value in values])
+    offsets.append(num_rows)
+
+    station_block = '\n'.join(stations).encode()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == 'little', len(stations), num_rows,
+                         version.version if version else 0)
+
+    descriptor, temp_name = tempfile.mkstemp(prefix=f'.{path.name}.', suffix='.tmp', dir=path.parent)
+    try:
+        # mkstemp creates the file readable by its owner only; the index is read by every worker.
+        os.fchmod(descriptor, 0o644)
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(header + b'\0' * _padding(HEADER.size))
+            file.write(struct.pack('<Q', len(station_block)) + station_block + b'\0' * _padding(len(station_block)))
+            offsets.tofile(file)
+            for name, _ in COLUMNS:
+                columns[name].tofile(file)
+        os.replace(temp_name, path)
+    except BaseException:
+        pathlib.Path(temp_name).unlink(missing_ok=True)
+        raise
+
+    logger.info(f"Station index written to {path}: {num_rows} records of {len(stations)} stations")
+    return num_rows
+
+
+class StationIndex:
+    """
+    A read-only, memory-mapped view of a station index file.
+
+    The columns are read in place from the mapping, so every process that opens the same file shares
+    one copy of its pages through the OS page cache.
+
+    Attributes:
+        path (pathlib.Path): The index file.
+        version (int): The weather dataset version the file was built from.
+        stations (dict[str, tuple[int, int]]): The row range of each station.
+    """
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+        magic, format_version, little_endian, num_stations, num_rows, self.version = HEADER.unpack_from(view)
+        if magic != MAGIC or format_version != FORMAT_VERSION or little_endian != (sys.byteorder == 'little'):
+            raise ValueError(f"{path} is not a station index of this format and byte order")
+
+        position = HEADER.size + _padding(HEADER.size)
+        (block_size,) = struct.unpack_from('<Q', view, position)
+        position += 8
+        names = bytes(view[position:position + block_size]).decode().split('\n') if num_stations else []
+        position += block_size + _padding(block_size)
+        offsets = view[position:position + 8 * (num_stations + 1)].cast('q')
+        position += 8 * (num_stations + 1)
+        self.stations = {name: (offsets[i], offsets[i + 1]) for i, name in enumerate(names)}
+
+        self._columns: dict[str, memoryview] = {}
+        for name, typecode in COLUMNS:
+            size = array.array(typecode).itemsize * num_rows
+            self._columns[name] = view[position:position + size].cast(typecode)
+            position += size
+
+    def __repr__(self):
+        return f"StationIndex(path={self.path}, version={self.version}, rows={len(self._columns['date'])})"
+
+    def search(self, weather_station_id: str, start: date | None = None, end: date | None = None) -> range:
+        """
+        Finds the rows of one station between two dates with a binary search.
+
+        Args:
+            weather_station_id (str): The weather station ID.
+            start (date | None): The first date, inclusive, or None for the first record.
+            end (date | None): The last date, inclusive, or None for the last record.
+
+        Returns:
+            range: The positions of the matching rows, in date order.
+        """
+        low, high = self.stations.get(weather_station_id, (0, 0))
+        dates = self._columns['date']
+        if start is not None:
+            low = bisect.bisect_left(dates, start.toordinal(), low, high)
+        if end is not None:
+            high = bisect.bisect_right(dates, end.toordinal(), low, high)
+
+        return range(low, max(low, high))
+
+    def rows(self, positions: range, weather_station_id: str) -> list[tuple]:
+        """
+        Reads rows in the column order of serialization.WEATHER_FIELDS.
+
+        Args:
+            positions (range): The positions of the rows, as returned by search.
+            weather_station_id (str): The station the rows belong to.
+
+        Returns:
+            list[tuple]: The rows.
+        """
+        columns = self._columns
+        rows = []
+        for position in positions:
+            created = columns['created'][position]
+            readings = [columns[name][position] for name in ('max_temp', 'min_temp', 'precipitation')]
+            rows.append((
+                columns['weather_id'][position],
+                weather_station_id,
+                date.fromordinal(columns['date'][position]),
+                *[None if value == NULL_INT32 else value for value in readings],
+                None if created == NULL_INT64 else EPOCH + timedelta(microseconds=created),
+            ))
+
+        return rows
+
+
+class StationIndexLoader:
+    """
+    Keeps the current station index of a process open, reopening the file after it is replaced.
+
+    Replacing the file by rename gives it a new inode, so a stat per request is enough to notice a
+    rebuild; requests that already hold the previous index finish reading it undisturbed. An ingest
+    given the index path removes the file before it commits new weather records, so requests fall back
+    to SQL until it is rebuilt. An index built from another weather dataset version than the database's,
+    e.g. after an ingest that did not know its path, is not served; that version is read when the file
+    is opened and then at most every check_interval seconds, not per request.
+
+    Attributes:
+        path (pathlib.Path): The index file.
+        check_interval (float): The number of seconds between checks of the weather dataset version.
+    """
+    def __init__(self, path: pathlib.Path, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._index: StationIndex | None = None
+        self._key: tuple | None = None
+        # The index, time and outcome of the last version check.
+        self._check: tuple[StationIndex, float, bool] | None = None
+        self._stale: tuple | None = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"StationIndexLoader(path={self.path}, check_interval={self.check_interval})"
+
+    def current(self) -> StationIndex | None:
+        """
+        Returns the index of the current file, if it matches the weather dataset version of the database.
+
+        Returns:
+            StationIndex | None: The index, or None if the file is missing, unreadable or stale.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    try:
+                        self._index = StationIndex(self.path)
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Could not open station index {self.path}: {e}")
+                        self._index = None
+                    self._key = key
+
+        index = self._index
+        if index is None:
+            return None
+
+        check = self._check
+        now = time.monotonic()
+        if check is None or check[0] is not index or now - check[1] >= self.check_interval:
+            version = dataset_version(Weather.__tablename__)
+            version = version.version if version else 0
+            check = self._check = (index, now, index.version == version)
+            if not check[2] and self._stale != (key, version):
+                self._stale = (key, version)
+                logger.warning(f"Station index {self.path} is stale (version {index.version}, weather version "
+                               f"{version}); serving from the database until it is rebuilt")
+
+        return index if check[2] else None
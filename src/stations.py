@@ -0,0 +1,299 @@
+import heapq
+import math
+import threading
+from sqlalchemy import ColumnElement, select
+from werkzeug.datastructures import ImmutableMultiDict, MultiDict
+from cache import dataset_version
+from filters import FilterError, parse_int, parse_list
+from models import db, Station, StationMetadata, Weather
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+# Mean radius of the Earth, used to turn chord lengths on the unit sphere into great-circle distances.
+EARTH_RADIUS_KM: float = 6371.0088
+NEAR_K_DEFAULT: int = 10
+NEAR_K_MAX: int = 1000
+# Points per leaf of the KD-tree; below this a linear scan is faster than descending further.
+LEAF_SIZE: int = 16
+
+
+def unit_vector(latitude: float, longitude: float) -> tuple[float, float, float]:
+    """
+    Converts a position to a point on the unit sphere.
+
+    The straight-line distance between two such points grows with their great-circle distance, so
+    nearest neighbours in three dimensions are nearest on the globe, across the antimeridian and the poles too.
+
+    Args:
+        latitude (float): The latitude in decimal degrees.
+        longitude (float): The longitude in decimal degrees.
+
+    Returns:
+        tuple[float, float, float]: The x, y and z coordinates.
+    """
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def chord_to_km(squared_chord: float) -> float:
+    """
+    Converts the squared straight-line distance between two points of the unit sphere to kilometers along the surface.
+
+    Args:
+        squared_chord (float): The squared distance.
+
+    Returns:
+        float: The great-circle distance in kilometers.
+    """
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+class KDTree:
+    """
+    A static k-d tree over points in three dimensions, for exact k-nearest-neighbour queries.
+
+    Each node splits its points at the median of its widest axis, until leaves hold at most LEAF_SIZE points.
+
+    Attributes:
+        points (list[tuple[float, float, float]]): The points, in the order their indexes refer to.
+    """
+    def __init__(self, points: list[tuple[float, float, float]]):
+        self.points = points
+        self._root = self._build(list(range(len(points))))
+
+    def __repr__(self):
+        return f"KDTree(points={len(self.points)})"
+
+    def _build(self, indexes: list[int]) -> tuple:
+        # Leaves are (-1, 0.0, indexes, None); inner nodes are (axis, split, left, right).
+        if len(indexes) <= LEAF_SIZE:
+            return -1, 0.0, indexes, None
+
+        spreads = [max(self.points[i][axis] for i in indexes) - min(self.points[i][axis] for i in indexes)
+                   for axis in range(3)]
+        axis = spreads.index(max(spreads))
+        indexes.sort(key=lambda i: self.points[i][axis])
+        middle = len(indexes) // 2
+
+        return axis, self.points[indexes[middle]][axis], self._build(indexes[:middle]), self._build(indexes[middle:])
+
+    def nearest(self, point: tuple[float, float, float], k: int) -> list[tuple[float, int]]:
+        """
+        Finds the k points nearest to a point.
+
+        Args:
+            point (tuple[float, float, float]): The query point.
+            k (int): The number of neighbours.
+
+        Returns:
+            list[tuple[float, int]]: The squared distance and index of each neighbour, nearest first; ties
+                go to the lower index.
+        """
+        # A max-heap of (-distance, -index), so its top is the worst neighbour found so far.
+        heap: list[tuple[float, int]] = []
+
+        def visit(node: tuple):
+            axis, split, left, right = node
+            if axis < 0:
+                for index in left:
+                    candidate = self.points[index]
+                    distance = ((candidate[0] - point[0]) ** 2 + (candidate[1] - point[1]) ** 2
+                                + (candidate[2] - point[2]) ** 2)
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-distance, -index))
+                    elif (-distance, -index) > heap[0]:
+                        heapq.heapreplace(heap, (-distance, -index))
+                return
+
+            offset = point[axis] - split
+            near, far = (left, right) if offset < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or offset * offset <= -heap[0][0]:
+                visit(far)
+
+        if k > 0 and self.points:
+            visit(self._root)
+
+        return sorted((-distance, -index) for distance, index in heap)
+
+
+class StationLocator:
+    """
+    The positions of the stations that have readings, indexed for nearest-station queries.
+
+    Attributes:
+        station_ids (list[str]): The weather station IDs, sorted.
+        tree (KDTree): The KD-tree over the stations' points on the unit sphere, in station_ids order.
+        version (tuple): The versions of the weather and station metadata datasets it was built from.
+    """
+    def __init__(self, stations: list[tuple[str, float, float]], version: tuple):
+        self.station_ids = [weather_station_id for weather_station_id, _, _ in stations]
+        self.tree = KDTree([unit_vector(latitude, longitude) for _, latitude, longitude in stations])
+        self.version = version
+
+    def __repr__(self):
+        return f"StationLocator(stations={len(self.station_ids)}, version={self.version})"
+
+    def nearest(self, latitude: float, longitude: float, k: int) -> list[tuple[str, float]]:
+        """
+        Finds the k stations nearest to a position.
+
+        Args:
+            latitude (float): The latitude in decimal degrees.
+            longitude (float): The longitude in decimal degrees.
+            k (int): The number of stations.
+
+        Returns:
+            list[tuple[str, float]]: The ID and great-circle distance in kilometers of each station, nearest first.
+
+        Raises:
+            FilterError: If no station has a location.
+        """
+        if not self.station_ids:
+            raise FilterError("near needs station locations; ingest a stations file first")
+
+        return [(self.station_ids[index], chord_to_km(distance))
+                for distance, index in self.tree.nearest(unit_vector(latitude, longitude), k)]
+
+
+def locator_version() -> tuple:
+    """
+    Returns the versions of the datasets a StationLocator is built from.
+
+    Returns:
+        tuple: The weather and station metadata dataset versions, 0 for datasets never ingested.
+    """
+    versions = [dataset_version(name) for name in (Weather.__tablename__, StationMetadata.__tablename__)]
+    return tuple(0 if version is None else version.version for version in versions)
+
+
+def build_station_locator() -> StationLocator:
+    """
+    Builds a StationLocator from the stations with both readings and a location.
+
+    Returns:
+        StationLocator: The locator.
+    """
+    version = locator_version()
+    query = select(StationMetadata.weather_station_id, StationMetadata.latitude, StationMetadata.longitude).join(
+        Station, Station.weather_station_id == StationMetadata.weather_station_id
+    ).order_by(StationMetadata.weather_station_id)
+
+    return StationLocator([tuple(row) for row in db.session.execute(query)], version)
+
+
+class StationLocatorLoader:
+    """
+    Keeps the station locator of a process current, rebuilding it after ingestion changed the stations.
+
+    A rebuild reads a few columns per station, so it happens on the first nearest-station query after
+    the weather or station metadata dataset version moved.
+    """
+    def __init__(self):
+        self._locator: StationLocator | None = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"StationLocatorLoader(locator={self._locator})"
+
+    def current(self) -> StationLocator:
+        """
+        Returns the locator for the current dataset versions.
+
+        Returns:
+            StationLocator: The locator.
+        """
+        version = locator_version()
+        if self._locator is None or self._locator.version != version:
+            with self._lock:
+                if self._locator is None or self._locator.version != version:
+                    self._locator = build_station_locator()
+                    logger.info(f"Station locator built: {len(self._locator.station_ids)} stations")
+
+        return self._locator
+
+
+def parse_near(args: MultiDict) -> tuple[float, float, int] | None:
+    """
+    Parses the `near` and `k` arguments of a request.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        tuple[float, float, int] | None: The latitude, longitude and number of stations, or None if
+            `near` is missing or empty.
+
+    Raises:
+        FilterError: If the position or k is invalid.
+    """
+    value = args.get('near', type=str)
+    if not value:
+        return None
+
+    try:
+        latitude, longitude = (float(part) for part in value.split(','))
+    except ValueError as e:
+        raise FilterError("near must be a latitude and a longitude separated by a comma") from e
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise FilterError("near must be a latitude between -90 and 90 and a longitude between -180 and 180")
+
+    k = parse_int(args, 'k')
+    k = NEAR_K_DEFAULT if k is None else k
+    if not 1 <= k <= NEAR_K_MAX:
+        raise FilterError(f"k must be between 1 and {NEAR_K_MAX}")
+
+    return latitude, longitude, k
+
+
+def near_station_args(args: MultiDict, locator: StationLocator) -> ImmutableMultiDict:
+    """
+    Replaces the `near` and `k` arguments of a request by the `station_id` list of the nearest stations.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+        locator (StationLocator): The station locator.
+
+    Returns:
+        ImmutableMultiDict: The arguments with the resolved station filter, or the arguments unchanged without `near`.
+
+    Raises:
+        FilterError: If the arguments are invalid, combined with `station_id`, or no station has a location.
+    """
+    near = parse_near(args)
+    if near is None:
+        return ImmutableMultiDict(args)
+    if args.get('station_id'):
+        raise FilterError("near cannot be combined with station_id")
+
+    nearest = locator.nearest(*near)
+
+    resolved = MultiDict(args)
+    resolved.poplist('near')
+    resolved.poplist('k')
+    resolved['station_id'] = ','.join(weather_station_id for weather_station_id, _ in nearest)
+
+    return ImmutableMultiDict(resolved)
+
+
+def station_conditions(args: MultiDict) -> list[ColumnElement[bool]]:
+    """
+    Parses the `station_id` and `state` filters of a stations request into WHERE conditions.
+
+    Args:
+        args (MultiDict): The query arguments of the request.
+
+    Returns:
+        list[ColumnElement[bool]]: The conditions, to be combined with AND.
+    """
+    conditions: list[ColumnElement[bool]] = []
+    station_ids = parse_list(args, 'station_id')
+    if station_ids:
+        conditions.append(Station.weather_station_id.in_(station_ids))
+    states = [state.upper() for state in parse_list(args, 'state')]
+    if states:
+        conditions.append(StationMetadata.state.in_(states))
+
+    return conditions
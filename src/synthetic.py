@@ -0,0 +1,338 @@
+import argparse
+import math
+import pathlib
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+import polars as pl
+import logging
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+YIELD_FILE: str = 'US_corn_grain_yield.txt'
+# Years of the source data set, 1985 to 2014.
+SYNTHETIC_YEARS: int = 30
+# Sentinel the source files use for missing readings.
+MISSING: int = -9999
+# Stations written per batch; bounds memory to roughly this many station histories.
+STATION_BATCH: int = 64
+# Day of the year of the warmest and wettest days.
+WARMEST_DAY: int = 200
+WETTEST_DAY: int = 160
+# Yearly mean daily maximum and its seasonal amplitude, in tenths of a degree Celsius.
+MAX_TEMP_MEAN: float = 150.0
+MAX_TEMP_AMPLITUDE: float = 140.0
+# Mean difference between the daily maximum and minimum, in tenths of a degree Celsius.
+TEMP_RANGE_MEAN: float = 115.0
+# Share of days with precipitation, and the log-normal parameters of a wet day's amount in tenths of a millimeter.
+WET_DAY_SHARE: float = 0.28
+PRECIPITATION_MU: float = math.log(43)
+PRECIPITATION_SIGMA: float = 1.2
+PRECIPITATION_CAP: int = 5000
+# Share of days missing every reading, and of single readings missing on other days.
+MISSING_DAY_SHARE: float = 0.015
+MISSING_READING_SHARE: float = 0.005
+# Persistence of the daily temperature anomaly from one day to the next.
+TEMP_PERSISTENCE: float = 0.6
+
+# Constants of the splitmix64 generator.
+_GOLDEN: int = 0x9E3779B97F4A7C15
+_MIX_1: int = 0xBF58476D1CE4E5B9
+_MIX_2: int = 0x94D049BB133111EB
+_MASK: int = 2 ** 64 - 1
+# Independent random streams drawn for every station day.
+_STREAMS: tuple[str, ...] = ('temp_1', 'temp_2', 'range_1', 'range_2', 'wet', 'amount_1', 'amount_2',
+                             'missing_day', 'missing_max', 'missing_min', 'missing_precipitation')
+
+
+def _splitmix(value: int) -> int:
+    value = (value + _GOLDEN) & _MASK
+    value = ((value ^ (value >> 30)) * _MIX_1) & _MASK
+    value = ((value ^ (value >> 27)) * _MIX_2) & _MASK
+    return value ^ (value >> 31)
+
+
+def _mix(key: pl.Expr) -> pl.Expr:
+    # splitmix64 in UInt64 arithmetic, which wraps on overflow; floor division stands in for the right shift.
+    value = key + pl.lit(_GOLDEN, dtype=pl.UInt64)
+    value = (value ^ (value // 2 ** 30)) * pl.lit(_MIX_1, dtype=pl.UInt64)
+    value = (value ^ (value // 2 ** 27)) * pl.lit(_MIX_2, dtype=pl.UInt64)
+    return value ^ (value // 2 ** 31)
+
+
+def uniform(key: pl.Expr, seed: int, stream: int) -> pl.Expr:
+    """
+    Draws a uniform number in (0, 1) for every key, the same for the same key, seed and stream.
+
+    Args:
+        key (pl.Expr): A UInt64 expression that identifies each draw, e.g. a global row number.
+        seed (int): The seed of the data set.
+        stream (int): The number of the random stream, so one key can have several independent draws.
+
+    Returns:
+        pl.Expr: The uniform numbers, as Float64.
+    """
+    salt = _splitmix(_splitmix(seed & _MASK) ^ stream)
+    bits = _mix(key ^ pl.lit(salt, dtype=pl.UInt64)) // 2 ** 11
+    return (bits.cast(pl.Float64) + 0.5) / 2 ** 53
+
+
+def normal(u1: pl.Expr, u2: pl.Expr) -> pl.Expr:
+    """
+    Turns two independent uniform numbers into a standard normal one with the Box-Muller transform.
+
+    Args:
+        u1 (pl.Expr): Uniform numbers in (0, 1).
+        u2 (pl.Expr): Uniform numbers in (0, 1).
+
+    Returns:
+        pl.Expr: The normal numbers.
+    """
+    return (-2 * u1.log()).sqrt() * (2 * math.pi * u2).cos()
+
+
+def station_ids(stations: int) -> list[str]:
+    """
+    Returns the IDs of synthetic stations; the `USC9` prefix keeps them apart from the real `USC00` stations.
+
+    Args:
+        stations (int): The number of stations.
+
+    Returns:
+        list[str]: The station IDs, in order.
+    """
+    return [f'USC9{index:07d}' for index in range(stations)]
+
+
+def year_anomalies(years: int, start_year: int, seed: int) -> dict[int, float]:
+    """
+    Draws the temperature anomaly shared by every station in each year, in tenths of a degree Celsius.
+
+    Warm years lower the yields of generate_yld_data, so the synthetic data has a weather signal to correlate.
+
+    Args:
+        years (int): The number of years.
+        start_year (int): The first year.
+        seed (int): The seed of the data set.
+
+    Returns:
+        dict[int, float]: The anomaly of each year.
+    """
+    return {year: random.Random(f'{seed}:year:{year}').gauss(0, 8) for year in range(start_year, start_year + years)}
+
+
+def calendar(years: int, start_year: int, seed: int) -> pl.DataFrame:
+    """
+    Builds the days covered by the synthetic data with their seasonal terms.
+
+    Args:
+        years (int): The number of years.
+        start_year (int): The first year.
+        seed (int): The seed of the data set.
+
+    Returns:
+        pl.DataFrame: One row per day with its index, the date as written to the files and the
+            seasonal temperature and wetness terms.
+    """
+    anomalies = year_anomalies(years, start_year, seed)
+    days = pl.date_range(date(start_year, 1, 1), date(start_year + years - 1, 12, 31), eager=True).alias('date')
+    warm = (2 * math.pi * (days.dt.ordinal_day() - WARMEST_DAY) / 365.25).cos()
+    wet = (2 * math.pi * (days.dt.ordinal_day() - WETTEST_DAY) / 365.25).cos()
+
+    return pl.DataFrame({
+        'day': pl.int_range(0, days.len(), dtype=pl.UInt64, eager=True),
+        'date_text': days.dt.strftime('%Y%m%d'),
+        'season': warm,
+        'wet_season': wet,
+        'anomaly': days.dt.year().replace(anomalies, default=0.0, return_dtype=pl.Float64),
+    })
+
+
+def station_parameters(first: int, count: int, seed: int) -> pl.DataFrame:
+    """
+    Draws the climate of a range of stations: how warm, seasonal, variable and wet each one is.
+
+    Args:
+        first (int): The index of the first station.
+        count (int): The number of stations.
+        seed (int): The seed of the data set.
+
+    Returns:
+        pl.DataFrame: One row per station with its index and climate parameters.
+    """
+    rows = []
+    for index in range(first, first + count):
+        generator = random.Random(f'{seed}:station:{index}')
+        rows.append((index, generator.gauss(0, 30), generator.gauss(0, 15), generator.gauss(0, 10),
+                     generator.gauss(0, 0.04)))
+
+    return pl.DataFrame(rows, schema={'station': pl.UInt64, 'offset': pl.Float64, 'amplitude': pl.Float64,
+                                      'range_offset': pl.Float64, 'wet_offset': pl.Float64}, orient='row')
+
+
+def generate_station_days(first: int, count: int, days: pl.DataFrame, seed: int) -> pl.DataFrame:
+    """
+    Generates the daily readings of a range of stations, with every random draw keyed by station and day.
+
+    The result depends only on the seed and the station and day, not on how stations are batched.
+
+    Args:
+        first (int): The index of the first station.
+        count (int): The number of stations.
+        days (pl.DataFrame): The days, as returned by calendar.
+        seed (int): The seed of the data set.
+
+    Returns:
+        pl.DataFrame: One row per station and day, in that order, with station, date_text, max_temp,
+            min_temp and precipitation columns; missing readings are MISSING.
+    """
+    key = pl.col('station') * days.height + pl.col('day')
+    u = {name: uniform(key, seed, stream) for stream, name in enumerate(_STREAMS)}
+
+    # An exponentially weighted mean of white noise is an AR(1) series; rescaling restores unit variance.
+    alpha = 1 - TEMP_PERSISTENCE
+    noise = normal(u['temp_1'], u['temp_2'])
+    persistent = noise.ewm_mean(alpha=alpha, adjust=False, ignore_nulls=False).over('station') * math.sqrt((2 - alpha) / alpha)
+
+    max_temp = (MAX_TEMP_MEAN + pl.col('offset') + pl.col('anomaly') + (MAX_TEMP_AMPLITUDE + pl.col('amplitude')) * pl.col('season')
+                + (60 - 15 * pl.col('season')) * persistent)
+    temp_range = (TEMP_RANGE_MEAN + pl.col('range_offset') + 15 * normal(u['range_1'], u['range_2'])).clip(0)
+    wet_share = WET_DAY_SHARE + 0.06 * pl.col('wet_season') + pl.col('wet_offset')
+    amount = (PRECIPITATION_MU + 0.2 * pl.col('wet_season') + PRECIPITATION_SIGMA * normal(u['amount_1'], u['amount_2'])).exp()
+    precipitation = pl.when(u['wet'] < wet_share).then(amount.clip(1, PRECIPITATION_CAP)).otherwise(0)
+
+    missing_day = u['missing_day'] < MISSING_DAY_SHARE
+
+    def reading(value: pl.Expr, stream: str) -> pl.Expr:
+        missing = missing_day | (u[stream] < MISSING_READING_SHARE)
+        return pl.when(missing).then(MISSING).otherwise(value.round(0).cast(pl.Int32)).cast(pl.Int32)
+
+    return (
+        station_parameters(first, count, seed).lazy()
+        .join(days.lazy(), how='cross')
+        .with_columns(max_temp=max_temp)
+        .select(
+            'station',
+            'date_text',
+            reading(pl.col('max_temp'), 'missing_max').alias('max_temp'),
+            reading(pl.col('max_temp') - temp_range, 'missing_min').alias('min_temp'),
+            reading(precipitation, 'missing_precipitation').alias('precipitation'),
+        )
+        .collect()
+    )
+
+
+def format_wx_lines(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Formats readings like the source files: the date, then each reading right-aligned in five characters.
+
+    Args:
+        df (pl.DataFrame): Readings, as returned by generate_station_days.
+
+    Returns:
+        pl.DataFrame: The date_text column and the three padded reading columns, ready for write_csv.
+    """
+    return df.select('date_text', *[pl.col(name).cast(pl.String).str.pad_start(5)
+                                     for name in ('max_temp', 'min_temp', 'precipitation')])
+
+
+def generate_wx_data(target: pathlib.Path, stations: int, years: int, start_year: int = 1985, seed: int = 0,
+                     station_batch: int = STATION_BATCH) -> int:
+    """
+    Writes synthetic weather station files in the tab-separated format read by wx_consolidation.
+
+    Every station has its own climate around a seasonal temperature curve and a log-normal
+    distribution of wet-day precipitation, with missing readings marked -9999 at about the rate
+    of the source data. The files are the same for the same arguments, whatever the batch size.
+
+    Args:
+        target (pathlib.Path): The folder to write the station files to; it is created if needed.
+        stations (int): The number of stations.
+        years (int): The number of years of daily readings per station.
+        start_year (int): The first year.
+        seed (int): The seed of the data set.
+        station_batch (int): The number of stations generated at once, which bounds memory.
+
+    Returns:
+        int: The number of rows written.
+    """
+    target.mkdir(parents=True, exist_ok=True)
+    days = calendar(years, start_year, seed)
+    ids = station_ids(stations)
+
+    def write(bound):
+        index, lines = bound
+        lines.write_csv(target / f'{ids[index]}.txt', include_header=False, separator='\t', quote_style='never')
+
+    num_rows = 0
+    # Polars releases the GIL while encoding, so station files are written in parallel.
+    with ThreadPoolExecutor() as executor:
+        for first in range(0, stations, station_batch):
+            count = min(station_batch, stations - first)
+            lines = format_wx_lines(generate_station_days(first, count, days, seed))
+            list(executor.map(write, ((first + i, lines.slice(i * days.height, days.height)) for i in range(count))))
+            num_rows += lines.height
+
+    return num_rows
+
+
+def generate_yld_data(file: pathlib.Path, years: int, start_year: int = 1985, seed: int = 0) -> int:
+    """
+    Writes a synthetic yield file in the `year<TAB>amount` format read by yld_consolidation.
+
+    Yields follow a rising trend, fall in years that generate_wx_data makes warm, and vary randomly around both.
+
+    Args:
+        file (pathlib.Path): The file to write; its folder is created if needed.
+        years (int): The number of years.
+        start_year (int): The first year.
+        seed (int): The seed of the data set.
+
+    Returns:
+        int: The number of years written.
+    """
+    anomalies = year_anomalies(years, start_year, seed)
+    lines = []
+    for year, anomaly in anomalies.items():
+        noise = random.Random(f'{seed}:yield:{year}').gauss(0, 10_000)
+        lines.append(f'{year}\t{round(200_000 + 5_000 * (year - start_year) - 2_500 * anomaly + noise)}\n')
+
+    file.parent.mkdir(parents=True, exist_ok=True)
+    file.write_text(''.join(lines))
+    return len(lines)
+
+
+def synthetic_main(output: pathlib.Path, stations: int, years: int, start_year: int, seed: int):
+    """
+    Main function to write a synthetic data set with `wx_data` and `yld_data` folders like the project's.
+
+    It logs the number of rows written and the total time taken.
+
+    Args:
+        output (pathlib.Path): The folder to write the data set to.
+        stations (int): The number of stations.
+        years (int): The number of years.
+        start_year (int): The first year.
+        seed (int): The seed of the data set.
+    """
+    start_time = datetime.now()
+    num_rows = generate_wx_data(output / 'wx_data', stations, years, start_year, seed)
+    generate_yld_data(output / 'yld_data' / YIELD_FILE, years, start_year, seed)
+    end_time = datetime.now()
+
+    logger.info(f"Synthetic weather rows written: {num_rows} of {stations} stations")
+    logger.info(f"Synthetic data set written to {output} in {(end_time - start_time).total_seconds()} seconds.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Writes a synthetic weather and yield data set.')
+    parser.add_argument('output', type=pathlib.Path, help='folder to write wx_data and yld_data to')
+    parser.add_argument('--stations', type=int, default=167, help='number of weather stations')
+    parser.add_argument('--years', type=int, default=SYNTHETIC_YEARS, help='number of years per station')
+    parser.add_argument('--start-year', type=int, default=1985, help='first year')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the data set')
+    args = parser.parse_args()
+
+    synthetic_main(args.output, args.stations, args.years, args.start_year, args.seed)
@@ -1,5 +1,35 @@
+import io
+import json
+import pathlib
+import statistics
+import tempfile
+import threading
+import time
 import unittest
+import polars as pl
+from datetime import date
 from app import create_app
+from models import db, READ_ONLY_BIND, Station, StationCompleteness, Weather, WeatherQuarantine, WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis, RegionalAnalysis, IngestManifest
+from ingest_data import IngestError, ingest_data_main, merge_weather, push_raw_data, push_weather_analysis, scan_wx_data, scan_wx_file, stn_consolidation, weather_analysis, wx_consolidation_cleanse, yld_consolidation
+from migrate import migrate_indexes, weather_layout
+from benchmark import compare_results, endpoint_matrix, explain_requests, scale_wx_data
+import columnar
+from columnar import partition_path, scan_weather
+from station_index import StationIndex, build_station_index, ensure_station_index
+from synthetic import generate_wx_data, generate_yld_data, station_ids
+from metrics import INGEST_STAGE_ROWS, REQUEST_PHASE_SECONDS, SLOW_QUERIES, Histogram
+from profiler import SamplingProfiler
+from pagination import CountCache
+from jobs import IngestJobRunner
+from quality import QualityRules, validate_weather
+from stations import KDTree, chord_to_km, unit_vector
+from cache import MemoryBackend, RedisBackend, ResponseCache, bump_dataset_version, dataset_version
+from datetime import datetime
+from flask import jsonify
+from unittest import mock
+import serialization
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.exc import OperationalError
 
 class TestWeatherAPI(unittest.TestCase):
     def setUp(self):
@@ -46,5 +76,1267 @@ class TestWeatherAPI(unittest.TestCase):
         response = self.client.get(f'/api/weather/stats?station_id={station_id}&year={year}')
         self.assertEqual(response.status_code, 200)
 
+
+class TestIngestion(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.wx_df = pl.DataFrame({
+            'date': [date(1990, 1, 1), date(1990, 1, 2), date(1990, 1, 1)],
+            'max_temp': [10, 20, None],
+            'min_temp': [-10, 0, -5],
+            'precipitation': [0, 15, 3],
+            'weather_station_id': ['USC00110072', 'USC00110072', 'USC00111436'],
+        })
+
+    def test_scan_wx_data_reads_every_station_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = pathlib.Path(tmp)
+            (folder / 'USC00000001.txt').write_text('19850101\t  -22\t -128\t   94\n19850102\t-9999\t -217\t    0\n')
+            (folder / 'USC00000002.txt').write_text('19850101\t   10\t   -5\t-9999\n')
+
+            wx_df = scan_wx_data(folder).collect().sort('weather_station_id', 'date')
+
+        self.assertEqual(wx_df.columns, ['date', 'max_temp', 'min_temp', 'precipitation', 'weather_station_id'])
+        self.assertEqual(wx_df['weather_station_id'].to_list(), ['USC00000001', 'USC00000001', 'USC00000002'])
+        self.assertEqual(wx_df['date'][0], date(1985, 1, 1))
+        self.assertEqual(wx_df['max_temp'].to_list(), [-22, None, 10])
+        self.assertEqual(wx_df['precipitation'].to_list(), [94, 0, None])
+
+    def test_push_raw_data_skips_existing_rows(self):
+        with self.app.app_context():
+            self.assertEqual(push_raw_data(self.wx_df), (3, 0))
+            self.assertEqual(push_raw_data(self.wx_df), (0, 0))
+            self.assertEqual(db.session.query(Weather).count(), 3)
+
+    def test_merge_weather_reports_inserted_and_skipped(self):
+        with self.app.app_context():
+            merge_weather(self.wx_df.head(1))
+            self.assertEqual(merge_weather(self.wx_df), (2, 1))
+            self.assertEqual(db.session.scalars(select(Weather.weather_id).order_by(Weather.weather_id)).all(), [1, 2, 3])
+            self.assertEqual(db.session.query(Station).count(), self.wx_df['weather_station_id'].n_unique())
+
+    def test_push_weather_analysis_is_idempotent(self):
+        with self.app.app_context():
+            wx_analysis_df = weather_analysis(self.wx_df)
+            self.assertEqual(push_weather_analysis(wx_analysis_df), 2)
+            self.assertEqual(push_weather_analysis(wx_analysis_df), 0)
+            self.assertEqual(db.session.query(WeatherAnalysis).count(), 2)
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wx_data = pathlib.Path(self.tmp.name) / 'wx_data'
+        self.wx_data.mkdir()
+        self.yld_data = pathlib.Path(self.tmp.name) / 'yield.txt'
+        self.yld_data.write_text('1985\t225447\n')
+        (self.wx_data / 'USC00000001.txt').write_text('19850101\t  100\t    0\t   10\n')
+        (self.wx_data / 'USC00000002.txt').write_text('19850101\t  200\t    0\t   20\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def analysis(self, weather_station_id):
+        return db.session.query(WeatherAnalysis).filter_by(weather_station_id=weather_station_id, year=1985).one()
+
+    def test_unchanged_files_are_skipped(self):
+        with self.app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data)
+            with self.assertLogs('ingest_data', level='INFO') as logs:
+                ingest_data_main(self.wx_data, self.yld_data)
+
+            self.assertIn('INFO:ingest_data:Source files changed: 0 of 3', logs.output)
+            self.assertEqual(db.session.query(IngestManifest).count(), 3)
+
+    def test_appended_tail_updates_only_its_group(self):
+        with self.app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data)
+            untouched_created = self.analysis('USC00000002').created
+            with open(self.wx_data / 'USC00000001.txt', 'a') as file:
+                file.write('19850102\t  300\t    0\t   30\n')
+
+            ingest_data_main(self.wx_data, self.yld_data)
+
+            self.assertEqual(db.session.query(Weather).count(), 3)
+            self.assertEqual(self.analysis('USC00000001').avg_max_temp_celsius, 200)
+            self.assertEqual(self.analysis('USC00000002').created, untouched_created)
+            manifest = db.session.query(IngestManifest).filter(IngestManifest.source_file.endswith('USC00000001.txt')).one()
+            self.assertEqual(manifest.last_ingested_date, date(1985, 1, 2))
+
+    def test_rewritten_file_replaces_records(self):
+        with self.app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data)
+            (self.wx_data / 'USC00000002.txt').write_text('19850101\t  250\t    0\t   20\n')
+
+            ingest_data_main(self.wx_data, self.yld_data)
+
+            self.assertEqual(db.session.query(Weather).filter_by(weather_station_id='USC00000002').one().max_temp, 250)
+            self.assertEqual(self.analysis('USC00000002').avg_max_temp_celsius, 250)
+
+    def test_rewritten_file_drops_records_it_no_longer_has(self):
+        store = pathlib.Path(self.tmp.name) / 'store'
+        (self.wx_data / 'USC00000002.txt').write_text('19850101\t  200\t    0\t   20\n19860701\t  300\t    0\t   30\n')
+        with self.app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data, parquet_store=store)
+            self.assertTrue(partition_path(store, 'USC00000002', 1986).exists())
+
+            (self.wx_data / 'USC00000002.txt').write_text('19850101\t  250\t    0\t   20\n')
+            summary = ingest_data_main(self.wx_data, self.yld_data, parquet_store=store)
+
+            self.assertEqual(summary['wx_records_deleted'], 2)
+            self.assertEqual(db.session.query(Weather).filter_by(weather_station_id='USC00000002').count(), 1)
+            for model in (WeatherAnalysis, WeatherMonthlyAnalysis, WeatherSeasonAnalysis, RegionalAnalysis, StationCompleteness):
+                self.assertEqual(db.session.query(model).filter_by(year=1986).count(), 0, model.__tablename__)
+            self.assertEqual(self.analysis('USC00000002').avg_max_temp_celsius, 250)
+            self.assertFalse(partition_path(store, 'USC00000002', 1986).parent.exists())
+            self.assertTrue(partition_path(store, 'USC00000002', 1985).exists())
+
+    def test_failed_chunk_is_retried_next_run(self):
+        (self.wx_data / 'USC00000003.txt').write_text('19850101\tbad\t    0\t   20\n')
+        with self.app.app_context():
+            with self.assertRaises(IngestError) as raised, self.assertLogs('ingest_data', level='ERROR'):
+                ingest_data_main(self.wx_data, self.yld_data, chunk_files=1)
+
+            summary = raised.exception.summary
+            self.assertEqual((summary['chunks_total'], summary['chunks_done']), (4, 3))
+            self.assertEqual(summary['chunks_failed'][0]['files'], ['USC00000003.txt'])
+            self.assertEqual(db.session.query(Weather).count(), 2)
+            self.assertEqual(db.session.query(IngestManifest).count(), 3)
+
+            (self.wx_data / 'USC00000003.txt').write_text('19850101\t  300\t    0\t   20\n')
+            summary = ingest_data_main(self.wx_data, self.yld_data, chunk_files=1)
+
+            self.assertEqual((summary['files_changed'], summary['chunks_done'], summary['chunks_failed']), (1, 1, []))
+            self.assertEqual(db.session.query(Weather).count(), 3)
+
+    def test_chunk_failing_after_its_writes_is_rolled_back(self):
+        (self.wx_data / 'USC00000003.txt').write_text('19850101\t  300\t    0\t   20\n')
+        with self.app.app_context():
+            with mock.patch('ingest_data.push_weather_analysis', side_effect=RuntimeError('analysis failed')), \
+                    self.assertRaises(IngestError), self.assertLogs('ingest_data', level='ERROR'):
+                ingest_data_main(self.wx_data, self.yld_data, chunk_files=1)
+
+            self.assertEqual(db.session.query(Weather).count(), 0)
+            self.assertEqual(db.session.query(WeatherAnalysis).count(), 0)
+            self.assertEqual(db.session.query(IngestManifest).count(), 1)
+            self.assertIsNone(dataset_version(Weather.__tablename__))
+
+            summary = ingest_data_main(self.wx_data, self.yld_data, chunk_files=1)
+            self.assertEqual((summary['files_changed'], summary['chunks_failed']), (3, []))
+            self.assertEqual(db.session.query(WeatherAnalysis).count(), 3)
+
+
+class TestDataQuality(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wx_data = pathlib.Path(self.tmp.name) / 'wx_data'
+        self.wx_data.mkdir()
+        self.yld_data = pathlib.Path(self.tmp.name) / 'yield.txt'
+        self.yld_data.write_text('1985\t225447\n')
+        (self.wx_data / 'USC00000001.txt').write_text(
+            '19850101\t  100\t    0\t   10\n'
+            '19850102\t   50\t  120\t   20\n'
+            '19850103\t  200\t    0\t99999\n'
+            '19850103\t  300\t    0\t   30\n'
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_validate_weather_flags_records(self):
+        wx_df = wx_consolidation_cleanse(scan_wx_file(self.wx_data / 'USC00000001.txt')).collect()
+        valid_df, quarantine_df = validate_weather(wx_df, QualityRules())
+
+        self.assertEqual(quarantine_df['rules'].to_list(), ['min_above_max', 'precipitation_range', 'duplicate_date'])
+        self.assertEqual(quarantine_df['min_temp'][0], 120)
+        self.assertEqual(valid_df.columns, wx_df.columns)
+        self.assertEqual(valid_df['max_temp'].to_list(), [100, None, 200])
+        self.assertEqual(valid_df['precipitation'].to_list(), [10, 20, None])
+
+        rules = QualityRules.from_config('{"limits": {"precipitation": null}, "duplicate_dates": false}')
+        self.assertEqual(validate_weather(wx_df, rules)[1]['rules'].to_list(), ['min_above_max'])
+        with self.assertRaises(ValueError):
+            QualityRules.from_config({'limits': {'snow': [0, 10]}})
+
+    def test_quality_endpoint(self):
+        with self.app.app_context():
+            summary = ingest_data_main(self.wx_data, self.yld_data)
+            self.assertEqual(summary['wx_records_quarantined'], 3)
+            self.assertEqual(db.session.query(Weather).count(), 3)
+            self.assertEqual(db.session.query(WeatherAnalysis).one().avg_max_temp_celsius, 150)
+
+        completeness = self.client.get('/api/weather/quality?station_id=USC00000001').get_json()['station_completeness']
+        self.assertEqual([(record['days_present'], record['days_complete'], record['days_flagged'], record['days_in_year'])
+                          for record in completeness], [(3, 1, 3, 365)])
+        self.assertAlmostEqual(completeness[0]['completeness'], 3 / 365)
+        self.assertEqual(self.client.get('/api/weather/quality?max_completeness=0.001').get_json()['total'], 0)
+
+        quarantine = self.client.get('/api/weather/quality?view=quarantine&rule=duplicate_date').get_json()
+        self.assertEqual([(record['max_temp'], record['rules']) for record in quarantine['weather_quarantine']],
+                         [(300, ['duplicate_date'])])
+        self.assertEqual(self.client.get('/api/weather/quality?view=quarantine&rule=snow').status_code, 400)
+        self.assertEqual(self.client.get('/api/weather/quality?max_completeness=2').status_code, 400)
+
+    def test_full_ingest_corrects_stored_records(self):
+        with self.app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data, quality_rules=QualityRules({}, False, False))
+            self.assertEqual(db.session.query(WeatherQuarantine).count(), 0)
+
+            ingest_data_main(self.wx_data, self.yld_data, full=True)
+
+            record = db.session.query(Weather).filter_by(date=date(1985, 1, 2)).one()
+            self.assertEqual((record.max_temp, record.min_temp, record.precipitation), (None, None, 20))
+            self.assertEqual(db.session.query(WeatherQuarantine).count(), 3)
+            self.assertEqual(db.session.query(StationCompleteness).one().days_flagged, 3)
+
+
+class TestWeatherBatch(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'BATCH_MAX_KEYS': 5})
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            push_raw_data(pl.DataFrame({
+                'date': [date(1990, 1, 1), date(1990, 1, 2), date(1990, 1, 1)],
+                'max_temp': [10, 20, None],
+                'min_temp': [-10, 0, -5],
+                'precipitation': [0, 15, 3],
+                'weather_station_id': ['USC00110072', 'USC00110072', 'USC00111436'],
+            }))
+            db.session.commit()
+
+    def test_records_in_request_order_with_misses(self):
+        keys = [{'station_id': 'USC00111436', 'date': '1990-01-01'}, ['USC00110072', '1990-01-03'],
+                ['USC00110072', '1990-01-02'], ['USC00000000', '1990-01-01'], ['USC00111436', '1990-01-01']]
+        body = self.client.post('/api/weather/batch', json={'keys': keys}).get_json()
+
+        self.assertEqual((body['found'], body['missing']), (3, 2))
+        self.assertEqual([record and record['max_temp'] for record in body['weather']], [None, None, 20, None, None])
+        self.assertEqual([record is None for record in body['weather']], [False, True, False, True, False])
+        expected = self.client.get('/api/weather?station_id=USC00110072&date=1990-01-02').get_json()['weather'][0]
+        self.assertEqual(body['weather'][2], expected)
+        # The temporary table of the keys does not outlive the request.
+        self.assertEqual(self.client.post('/api/weather/batch', json={'keys': keys[:1]}).get_json()['found'], 1)
+
+    def test_invalid_keys(self):
+        for body in [None, {'keys': 'USC00110072'}, {'keys': [['USC00110072']]}, {'keys': [['USC00110072', '1990-13-01']]},
+                     {'keys': [['USC00110072', '19900101']]}, {'keys': [['USC00110072', '1990-W01-1']]},
+                     {'keys': [['USC00110072', 19900101]]}, {'keys': [{'date': '1990-01-01'}]}, {'keys': [['USC00110072', '1990-01-01']] * 6}]:
+            self.assertEqual(self.client.post('/api/weather/batch', json=body).status_code, 400)
+        self.assertEqual(self.client.post('/api/weather/batch', json={'keys': []}).get_json(),
+                         {'weather': [], 'found': 0, 'missing': 0})
+
+
+def ghcnd_station(weather_station_id: str, latitude: float, longitude: float, elevation: float, state: str, name: str) -> str:
+    return f'{weather_station_id:<11} {latitude:8.4f} {longitude:9.4f} {elevation:6.1f} {state:<2} {name:<30}\n'
+
+
+class TestStations(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'STATS_CACHE_BACKEND': 'none'})
+        self.client = self.app.test_client()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wx_data = pathlib.Path(self.tmp.name) / 'wx_data'
+        self.wx_data.mkdir()
+        self.yld_data = pathlib.Path(self.tmp.name) / 'yield.txt'
+        self.yld_data.write_text('1985\t225447\n')
+        self.stations_file = pathlib.Path(self.tmp.name) / 'ghcnd-stations.txt'
+        self.stations_file.write_text(
+            ghcnd_station('USC00000001', 40.1, -88.2, 222.0, 'IL', 'URBANA')
+            + ghcnd_station('USC00000002', 41.9, -87.6, 180.0, 'IL', 'CHICAGO')
+            + ghcnd_station('USC00000003', 41.6, -93.6, -999.9, 'IA', 'DES MOINES')
+            + ghcnd_station('ASN00000004', -33.9, 151.2, 39.0, '', 'SYDNEY')
+        )
+        for number, max_temp in enumerate([100, 200, 300], 1):
+            (self.wx_data / f'USC0000000{number}.txt').write_text(f'19850101\t{max_temp:5d}\t    0\t   10\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_stn_consolidation_parses_fixed_width_lines(self):
+        stn_df = stn_consolidation(self.stations_file)
+
+        self.assertEqual(stn_df['weather_station_id'].to_list(), ['USC00000001', 'USC00000002', 'USC00000003', 'ASN00000004'])
+        self.assertEqual(stn_df['latitude'].to_list(), [40.1, 41.9, 41.6, -33.9])
+        self.assertEqual(stn_df['elevation'].to_list(), [222.0, 180.0, None, 39.0])
+        self.assertEqual(stn_df['state'].to_list(), ['IL', 'IL', 'IA', None])
+        self.assertEqual(stn_df['name'][2], 'DES MOINES')
+
+    def test_kd_tree_matches_brute_force(self):
+        points = [unit_vector((i * 37) % 180 - 90 + (i % 7) / 10, (i * 53) % 360 - 180) for i in range(500)]
+        tree = KDTree(points)
+        for query in [unit_vector(40.1, -88.2), unit_vector(-89.9, 179.9), unit_vector(0, 180)]:
+            expected = sorted((sum((a - b) ** 2 for a, b in zip(point, query)), index) for index, point in enumerate(points))
+            self.assertEqual(tree.nearest(query, 12), expected[:12])
+        self.assertAlmostEqual(chord_to_km(sum((a - b) ** 2 for a, b in zip(unit_vector(0, 0), unit_vector(0, 90)))),
+                               6371.0088 * 3.141592653589793 / 2, places=6)
+
+    def test_nearest_stations(self):
+        with self.app.app_context():
+            summary = ingest_data_main(self.wx_data, self.yld_data, stations_file=self.stations_file)
+            self.assertEqual((summary['stn_records_read'], summary['stn_records_ingested']), (4, 4))
+            self.assertEqual(ingest_data_main(self.wx_data, self.yld_data, stations_file=self.stations_file)['files_changed'], 0)
+
+        stations = self.client.get('/api/stations?state=il').get_json()
+        self.assertEqual([station['name'] for station in stations['stations']], ['URBANA', 'CHICAGO'])
+
+        nearest = self.client.get('/api/stations?near=40.11,-88.24&k=2').get_json()['stations']
+        self.assertEqual([station['weather_station_id'] for station in nearest], ['USC00000001', 'USC00000002'])
+        self.assertLess(nearest[0]['distance_km'], 5)
+        # Stations without readings are never returned.
+        self.assertNotIn('ASN00000004', [station['weather_station_id'] for station in
+                                         self.client.get('/api/stations?near=-33.9,151.2&k=5').get_json()['stations']])
+
+        weather = self.client.get('/api/weather?near=41.5,-93.5&k=1').get_json()
+        self.assertEqual([record['max_temp'] for record in weather['weather']], [300])
+        stats = self.client.get('/api/weather/stats?near=41.5,-88&k=2').get_json()
+        self.assertEqual(sorted(record['weather_station_id'] for record in stats['weather_analysis']), ['USC00000001', 'USC00000002'])
+
+        for query in ['near=91,0', 'near=40', 'near=40,-88&k=0', 'near=40,-88&station_id=USC00000001']:
+            self.assertEqual(self.client.get(f'/api/weather?{query}').status_code, 400)
+        self.assertEqual(self.client.get('/api/stations?near=40,-88&state=IL').status_code, 400)
+
+    def test_near_without_station_metadata(self):
+        self.stations_file.unlink()
+        with self.app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data)
+
+        for endpoint in ['/api/stations', '/api/weather', '/api/weather/stats']:
+            response = self.client.get(f'{endpoint}?near=40,-90')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('stations file', response.get_json()['error'])
+        self.assertEqual(self.client.get('/api/stations').get_json()['total'], 3)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'STATS_CACHE_BACKEND': 'none'})
+        self.client = self.app.test_client()
+
+    def test_metrics_expose_request_phases(self):
+        before = {phase: REQUEST_PHASE_SECONDS.count(endpoint='weather', phase=phase) for phase in ('sql', 'count', 'serialize')}
+        self.assertEqual(self.client.get('/api/weather').status_code, 200)
+        self.assertEqual(self.client.get('/api/weather/stats?period=month').status_code, 200)
+
+        for phase, count in before.items():
+            self.assertEqual(REQUEST_PHASE_SECONDS.count(endpoint='weather', phase=phase), count + 1)
+        response = self.client.get('/metrics')
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        body = response.get_data(as_text=True)
+        self.assertIn('# TYPE weather_api_request_seconds histogram', body)
+        self.assertIn('weather_api_request_phase_seconds_bucket{endpoint="weather_stats",phase="sql",le="+Inf"}', body)
+        self.assertRegex(body, r'weather_api_requests_total\{endpoint="weather",status="200"\} \d')
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test.', ('case',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, case='a')
+
+        self.assertEqual(histogram.samples(), [
+            'test_seconds_bucket{case="a",le="0.1"} 1',
+            'test_seconds_bucket{case="a",le="1"} 2',
+            'test_seconds_bucket{case="a",le="+Inf"} 3',
+            'test_seconds_sum{case="a"} 5.55',
+            'test_seconds_count{case="a"} 3',
+        ])
+        with self.assertRaises(ValueError):
+            histogram.observe(1, other='a')
+
+    def test_slow_queries_are_logged_with_their_plan(self):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'STATS_CACHE_BACKEND': 'none', 'SLOW_QUERY_MS': 1e-9})
+        slow_queries = SLOW_QUERIES.value()
+        with self.assertLogs('metrics', level='WARNING') as logs:
+            app.test_client().get('/api/weather?station_id=USC00000001')
+
+        self.assertGreater(SLOW_QUERIES.value(), slow_queries)
+        self.assertTrue(any('FROM weather' in line and 'SEARCH weather USING' in line for line in logs.output))
+
+    def test_ingest_reports_every_stage(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wx_data = pathlib.Path(tmp) / 'wx_data'
+            wx_data.mkdir()
+            (wx_data / 'USC00000001.txt').write_text('19850101\t  100\t    0\t   10\n19850102\t  200\t    0\t   20\n')
+            yld_data = pathlib.Path(tmp) / 'yield.txt'
+            yld_data.write_text('1985\t225447\n')
+
+            with self.app.app_context():
+                summary = ingest_data_main(wx_data, yld_data)
+
+        self.assertEqual(list(summary['stages']), ['detect_changes', 'parse', 'push_raw_data', 'validate', 'weather_analysis', 'rollups', 'quality'])
+        self.assertEqual(summary['stages']['parse']['rows'], 3)
+        self.assertEqual(summary['stages']['push_raw_data']['rows'], 3)
+        self.assertGreater(summary['stages']['parse']['peak_rss_mib'], 0)
+        self.assertEqual(INGEST_STAGE_ROWS.value(stage='push_raw_data'), 3)
+
+    def test_sampling_profiler_writes_collapsed_stacks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            profiler = SamplingProfiler(0.001, pathlib.Path(tmp) / 'profile.txt')
+            profiler.start()
+            deadline = time.monotonic() + 5
+            while profiler.samples == 0 and time.monotonic() < deadline:
+                sum(range(10_000))
+            profiler.stop()
+
+            lines = profiler.path.read_text().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any('test_sampling_profiler_writes_collapsed_stacks' in line for line in lines))
+        self.assertRegex(lines[0], r' \d+$')
+
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'STATS_CACHE_BACKEND': 'none'})
+        self.client = self.app.test_client()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.wx_data = pathlib.Path(self.tmp.name) / 'wx_data'
+        self.wx_data.mkdir()
+        self.yld_data = pathlib.Path(self.tmp.name) / 'yield.txt'
+        self.yld_data.write_text('1985\t225447\n')
+        (self.wx_data / 'USC00000001.txt').write_text(
+            '19850115\t  100\t    0\t   10\n19850116\t  200\t   20\t   30\n19850601\t  300\t  100\t  200\n')
+        (self.wx_data / 'USC00000002.txt').write_text('19850601\t  100\t   50\t  100\n')
+        with self.app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ingest_materializes_rollups(self):
+        with self.app.app_context():
+            monthly = db.session.query(WeatherMonthlyAnalysis).filter_by(weather_station_id='USC00000001').order_by(WeatherMonthlyAnalysis.month).all()
+            self.assertEqual([(row.month, row.avg_max_temp_celsius, row.accumulated_precipitation_cm) for row in monthly],
+                             [(1, 150, 0), (6, 300, 2)])
+            season = db.session.query(WeatherSeasonAnalysis).filter_by(weather_station_id='USC00000001').one()
+            self.assertEqual((season.avg_max_temp_celsius, season.avg_min_temp_celsius), (300, 100))
+            region = db.session.query(RegionalAnalysis).one()
+            self.assertEqual((region.year, region.station_count, region.avg_max_temp_celsius), (1985, 2, 150))
+
+    def test_appended_tail_updates_only_touched_groups(self):
+        with self.app.app_context():
+            january = db.session.query(WeatherMonthlyAnalysis).filter_by(weather_station_id='USC00000001', month=1).one().created
+            with open(self.wx_data / 'USC00000001.txt', 'a') as file:
+                file.write('19850602\t  500\t  100\t    0\n')
+
+            summary = ingest_data_main(self.wx_data, self.yld_data)
+
+            self.assertEqual(summary['rollup_records_ingested'],
+                             {'weather_monthly_analysis': 1, 'weather_season_analysis': 1, 'regional_analysis': 1})
+            self.assertEqual(db.session.query(WeatherMonthlyAnalysis).filter_by(weather_station_id='USC00000001', month=1).one().created, january)
+            self.assertEqual(db.session.query(WeatherMonthlyAnalysis).filter_by(weather_station_id='USC00000001', month=6).one().avg_max_temp_celsius, 400)
+
+    def test_stats_periods(self):
+        response = self.client.get('/api/weather/stats?period=month&month=6&station_id=USC00000001')
+        self.assertEqual([(row['month'], row['avg_max_temp']) for row in response.get_json()['weather_monthly_analysis']], [(6, 300)])
+
+        response = self.client.get('/api/weather/stats?period=season&group_by=year&agg=mean')
+        self.assertEqual(response.get_json()['groups'][0]['avg_max_temp_mean'], 200)
+
+        response = self.client.get('/api/weather/stats?period=region&cursor=')
+        self.assertEqual(response.get_json()['regional_analysis'][0]['station_count'], 2)
+
+    def test_invalid_parameters(self):
+        for url in ('/api/weather/stats?period=week',
+                    '/api/weather/stats?period=region&station_id=USC00000001',
+                    '/api/weather/stats?month=6',
+                    '/api/weather/stats?period=month&month=13'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
+class TestIngestAPI(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        wx_data = pathlib.Path(self.tmp.name) / 'wx_data'
+        wx_data.mkdir()
+        (wx_data / 'USC00000001.txt').write_text('19850101\t  100\t    0\t   10\n')
+        yld_data = pathlib.Path(self.tmp.name) / 'yield.txt'
+        yld_data.write_text('1985\t225447\n')
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.tmp.name}/database.db',
+            'INGEST_API_ENABLED': True,
+            'WX_DATA': wx_data,
+            'YLD_DATA': yld_data,
+        })
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ingest_job_runs_in_background(self):
+        response = self.client.post('/api/ingest', json={'batch_size': 10})
+        self.assertEqual(response.status_code, 202)
+        job_url = response.headers['Location']
+
+        for _ in range(100):
+            job = self.client.get(job_url).get_json()
+            if job['status'] in ('succeeded', 'failed'):
+                break
+            time.sleep(.05)
+
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress']['wx_records_ingested'], 1)
+        self.assertEqual(self.client.get('/api/weather').get_json()['total'], 1)
+
+    def test_ingest_rejects_invalid_batch_size(self):
+        self.assertEqual(self.client.post('/api/ingest', json={'batch_size': 0}).status_code, 400)
+        self.assertEqual(self.client.post('/api/ingest', json={'chunk_files': 0}).status_code, 400)
+
+    def test_only_recent_jobs_are_kept(self):
+        runner = IngestJobRunner(self.app, max_jobs=2)
+        jobs = []
+        for _ in range(3):
+            jobs.append(runner.submit({'dry_run': True}))
+            for _ in range(100):
+                if jobs[-1].status in ('succeeded', 'failed'):
+                    break
+                time.sleep(.05)
+
+        self.assertEqual([runner.get(job.job_id) for job in jobs], [None, jobs[1], jobs[2]])
+
+    def test_unknown_ingest_job(self):
+        self.assertEqual(self.client.get('/api/ingest/unknown').status_code, 404)
+
+    def test_ingest_api_disabled_by_default(self):
+        client = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}).test_client()
+        self.assertEqual(client.post('/api/ingest').status_code, 404)
+
+
+class TestCursorPagination(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        wx_df = pl.DataFrame({
+            'date': [date(1990, 1, day) for day in range(1, 6)] * 2,
+            'max_temp': list(range(10)),
+            'min_temp': list(range(10)),
+            'precipitation': list(range(10)),
+            'weather_station_id': ['USC00110072'] * 5 + ['USC00111436'] * 5,
+        })
+        with self.app.app_context():
+            push_raw_data(wx_df)
+            db.session.commit()
+
+    def test_weather_cursor_walks_all_rows_once(self):
+        seen = []
+        response = self.client.get('/api/weather?cursor=&per_page=3').get_json()
+        while True:
+            seen.extend((row['weather_station_id'], row['date']) for row in response['weather'])
+            if response['next_cursor'] is None:
+                break
+            response = self.client.get(f"/api/weather?per_page=3&cursor={response['next_cursor']}").get_json()
+
+        self.assertEqual(len(seen), 10)
+        self.assertEqual(len(set(seen)), 10)
+
+    def test_weather_cursor_count_modes(self):
+        self.assertIsNone(self.client.get('/api/weather?cursor=').get_json()['total'])
+        self.assertEqual(self.client.get('/api/weather?cursor=&count=exact').get_json()['total'], 10)
+        self.assertEqual(self.client.get('/api/weather?cursor=&count=cached&station_id=USC00111436').get_json()['total'], 5)
+
+    def test_weather_invalid_cursor(self):
+        response = self.client.get('/api/weather?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+
+    def test_count_cache_is_bounded(self):
+        cache = CountCache(ttl=300, maxsize=2)
+        with mock.patch('pagination.count_rows', side_effect=[1, 2, 3, 4]) as count_rows:
+            self.assertEqual([cache.get(key, None) for key in ('a', 'b', 'a', 'c', 'b')], [1, 2, 1, 3, 4])
+        self.assertEqual(count_rows.call_count, 4)
+
+        cache = CountCache(ttl=0)
+        with mock.patch('pagination.count_rows', side_effect=[1, 2]):
+            self.assertEqual([cache.get('a', None), cache.get('a', None)], [1, 2])
+
+    def test_weather_stats_cursor(self):
+        wx_df = pl.DataFrame({
+            'date': [date(1990, 1, 1), date(1991, 1, 1)],
+            'max_temp': [1, 2],
+            'min_temp': [1, 2],
+            'precipitation': [1, 2],
+            'weather_station_id': ['USC00110072', 'USC00110072'],
+        })
+        with self.app.app_context():
+            push_weather_analysis(weather_analysis(wx_df))
+            db.session.commit()
+        response = self.client.get('/api/weather/stats?cursor=&per_page=1').get_json()
+        self.assertEqual(response['weather_analysis'][0]['year'], 1990)
+        response = self.client.get(f"/api/weather/stats?cursor={response['next_cursor']}&per_page=1").get_json()
+        self.assertEqual(response['weather_analysis'][0]['year'], 1991)
+        self.assertIsNone(response['next_cursor'])
+
+
+class TestServingMode(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{pathlib.Path(self.tmp.name) / "database.db"}',
+                               'DB_READ_ONLY': True, 'DB_POOL_SIZE': 4})
+        with self.app.app_context():
+            push_raw_data(pl.DataFrame({
+                'date': [date(1990, 1, 1)],
+                'max_temp': [10],
+                'min_temp': [0],
+                'precipitation': [5],
+                'weather_station_id': ['USC00110072'],
+            }))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        self.tmp.cleanup()
+
+    def test_get_requests_use_read_only_pool(self):
+        response = self.app.test_client().get('/api/weather?station_id=USC00110072')
+        self.assertEqual(response.get_json()['total'], 1)
+
+        with self.app.test_request_context('/api/weather'):
+            engine = db.engines[READ_ONLY_BIND]
+            self.assertIs(db.session.get_bind(), engine)
+            self.assertEqual(engine.pool.size(), 4)
+            with self.assertRaises(OperationalError):
+                db.session.execute(text("DELETE FROM weather"))
+            db.session.rollback()
+
+    def test_other_requests_use_default_engine(self):
+        with self.app.test_request_context('/api/ingest', method='POST'):
+            self.assertIs(db.session.get_bind(), db.engine)
+
+    def test_in_memory_database_keeps_single_connection(self):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'DB_READ_ONLY': True})
+        with app.app_context():
+            self.assertNotIn(READ_ONLY_BIND, db.engines)
+            self.assertEqual(app.config['SQLALCHEMY_ENGINE_OPTIONS'], {})
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def scan_iter(self, match):
+        return [key for key in self.values if key.startswith(match.rstrip('*'))]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+class TestStatsCache(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        wx_df = pl.DataFrame({
+            'date': [date(1990, 1, 1)],
+            'max_temp': [10],
+            'min_temp': [0],
+            'precipitation': [5],
+            'weather_station_id': ['USC00110072'],
+        })
+        with self.app.app_context():
+            push_weather_analysis(weather_analysis(wx_df))
+            db.session.commit()
+
+    def test_stats_served_from_cache_until_ingest(self):
+        url = '/api/weather/stats?station_id=USC00110072'
+        self.assertEqual(self.client.get(url).get_json()['weather_analysis'][0]['avg_max_temp'], 10)
+
+        with self.app.app_context():
+            db.session.query(WeatherAnalysis).update({'avg_max_temp_celsius': 20})
+            db.session.commit()
+        self.assertEqual(self.client.get(url).get_json()['weather_analysis'][0]['avg_max_temp'], 10)
+
+        with self.app.app_context():
+            bump_dataset_version(WeatherAnalysis.__tablename__)
+            db.session.commit()
+        self.assertEqual(self.client.get(url).get_json()['weather_analysis'][0]['avg_max_temp'], 20)
+
+    def test_stats_conditional_request(self):
+        response = self.client.get('/api/weather/stats')
+        self.assertIsNotNone(response.headers.get('ETag'))
+        self.assertIsNotNone(response.headers.get('Last-Modified'))
+
+        response = self.client.get('/api/weather/stats', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b'')
+
+        self.assertEqual(self.client.get('/api/weather/stats?year=1990', headers={'If-None-Match': '"stale"'}).status_code, 200)
+
+    def test_stats_key_normalizes_argument_order(self):
+        self.assertEqual(ResponseCache.key('stats', 1, {'year': '1990', 'page': '1'}),
+                         ResponseCache.key('stats', 1, {'page': '1', 'year': '1990'}))
+        self.assertNotEqual(ResponseCache.key('stats', 1, {'year': '1990'}),
+                            ResponseCache.key('stats', 2, {'year': '1990'}))
+        self.assertNotEqual(ResponseCache.key('stats', 1, {'station_id': ['USC00110072', 'USC00110187']}),
+                            ResponseCache.key('stats', 1, {'station_id': ['USC00110072', 'USC00111280']}))
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        backend = MemoryBackend(maxsize=2)
+        backend.set('a', b'1')
+        backend.set('b', b'2')
+        backend.get('a')
+        backend.set('c', b'3')
+        self.assertEqual((backend.get('a'), backend.get('b'), backend.get('c')), (b'1', None, b'3'))
+
+    def test_redis_backend(self):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'STATS_CACHE_BACKEND': 'none'})
+        fake = FakeRedis()
+        app.extensions['stats_cache'].backend = RedisBackend(fake)
+        client = app.test_client()
+
+        client.get('/api/weather/stats')
+        self.assertEqual(len(fake.values), 1)
+        app.extensions['stats_cache'].clear()
+        self.assertEqual(fake.values, {})
+
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.weather = Weather('USC00110072', date(1990, 1, 1), 10, None, 5, datetime(2024, 6, 7, 12, 30, 1, 25))
+        self.weather.weather_id = 7
+        self.row = (7, 'USC00110072', date(1990, 1, 1), 10, None, 5, datetime(2024, 6, 7, 12, 30, 1, 25))
+
+    def test_rows_match_model_serialize(self):
+        with self.app.app_context():
+            expected = jsonify({'weather': [self.weather.serialize()], 'total': 1}).get_data()
+            body = {'weather': serialization.rows_to_dicts([self.row], serialization.WEATHER_FIELDS), 'total': 1}
+
+            self.assertEqual(serialization.dumps(body), expected)
+            with mock.patch.object(serialization, 'orjson', None):
+                self.assertEqual(serialization.dumps(body), expected)
+
+    def test_weather_endpoint_output(self):
+        with self.app.app_context():
+            push_raw_data(pl.DataFrame({
+                'date': [date(1990, 1, 1)],
+                'max_temp': [10],
+                'min_temp': [None],
+                'precipitation': [5],
+                'weather_station_id': ['USC00110072'],
+            }, schema_overrides={'min_temp': pl.Int32}))
+            db.session.commit()
+            expected = jsonify({
+                'weather': [row.serialize() for row in Weather.query.all()],
+                'page': 1,
+                'per_page': 10,
+                'total': 1,
+                'pages': 1
+            }).get_data()
+
+        self.assertEqual(self.app.test_client().get('/api/weather').get_data(), expected)
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            push_raw_data(pl.DataFrame({
+                'date': [date(1990, 1, 1), date(1990, 1, 2), date(1990, 1, 3), date(1990, 1, 1)],
+                'max_temp': [10, 20, 30, 40],
+                'min_temp': [None, 2, 3, 4],
+                'precipitation': [5, 6, 7, 8],
+                'weather_station_id': ['USC00110072', 'USC00110072', 'USC00110072', 'USC00110187'],
+            }, schema_overrides={'min_temp': pl.Int32}))
+            db.session.commit()
+
+    def test_ndjson_matches_weather_endpoint(self):
+        response = self.client.get('/api/weather/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+
+        lines = response.get_data().splitlines()
+        expected = self.client.get('/api/weather?per_page=100').get_json()['weather']
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+    def test_csv_with_date_range(self):
+        response = self.client.get('/api/weather/export?format=csv&start_date=1990-01-02&end_date=1990-01-03')
+        self.assertEqual(response.status_code, 200)
+
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0], 'weather_id,weather_station_id,date,max_temp,min_temp,precipitation,created')
+        self.assertEqual([line.split(',')[2:4] for line in lines[1:]], [['1990-01-02', '20'], ['1990-01-03', '30']])
+
+    def test_columnar_formats(self):
+        for file_format, read in (('parquet', pl.read_parquet), ('arrow', pl.read_ipc)):
+            response = self.client.get(f'/api/weather/export?format={file_format}&station_id=USC00110072')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(f'weather.{file_format}', response.headers['Content-Disposition'])
+
+            df = read(io.BytesIO(response.get_data()))
+            self.assertEqual(df.columns, [name for name, _, _ in serialization.WEATHER_FIELDS])
+            self.assertEqual(df['date'].to_list(), [date(1990, 1, 1), date(1990, 1, 2), date(1990, 1, 3)])
+            self.assertEqual(df['min_temp'].to_list(), [None, 2, 3])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/weather/export?format=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/weather/export?start_date=1990-13-01').status_code, 400)
+        self.assertEqual(self.client.get('/api/weather/export?start_date=1990-01-03&end_date=1990-01-01').status_code, 400)
+
+
+class TestAggregation(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            push_raw_data(pl.DataFrame({
+                'date': [date(1990, 1, 1), date(1990, 1, 2), date(1990, 2, 1), date(1990, 1, 1), date(1991, 1, 1)],
+                'max_temp': [10, 20, 30, 40, 50],
+                'min_temp': [None, 2, 3, 4, 5],
+                'precipitation': [5, 6, 7, 8, 9],
+                'weather_station_id': ['USC00110072', 'USC00110072', 'USC00110072', 'USC00110187', 'USC00111280'],
+            }, schema_overrides={'min_temp': pl.Int32}))
+            push_weather_analysis(pl.DataFrame({
+                'weather_station_id': ['USC00110072', 'USC00110187', 'USC00110072'],
+                'year': [1990, 1990, 1991],
+                'avg_max_temp_celsius': [10, 20, 30],
+                'avg_min_temp_celsius': [1, 2, 3],
+                'accumulated_precipitation_cm': [4, 5, 6],
+            }))
+            db.session.commit()
+
+    def test_station_list_and_date_range(self):
+        response = self.client.get('/api/weather?station_id=USC00110072,USC00111280&start_date=1990-01-02&end_date=1991-12-31')
+        rows = response.get_json()['weather']
+        self.assertEqual([(row['weather_station_id'], row['max_temp']) for row in rows],
+                         [('USC00110072', 20), ('USC00110072', 30), ('USC00111280', 50)])
+
+        response = self.client.get('/api/weather/stats?station_id=USC00110072&station_id=USC00110187&start_year=1990&end_year=1990')
+        self.assertEqual(response.get_json()['total'], 2)
+
+    def test_repeated_station_ids_have_their_own_cache_and_count_keys(self):
+        stats = [self.client.get(f'/api/weather/stats?station_id=USC00110072&station_id={other}').get_json()
+                 for other in ('USC00110187', 'USC00111280')]
+        self.assertEqual([record['weather_station_id'] for record in stats[1]['weather_analysis']], ['USC00110072', 'USC00110072'])
+        self.assertNotEqual(stats[0], stats[1])
+
+        for other, groups in [('USC00110187', 3), ('USC00111280', 4)]:
+            body = self.client.get(f'/api/weather?group_by=day&station_id=USC00110072&station_id={other}').get_json()
+            self.assertEqual((len(body['groups']), body['total']), (groups, groups))
+
+    def test_month_by_station_rollup(self):
+        response = self.client.get('/api/weather?group_by=station,month&agg=mean,sum')
+        self.assertEqual(response.status_code, 200)
+
+        body = response.get_json()
+        self.assertEqual(body['total'], 4)
+        self.assertEqual(body['groups'][0], {
+            'weather_station_id': 'USC00110072', 'year': 1990, 'month': 1, 'count': 2,
+            'max_temp_mean': 15, 'max_temp_sum': 30,
+            'min_temp_mean': 2, 'min_temp_sum': 2,
+            'precipitation_mean': 5.5, 'precipitation_sum': 11,
+        })
+        self.assertEqual([(group['weather_station_id'], group['month']) for group in body['groups'][1:]],
+                         [('USC00110072', 2), ('USC00110187', 1), ('USC00111280', 1)])
+
+    def test_stats_rollup(self):
+        response = self.client.get('/api/weather/stats?group_by=year&agg=max')
+        self.assertEqual(response.get_json()['groups'], [
+            {'year': 1990, 'count': 2, 'avg_max_temp_max': 20, 'avg_min_temp_max': 2, 'accumulated_precipitation_max': 5},
+            {'year': 1991, 'count': 1, 'avg_max_temp_max': 30, 'avg_min_temp_max': 3, 'accumulated_precipitation_max': 6},
+        ])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/weather?group_by=week').status_code, 400)
+        self.assertEqual(self.client.get('/api/weather?group_by=year&agg=median').status_code, 400)
+        self.assertEqual(self.client.get('/api/weather?group_by=year&cursor=').status_code, 400)
+        self.assertEqual(self.client.get('/api/weather?date=1990-02-30').status_code, 400)
+        self.assertEqual(self.client.get('/api/weather/stats?start_year=1991&end_year=1990').status_code, 400)
+
+    def test_range_query_uses_index(self):
+        plans = explain_requests(self.app, {
+            'range': '/api/weather?station_id=USC00110072,USC00110187&start_date=1990-01-01&end_date=1990-12-31'
+        })['range']
+
+        weather_plans = [plan for statement in plans for plan in statement['plan'] if 'weather ' in plan]
+        self.assertTrue(weather_plans)
+        for plan in weather_plans:
+            self.assertIn('station_id=? AND date>? AND date<?', plan)
+
+
+class TestYieldCorrelation(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'STATS_CACHE_BACKEND': 'none'})
+        self.client = self.app.test_client()
+        self.max_temps = {'USC00110072': [10, 30, 20, 40], 'USC00110187': [20, 20, 50, 30]}
+        self.yields = [100, 300, 250, 380]
+        with self.app.app_context():
+            push_weather_analysis(pl.DataFrame({
+                'weather_station_id': [station for station in self.max_temps for _ in range(4)],
+                'year': [1990, 1991, 1992, 1993] * 2,
+                'avg_max_temp_celsius': [value for values in self.max_temps.values() for value in values],
+                'avg_min_temp_celsius': [1] * 8,
+                'accumulated_precipitation_cm': [5, 6, 7, 8] * 2,
+            }))
+            push_raw_data(yld_df=pl.DataFrame({'year': [1990, 1991, 1992, 1993], 'yield_amount': self.yields}))
+            db.session.commit()
+
+    def correlation(self, url, **keys):
+        rows = self.client.get(url).get_json()['correlations']
+        return next(row for row in rows if all(row[name] == value for name, value in keys.items()))
+
+    def test_matches_reference_statistics(self):
+        max_temps = self.max_temps['USC00110072']
+        row = self.correlation('/api/yield/correlation?group_by=station&period=year&per_page=100',
+                               weather_station_id='USC00110072', variable='avg_max_temp')
+        slope, intercept = statistics.linear_regression(max_temps, self.yields)
+
+        self.assertEqual(row['n'], 4)
+        self.assertAlmostEqual(row['pearson'], statistics.correlation(max_temps, self.yields))
+        # Temperatures and yields rank the years in the same order.
+        self.assertAlmostEqual(row['spearman'], 1.0)
+        self.assertAlmostEqual(row['slope'], slope)
+        self.assertAlmostEqual(row['intercept'], intercept)
+
+    def test_stations_are_averaged_without_group_by(self):
+        means = [(a + b) / 2 for a, b in zip(*self.max_temps.values())]
+        row = self.correlation('/api/yield/correlation?period=year', variable='avg_max_temp')
+        self.assertAlmostEqual(row['pearson'], statistics.correlation(means, self.yields))
+
+    def test_constant_variable_has_null_statistics(self):
+        row = self.correlation('/api/yield/correlation?period=year', variable='avg_min_temp')
+        self.assertEqual((row['n'], row['pearson'], row['slope']), (4, None, None))
+
+    def test_invalid_parameters(self):
+        for url in ('/api/yield/correlation?period=month', '/api/yield/correlation?group_by=year'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
+class TestColumnarStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        self.store = root / 'parquet'
+        self.wx_data = root / 'wx_data'
+        self.wx_data.mkdir()
+        self.yld_data = root / 'yield.txt'
+        self.yld_data.write_text('1985\t225447\n')
+        (self.wx_data / 'USC00000001.txt').write_text(
+            '19851231\t  100\t    0\t   10\n19860101\t  120\t-9999\t   20\n19860102\t  140\t   10\t   30\n')
+        (self.wx_data / 'USC00000002.txt').write_text('19860101\t  200\t   20\t-9999\n')
+
+        uri = f'sqlite:///{root / "database.db"}'
+        self.sqlite_app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'STATS_CACHE_BACKEND': 'none'})
+        self.parquet_app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'STATS_CACHE_BACKEND': 'none',
+                                       'WEATHER_BACKEND': 'parquet', 'PARQUET_STORE': str(self.store)})
+        with self.sqlite_app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data, parquet_store=self.store)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ingest_writes_partitions(self):
+        self.assertTrue(partition_path(self.store, 'USC00000001', 1985).exists())
+        self.assertTrue(partition_path(self.store, 'USC00000001', 1986).exists())
+        self.assertTrue(partition_path(self.store, 'USC00000002', 1986).exists())
+
+        df = scan_weather(self.store, [('weather_station_id', '==', 'USC00000001'), ('date', '>=', date(1986, 1, 2))]).collect()
+        self.assertEqual(df.select('date', 'max_temp', 'year').rows(), [(date(1986, 1, 2), 140, 1986)])
+
+    def test_appended_tail_rewrites_its_partition(self):
+        with open(self.wx_data / 'USC00000002.txt', 'a') as file:
+            file.write('19860102\t  300\t   30\t   40\n')
+        untouched = partition_path(self.store, 'USC00000001', 1986).stat().st_mtime_ns
+
+        with self.sqlite_app.app_context():
+            summary = ingest_data_main(self.wx_data, self.yld_data, parquet_store=self.store)
+
+        self.assertEqual(summary['parquet_partitions_written'], 1)
+        self.assertEqual(partition_path(self.store, 'USC00000001', 1986).stat().st_mtime_ns, untouched)
+        df = pl.read_parquet(partition_path(self.store, 'USC00000002', 1986))
+        self.assertEqual(df['max_temp'].to_list(), [200, 300])
+
+    def test_backends_return_identical_responses(self):
+        sqlite_client, parquet_client = self.sqlite_app.test_client(), self.parquet_app.test_client()
+        for url in ('/api/weather?group_by=station,month',
+                    '/api/weather?group_by=year&agg=sum,min',
+                    '/api/weather?group_by=day&station_id=USC00000001,USC00000002&start_date=1986-01-01',
+                    '/api/weather/stats',
+                    '/api/weather/stats?station_id=USC00000001',
+                    '/api/weather/stats?group_by=year',
+                    '/api/weather/stats?cursor=&per_page=1&count=exact',
+                    '/api/weather/stats?period=month&year=1986',
+                    '/api/weather/stats?period=season&station_id=USC00000001',
+                    '/api/weather/stats?period=region&group_by=year'):
+            self.assertEqual(sqlite_client.get(url).get_data(), parquet_client.get(url).get_data(), url)
+
+        cursor = sqlite_client.get('/api/weather/stats?cursor=&per_page=1').get_json()['next_cursor']
+        url = f'/api/weather/stats?cursor={cursor}&per_page=1'
+        self.assertEqual(sqlite_client.get(url).get_data(), parquet_client.get(url).get_data())
+
+    def test_stats_requested_before_snapshots_are_replaced_are_not_cached(self):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': self.sqlite_app.config['SQLALCHEMY_DATABASE_URI'],
+                          'WEATHER_BACKEND': 'parquet', 'PARQUET_STORE': str(self.store)})
+        client = app.test_client()
+        url = '/api/weather/stats?station_id=USC00000002'
+        self.assertEqual(client.get(url).get_json()['weather_analysis'][0]['avg_max_temp'], 200)
+
+        with open(self.wx_data / 'USC00000002.txt', 'a') as file:
+            file.write('19860102\t  300\t   30\t   40\n')
+        gap_bodies = []
+
+        def write_analysis(store, model):
+            # The chunk has committed; the snapshot is still the one of the previous ingest.
+            if not gap_bodies:
+                gap_bodies.append(client.get(url).get_json())
+            return columnar.write_analysis(store, model)
+
+        with self.sqlite_app.app_context(), mock.patch('ingest_data.write_analysis', side_effect=write_analysis):
+            ingest_data_main(self.wx_data, self.yld_data, parquet_store=self.store)
+
+        self.assertEqual(gap_bodies[0]['weather_analysis'][0]['avg_max_temp'], 200)
+        self.assertEqual(client.get(url).get_json()['weather_analysis'][0]['avg_max_temp'], 250)
+
+
+class TestStationIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        self.index_path = root / 'station_index.bin'
+        self.wx_data = root / 'wx_data'
+        self.wx_data.mkdir()
+        self.yld_data = root / 'yield.txt'
+        self.yld_data.write_text('1985\t225447\n')
+        (self.wx_data / 'USC00000001.txt').write_text(
+            '19851231\t  100\t    0\t   10\n19860101\t  120\t-9999\t   20\n19860102\t  140\t   10\t   30\n')
+        (self.wx_data / 'USC00000002.txt').write_text('19860101\t  200\t   20\t-9999\n')
+
+        uri = f'sqlite:///{root / "database.db"}'
+        self.sqlite_app = create_app({'SQLALCHEMY_DATABASE_URI': uri})
+        with self.sqlite_app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data)
+        self.index_app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'STATION_INDEX_ENABLED': True,
+                                     'STATION_INDEX_PATH': str(self.index_path), 'STATION_INDEX_CHECK_SECONDS': 60})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_startup_builds_index(self):
+        index = StationIndex(self.index_path)
+        self.assertEqual(index.stations, {'USC00000001': (0, 3), 'USC00000002': (3, 4)})
+        self.assertEqual(index.search('USC00000001', date(1986, 1, 1)), range(1, 3))
+        self.assertEqual(index.search('USC00000001', date(1986, 1, 3)), range(3, 3))
+        self.assertEqual(index.search('USC00000003'), range(0, 0))
+        self.assertEqual(index.rows(range(1, 2), 'USC00000001')[0][2:6], (date(1986, 1, 1), 120, None, 20))
+
+    def test_lookups_match_sqlite_without_queries(self):
+        sqlite_client, index_client = self.sqlite_app.test_client(), self.index_app.test_client()
+        statements = []
+        with self.index_app.app_context():
+            engine = db.engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            for url in ('/api/weather?station_id=USC00000001',
+                        '/api/weather?station_id=USC00000001&date=1986-01-01',
+                        '/api/weather?station_id=USC00000001&start_date=1986-01-01&per_page=1&page=2',
+                        '/api/weather?station_id=USC00000002&end_date=1985-12-31',
+                        '/api/weather?station_id=USC00000003'):
+                self.assertEqual(index_client.get(url).get_data(), sqlite_client.get(url).get_data(), url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+        self.assertEqual(statements, [])
+
+    def test_ingest_reloads_index(self):
+        client = self.index_app.test_client()
+        self.assertEqual(client.get('/api/weather?station_id=USC00000002').get_json()['total'], 1)
+
+        with open(self.wx_data / 'USC00000002.txt', 'a') as file:
+            file.write('19860102\t  300\t   30\t   40\n')
+        with self.index_app.app_context():
+            summary = ingest_data_main(self.wx_data, self.yld_data, station_index=self.index_path)
+
+        self.assertEqual(summary['station_index_records'], 5)
+        body = client.get('/api/weather?station_id=USC00000002&date=1986-01-02').get_json()
+        self.assertEqual([row['max_temp'] for row in body['weather']], [300])
+
+    def test_ingest_removes_index_before_committing(self):
+        client = self.index_app.test_client()
+        self.assertEqual(client.get('/api/weather?station_id=USC00000002').get_json()['total'], 1)
+        with open(self.wx_data / 'USC00000002.txt', 'a') as file:
+            file.write('19860102\t  300\t   30\t   40\n')
+        bodies = []
+
+        def progress(stage: str, summary: dict):
+            # The chunk has committed and the index is not rebuilt yet.
+            if stage == 'station_index':
+                bodies.append(client.get('/api/weather?station_id=USC00000002').get_json())
+
+        with self.index_app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data, station_index=self.index_path, progress=progress)
+
+        self.assertEqual([row['max_temp'] for row in bodies[0]['weather']], [200, 300])
+
+    def test_startup_reuses_current_index(self):
+        with self.index_app.app_context():
+            self.assertIsNone(ensure_station_index(self.index_path))
+            threads = [threading.Thread(target=self.build_index) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(StationIndex(self.index_path).stations, {'USC00000001': (0, 3), 'USC00000002': (3, 4)})
+        self.assertEqual(sorted(path.name for path in self.index_path.parent.glob('.station_index.bin*')),
+                         ['.station_index.bin.lock'])
+
+    def build_index(self):
+        with self.index_app.app_context():
+            build_station_index(self.index_path)
+
+    def test_stale_index_falls_back_to_sqlite(self):
+        client = self.index_app.test_client()
+        with open(self.wx_data / 'USC00000002.txt', 'a') as file:
+            file.write('19860102\t  300\t   30\t   40\n')
+        with self.sqlite_app.app_context():
+            ingest_data_main(self.wx_data, self.yld_data)
+
+        self.index_app.extensions['station_index'].check_interval = 0
+        with self.assertLogs('station_index', level='WARNING'):
+            body = client.get('/api/weather?station_id=USC00000002').get_json()
+        self.assertEqual([row['max_temp'] for row in body['weather']], [200, 300])
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_scale_wx_data_repeats_stations(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source, target = pathlib.Path(tmp) / 'source', pathlib.Path(tmp) / 'target'
+            source.mkdir()
+            (source / 'USC00000001.txt').write_text('19850101\t  100\t    0\t   10\n')
+
+            self.assertEqual(scale_wx_data(source, target, 3), 3)
+            self.assertEqual(sorted(file.name for file in target.iterdir()),
+                             ['USC00000001.txt', 'USC00000001S001.txt', 'USC00000001S002.txt'])
+            self.assertEqual(scan_wx_data(target).collect().height, 3)
+
+    def test_endpoint_matrix_cases_succeed(self):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'STATS_CACHE_BACKEND': 'none'})
+        client = app.test_client()
+        for name, url in endpoint_matrix((10,)).items():
+            self.assertEqual(client.get(url).status_code, 200, name)
+
+    def test_compare_results_reports_slower_timings(self):
+        baseline = {'scales': {'x1': {'endpoints': {'stats': {'median_ms': 10.0, 'max_ms': 10.0}}, 'rows': 5}}}
+        current = {'scales': {'x1': {'endpoints': {'stats': {'median_ms': 13.0, 'max_ms': 50.0}}, 'rows': 50}}}
+
+        self.assertEqual(compare_results(baseline, current, 0.2), [
+            {'path': 'scales.x1.endpoints.stats.median_ms', 'baseline': 10.0, 'current': 13.0, 'change': 0.3}
+        ])
+        self.assertEqual(compare_results(baseline, current, 0.5), [])
+
+
+class TestSyntheticData(unittest.TestCase):
+    def test_files_are_deterministic_and_in_source_format(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = pathlib.Path(tmp) / 'first', pathlib.Path(tmp) / 'second'
+            self.assertEqual(generate_wx_data(first, 3, 2, seed=7), 3 * 730)
+            generate_wx_data(second, 3, 2, seed=7, station_batch=1)
+
+            self.assertEqual(sorted(file.name for file in first.iterdir()), [f'{station}.txt' for station in station_ids(3)])
+            for file in first.iterdir():
+                self.assertEqual(file.read_bytes(), (second / file.name).read_bytes())
+            self.assertRegex((first / 'USC90000000.txt').read_text().splitlines()[0], r'^19850101(\t[ -]{0,4}\d{1,5}){3}$')
+
+            df = scan_wx_data(first).collect()
+            self.assertEqual(df.height, 3 * 730)
+            self.assertGreater(df['max_temp'].null_count(), 0)
+            self.assertTrue((df['min_temp'] <= df['max_temp']).drop_nulls().all())
+            summer, winter = [df.filter(pl.col('date').dt.month() == month)['max_temp'].mean() for month in (7, 1)]
+            self.assertGreater(summer, winter + 150)
+
+            generate_wx_data(second, 3, 2, seed=8)
+            self.assertNotEqual((first / 'USC90000000.txt').read_bytes(), (second / 'USC90000000.txt').read_bytes())
+
+    def test_yield_file_covers_every_year(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            file = pathlib.Path(tmp) / 'yld_data' / 'yield.txt'
+            self.assertEqual(generate_yld_data(file, 30, seed=1), 30)
+
+            df = yld_consolidation(str(file))
+            self.assertEqual(df['year'].to_list(), list(range(1985, 2015)))
+            self.assertTrue((df['yield_amount'] > 0).all())
+
+
+class TestMigration(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+
+    def test_migrate_indexes_is_noop_on_current_schema(self):
+        with self.app.app_context():
+            self.assertEqual(migrate_indexes(), {'weather': [], 'yield_data': [], 'weather_analysis': []})
+
+    def test_migrate_indexes_deduplicates_legacy_table(self):
+        with self.app.app_context():
+            db.session.execute(text('DROP TABLE weather'))
+            db.session.execute(text(
+                'CREATE TABLE weather (weather_id INTEGER PRIMARY KEY, weather_station_id VARCHAR(80), '
+                'date DATE NOT NULL, max_temp INTEGER, min_temp INTEGER, precipitation INTEGER, created DATETIME)'
+            ))
+            db.session.execute(text(
+                "INSERT INTO weather (weather_station_id, date, max_temp) VALUES "
+                "('USC00110072', '1990-01-01', 1), ('USC00110072', '1990-01-01', 2), ('USC00110072', '1990-01-02', 3)"
+            ))
+
+            created = migrate_indexes()
+
+            self.assertEqual(sorted(created['weather']), ['ix_weather_date_station', 'uq_weather_station_date'])
+            self.assertEqual(db.session.execute(text('SELECT max_temp FROM weather ORDER BY date')).scalars().all(), [1, 3])
+            index_names = [index['name'] for index in inspect(db.engine).get_indexes('weather')]
+            self.assertIn('uq_weather_station_date', index_names)
+
+    def test_legacy_table_converts_to_compact_layout(self):
+        with self.app.app_context():
+            db.session.execute(text('DROP TABLE weather'))
+            db.session.execute(text(
+                'CREATE TABLE weather (weather_id INTEGER PRIMARY KEY, weather_station_id VARCHAR(80), '
+                'date DATE NOT NULL, max_temp INTEGER, min_temp INTEGER, precipitation INTEGER, created DATETIME)'
+            ))
+            db.session.execute(text(
+                "INSERT INTO weather VALUES (7, 'USC00111436', '1990-01-02', -5, -20, 0, '2024-05-01 10:00:00.250000'), "
+                "(9, 'USC00110072', '1990-01-01', 10, NULL, 3, '2024-05-01 10:00:00')"
+            ))
+
+            migrate_indexes()
+
+            self.assertEqual(weather_layout(), 'rowid')
+            self.assertEqual(db.session.scalars(select(Station.weather_station_id).order_by(Station.station_id)).all(),
+                             ['USC00110072', 'USC00111436'])
+            records = [record.serialize() for record in db.session.scalars(select(Weather).order_by(Weather.weather_id))]
+            self.assertEqual(records, [
+                {'weather_id': 7, 'weather_station_id': 'USC00111436', 'date': date(1990, 1, 2), 'max_temp': -5,
+                 'min_temp': -20, 'precipitation': 0, 'created': '2024-05-01T10:00:00.250000'},
+                {'weather_id': 9, 'weather_station_id': 'USC00110072', 'date': date(1990, 1, 1), 'max_temp': 10,
+                 'min_temp': None, 'precipitation': 3, 'created': '2024-05-01T10:00:00'},
+            ])
+
+    def test_without_rowid_rebuild_keeps_records(self):
+        wx_df = pl.DataFrame({
+            'date': [date(1990, 1, 2), date(1990, 1, 1), date(1990, 1, 1)],
+            'max_temp': [1, 2, 3],
+            'min_temp': [0, 0, 0],
+            'precipitation': [0, 5, 0],
+            'weather_station_id': ['USC00110072', 'USC00110072', 'USC00111436'],
+        })
+        with self.app.app_context():
+            push_raw_data(wx_df)
+            before = [record.serialize() for record in db.session.scalars(select(Weather).order_by(Weather.weather_id))]
+
+            created = migrate_indexes(without_rowid=True)
+
+            self.assertEqual(weather_layout(), 'without_rowid')
+            self.assertEqual(created['weather'], ['ix_weather_date_station'])
+            after = [record.serialize() for record in db.session.scalars(select(Weather).order_by(Weather.weather_id))]
+            self.assertEqual(after, before)
+            self.assertEqual(merge_weather(wx_df.with_columns(date=pl.col('date').dt.offset_by('1y'))), (3, 0))
+            self.assertEqual(db.session.scalars(select(func.max(Weather.weather_id))).one(), 6)
+
+
 if __name__ == '__main__':
     unittest.main()